@@ -1,19 +1,29 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+from udise import geo
+from udise.app import aggregate, boundaries, distinct
+from udise.lazy import lazy_import
+from udise.metrics import begin_rerun, end_rerun, span
+from udise.query import Filters, make_query
+from udise.store import trends_columns
+from udise.trends import slopes
+
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
 
 # ---------------------------------
 # PAGE CONFIG
 # ---------------------------------
 st.set_page_config(page_title=" Analysis", layout="wide")
+begin_rerun("Improvement_Rate")
 st.title("🏫 Which States Show Consistent Improvement Over the Last 3 Years?")
 st.markdown("---")
 
 # ---------------------------------
 # LOAD DATA
 # ---------------------------------
-df = pd.read_parquet("preprocessed_prompt2.parquet")
+national = aggregate(make_query(Filters(), source='trends',
+                                facility_index='mean', teacher_quality_index='mean')).iloc[0]
 
 
 # prompt1_tab, prompt2_tab , prompt3_tab , prompt4_tab, prompt5_tab = st.tabs([
@@ -30,31 +40,35 @@ with promt1_tab:
     st.header("Analysis: State-wise Improvement in School Facilities & Teacher Quality")
 # KPIs
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total States + Union ", df["state"].nunique())
-    col2.metric("Years Covered", df["year"].nunique())
-    col3.metric("Avg Facility Index", f"{df['facility_index'].mean():.2f}")
-    col4.metric("Avg Teacher Quality index ", f"{df['teacher_quality_index'].mean():.2f}")
+    col1.metric("Total States + Union ", len(distinct('state', 'trends')))
+    col2.metric("Years Covered", len(distinct('year', 'trends')))
+    col3.metric("Avg Facility Index", f"{national['facility_index']:.2f}")
+    col4.metric("Avg Teacher Quality index ", f"{national['teacher_quality_index']:.2f}")
 
 # PREPROCESS
-    trend = df.groupby(["state", "year"])[["facility_index", "teacher_quality_index"]].mean().reset_index()
+    trend = aggregate(make_query(Filters(), ("state", "year"), source='trends',
+                                 facility_index='mean', teacher_quality_index='mean'))
     trend["facility_change"] = trend.groupby("state")["facility_index"].diff()
     trend["teacher_change"] = trend.groupby("state")["teacher_quality_index"].diff()
     avg_improvement = trend.groupby("state")[["facility_change", "teacher_change"]].mean().reset_index()
+    INDICES = {"facility_index": "Facility Index", "teacher_quality_index": "Teacher Quality Index"}
+    state_trends = slopes(trend, ["state"], INDICES)
 
 # ---------------------------------
 # TABS LAYOUT
 # ---------------------------------
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "📊 Trends Overview",
     "🔥 Heatmaps & Correlations",
     "🏆 Top Performers",
-    "🧠 Insights & Policy"
+    "🧠 Insights & Policy",
+    "🗺️ Improvement Map"
       ])
 
 # ==============================================================
 # TAB 1 – TRENDS OVERVIEW
 # ==============================================================
-    with tab1:
+    with tab1, span('figure', '📊 Trends Overview'):
          st.subheader("📈 Facility & Teacher Quality Trends")
 
          top_states = trend["state"].unique()[:5]
@@ -102,37 +116,50 @@ with promt1_tab:
 # ==============================================================
 # TAB 2 – HEATMAPS & CORRELATIONS
 # ==============================================================
-    with tab2:
-     import seaborn as sns
-     import matplotlib.pyplot as plt
-
+    with tab2, span('figure', '🔥 Heatmaps & Correlations'):
      st.subheader("🔥 Heatmap of Facility & Teacher Index Change")
 
      corr_df = avg_improvement.set_index("state")[["facility_change", "teacher_change"]]
-     fig, ax = plt.subplots(figsize=(6, 4))
-     sns.heatmap(corr_df.corr(), annot=True, cmap="YlGnBu", ax=ax)
-     ax.set_title("Correlation between Facility & Teacher Quality Change")
-     st.pyplot(fig)
+     fig = px.imshow(
+        corr_df.corr(), text_auto=".2f", color_continuous_scale="YlGnBu",
+        title="Correlation between Facility & Teacher Quality Change"
+     )
+     st.plotly_chart(fig, use_container_width=True)
 
      st.subheader("🌡️ State-wise Facility & Teacher Change")
-     fig2, ax2 = plt.subplots(figsize=(10, 6))
-     sns.heatmap(
-        corr_df, annot=True, cmap="coolwarm", fmt=".2f",
-        linewidths=0.5, ax=ax2
+     fig2 = px.imshow(
+        corr_df, text_auto=".2f", color_continuous_scale="RdBu_r", aspect="auto",
+        color_continuous_midpoint=0, height=max(400, 22 * len(corr_df)),
+        title="Facility & Teacher Quality Change Across States"
      )
-     ax2.set_title("Facility & Teacher Quality Change Across States")
-     st.pyplot(fig2)
+     fig2.update_traces(xgap=1, ygap=1)
+     st.plotly_chart(fig2, use_container_width=True)
 
 # ==============================================================
 # TAB 3 – TOP PERFORMERS
 # ==============================================================
-    with tab3:
-     st.subheader("🏆 Top 10 Improving States (Overall)")
-     top_states = avg_improvement.sort_values(by="facility_change", ascending=False).head(10)
-     st.dataframe(top_states.style.highlight_max(axis=0, color="lightgreen"), use_container_width=True)
+    with tab3, span('figure', '🏆 Top Performers'):
+     st.subheader("🏆 Top 10 Consistently Improving Areas")
+     colL, colI = st.columns(2)
+     levels = ["District", "State"] if "district" in trends_columns() else ["State"]
+     level = colL.radio("Granularity", levels, horizontal=True)
+     index = colI.radio("Index", list(INDICES), format_func=INDICES.get, horizontal=True, key="top_index")
+     if level == "District":
+        yearly = aggregate(make_query(Filters(), ("state", "district", "year"), source='trends',
+                                      facility_index='mean', teacher_quality_index='mean'))
+        ranked = slopes(yearly, ["state", "district"], INDICES)
+     else:
+        ranked = state_trends
+     top = ranked.nlargest(10, f"{index}_score")[[c for c in ("state", "district") if c in ranked] + [
+        "years", f"{index}_slope", f"{index}_r2", f"{index}_up_years", f"{index}_score"]]
+     top.columns = [*top.columns[:-5], "Years", "Change / Year", "R²", "Years Up", "Score"]
+     st.dataframe(top.style.highlight_max(subset=["Change / Year", "R²", "Score"], color="lightgreen"),
+                  use_container_width=True, hide_index=True)
+     st.caption("Score = least-squares change per year × R² of the yearly trend: "
+                f"steady gains rank above erratic ones. {len(ranked):,} {level.lower()}s ranked.")
 
      st.markdown("### 🗺️ Select a State to View Trend")
-     selected_state = st.selectbox("Choose a State", df["state"].unique())
+     selected_state = st.selectbox("Choose a State", distinct('state', 'trends'))
      state_data = trend[trend["state"] == selected_state]
 
     fig4 = px.line(
@@ -144,7 +171,7 @@ with promt1_tab:
 # ==============================================================
 # TAB 4 – INSIGHTS & POLICY
 # ==============================================================
-    with tab4:
+    with tab4, span('figure', '🧠 Insights & Policy'):
      st.subheader("🧠 Key Insights")
      st.write("""
      1. States with higher access to electricity, toilets, and libraries show consistent facility growth.  
@@ -170,6 +197,19 @@ with promt1_tab:
     4. Develop **digital dashboards** to monitor improvement at district level.  
     """)
 
+# ==============================================================
+# TAB 5 – IMPROVEMENT MAP
+# ==============================================================
+    with tab5, span('figure', '🗺️ Improvement Map'):
+     st.subheader("🗺️ Trend per Year by State")
+     change = st.radio("Index", list(INDICES), format_func=INDICES.get, horizontal=True, key="map_index")
+     geojson = boundaries('states', 'india')
+     if geojson is None:
+        st.info("No boundary files yet: build them with `python -m udise.geo states.geojson districts.geojson`.")
+     else:
+        fig5 = geo.choropleth(geojson, state_trends, f"{change}_slope", 'states', 'Change / year', scale='RdYlGn')
+        st.plotly_chart(fig5, use_container_width=True)
+
 #     st.markdown("---")
 #     st.caption("✨ Developed by Neeraj Gupta | Data Science & Analytics Enthusiast")
 
@@ -183,4 +223,6 @@ st.markdown("""
     <p>Made with ❤️ and purpose by <b>The Role Players</b><br>
     Empowering Education through Data</p>
 </footer>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+end_rerun()
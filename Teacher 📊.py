@@ -1,7 +1,12 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from plotly.subplots import make_subplots
+
+from udise.app import choropleth, downloads, sidebar_filters
+from udise.lazy import lazy_import
+from udise.metrics import begin_rerun, end_rerun, span
+from udise.progressive import page_queries, progressive, settle
+from udise.query import make_query
+
+px = lazy_import('plotly.express')
 
 # ----------------------------------
 # PAGE CONFIGURATION
@@ -11,6 +16,7 @@ st.set_page_config(
     layout="wide",
     page_icon="📈"
 )
+begin_rerun("Teacher")
 
 st.markdown("""
     <style>
@@ -38,55 +44,25 @@ st.markdown("""
 st.title("📊 Teacher & Functional Toilet Availability and Retention Dashboard")
 st.markdown("#### Explore how school infrastructure and teacher availability affect student retention.")
 
-# ----------------------------------
-# LOAD DATA
-# ----------------------------------
-@st.cache_data
-def load_data():
-    df = pd.read_csv("df_main.csv")  # Replace with your CSV file path
-    num_cols = [
-        'total_tch', 'male', 'female', 'trained_comp',
-        'total_boys_func_toilet', 'total_girls_func_toilet',
-        'func_boys_cwsn_friendly', 'func_girls_cwsn_friendly',
-        'total_class_rooms', 'library_availability',
-        'electricity_availability', 'playground_available'
-    ]
-    for col in num_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Derived columns
-    df['total_func_toilet'] = df['total_boys_func_toilet'].fillna(0) + df['total_girls_func_toilet'].fillna(0)
-    df['cwsn_toilet'] = df['func_boys_cwsn_friendly'].fillna(0) + df['func_girls_cwsn_friendly'].fillna(0)
-    df['facility_index'] = df[['total_class_rooms','library_availability','electricity_availability','playground_available']].mean(axis=1)
-    return df
-
-df = load_data()
-
 # ----------------------------------
 # FILTERS
 # ----------------------------------
 st.sidebar.header("🔍 Filters")
 
-state = st.sidebar.selectbox("Select State", ["All"] + sorted(df['state'].dropna().unique().tolist()))
-district = st.sidebar.selectbox("Select District", ["All"] + sorted(df['district'].dropna().unique().tolist()))
-rural_urban = st.sidebar.multiselect("Select Rural/Urban", df['rural_urban'].dropna().unique().tolist(), default=df['rural_urban'].dropna().unique().tolist())
-
-filtered_df = df.copy()
-if state != "All":
-    filtered_df = filtered_df[filtered_df['state'] == state]
-if district != "All":
-    filtered_df = filtered_df[filtered_df['district'] == district]
-filtered_df = filtered_df[filtered_df['rural_urban'].isin(rural_urban)]
+filters = sidebar_filters()
 
 # ----------------------------------
 # METRIC SUMMARY
 # ----------------------------------
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("👩‍🏫 Avg Teachers", f"{filtered_df['total_tch'].mean():.1f}")
-col2.metric("🚻 Avg Functional Toilets", f"{filtered_df['total_func_toilet'].mean():.1f}")
-col3.metric("🎓 Trained Teachers (%)", f"{filtered_df['trained_comp'].mean():.1f}")
-col4.metric("🏫 Facility Index", f"{filtered_df['facility_index'].mean():.2f}")
+@progressive(make_query(filters, total_tch='mean', total_func_toilet='mean',
+                        trained_comp='mean', facility_index='mean'))
+def metric_cards(agg):
+    metrics = agg.iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("👩‍🏫 Avg Teachers", f"{metrics['total_tch']:.1f}")
+    col2.metric("🚻 Avg Functional Toilets", f"{metrics['total_func_toilet']:.1f}")
+    col3.metric("🎓 Trained Teachers (%)", f"{metrics['trained_comp']:.1f}")
+    col4.metric("🏫 Facility Index", f"{metrics['facility_index']:.2f}")
 
 st.markdown("---")
 
@@ -100,17 +76,20 @@ tabs = st.tabs([
     "Teacher Gender",
     "CWSN Toilets",
     "Facility Index",
-    "Urban vs Rural"
+    "Urban vs Rural",
+    "Map"
 ])
 
 # TAB 1: Teachers
-with tabs[0]:
+with tabs[0], span('figure', 'Total Teachers'):
     st.subheader("1️⃣ Total Teachers vs Retention")
-    agg = filtered_df.groupby('rural_urban')['total_tch'].mean().reset_index()
-    fig = px.bar(agg, x='rural_urban', y='total_tch', text='total_tch',
-                 color='rural_urban', color_discrete_sequence=px.colors.qualitative.Pastel)
-    fig.update_traces(textposition='outside')
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', total_tch='mean'))
+    def total_teachers(agg):
+        fig = px.bar(agg, x='rural_urban', y='total_tch', text='total_tch',
+                     color='rural_urban', color_discrete_sequence=px.colors.qualitative.Pastel)
+        fig.update_traces(textposition='outside')
+        st.plotly_chart(fig, use_container_width=True)
 
     st.info("""
     **Insights:**
@@ -121,12 +100,15 @@ with tabs[0]:
     """)
 
 # TAB 2: Toilets
-with tabs[1]:
+with tabs[1], span('figure', 'Functional Toilets'):
     st.subheader("2️⃣ Functional Toilets and Retention")
-    agg = filtered_df.groupby('rural_urban')['total_func_toilet'].mean().reset_index()
-    fig = px.bar(agg, x='rural_urban', y='total_func_toilet', text='total_func_toilet',
-                 color='rural_urban', color_discrete_sequence=px.colors.qualitative.Vivid)
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', total_func_toilet='mean'))
+    def functional_toilets(agg):
+        fig = px.bar(agg, x='rural_urban', y='total_func_toilet', text='total_func_toilet',
+                     color='rural_urban', color_discrete_sequence=px.colors.qualitative.Vivid)
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("""
     **Insights:**
     - Urban schools generally have more functional toilets than rural ones.
@@ -136,12 +118,15 @@ with tabs[1]:
     """)
 
 # TAB 3: Trained Teachers
-with tabs[2]:
+with tabs[2], span('figure', 'Trained Teachers'):
     st.subheader("3️⃣ Trained Teachers vs Retention")
-    agg = filtered_df.groupby('rural_urban')['trained_comp'].mean().reset_index()
-    fig = px.bar(agg, x='rural_urban', y='trained_comp', text='trained_comp',
-                 color='rural_urban', color_discrete_sequence=px.colors.qualitative.Prism)
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', trained_comp='mean'))
+    def trained_teachers(agg):
+        fig = px.bar(agg, x='rural_urban', y='trained_comp', text='trained_comp',
+                     color='rural_urban', color_discrete_sequence=px.colors.qualitative.Prism)
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("""
     **Insights:**
     - Teacher training levels are higher in urban schools.
@@ -151,13 +136,16 @@ with tabs[2]:
     """)
 
 # TAB 4: Gender
-with tabs[3]:
+with tabs[3], span('figure', 'Teacher Gender'):
     st.subheader("4️⃣ Gender Distribution of Teachers")
-    agg = filtered_df.groupby('rural_urban')[['male','female']].sum().reset_index()
-    gender_df = agg.melt(id_vars='rural_urban', var_name='Gender', value_name='Count')
-    fig = px.bar(gender_df, x='Gender', y='Count', color='rural_urban', barmode='group',
-                 color_discrete_sequence=px.colors.qualitative.Safe)
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', male='sum', female='sum'))
+    def teacher_gender(agg):
+        gender_df = agg.melt(id_vars='rural_urban', var_name='Gender', value_name='Count')
+        fig = px.bar(gender_df, x='Gender', y='Count', color='rural_urban', barmode='group',
+                     color_discrete_sequence=px.colors.qualitative.Safe)
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("""
     **Insights:**
     - Female teacher representation is much lower in rural areas.
@@ -167,12 +155,15 @@ with tabs[3]:
     """)
 
 # TAB 5: CWSN Toilets
-with tabs[4]:
+with tabs[4], span('figure', 'CWSN Toilets'):
     st.subheader("5️⃣ CWSN Friendly Toilets and Retention")
-    agg = filtered_df.groupby('rural_urban')['cwsn_toilet'].mean().reset_index()
-    fig = px.bar(agg, x='rural_urban', y='cwsn_toilet', text='cwsn_toilet',
-                 color='rural_urban', color_discrete_sequence=px.colors.qualitative.Bold)
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', cwsn_toilet='mean'))
+    def cwsn_toilets(agg):
+        fig = px.bar(agg, x='rural_urban', y='cwsn_toilet', text='cwsn_toilet',
+                     color='rural_urban', color_discrete_sequence=px.colors.qualitative.Bold)
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("""
     **Insights:**
     - Inclusive infrastructure is lacking in many rural schools.
@@ -182,12 +173,15 @@ with tabs[4]:
     """)
 
 # TAB 6: Facility Index
-with tabs[5]:
+with tabs[5], span('figure', 'Facility Index'):
     st.subheader("6️⃣ Facility Index and Retention")
-    agg = filtered_df.groupby('rural_urban')['facility_index'].mean().reset_index()
-    fig = px.bar(agg, x='rural_urban', y='facility_index', text='facility_index',
-                 color='rural_urban', color_discrete_sequence=px.colors.qualitative.T10)
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', facility_index='mean'))
+    def facility_index(agg):
+        fig = px.bar(agg, x='rural_urban', y='facility_index', text='facility_index',
+                     color='rural_urban', color_discrete_sequence=px.colors.qualitative.T10)
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("""
     **Insights:**
     - Facility availability is higher in urban schools.
@@ -197,12 +191,15 @@ with tabs[5]:
     """)
 
 # TAB 7: Urban vs Rural Comparison
-with tabs[6]:
+with tabs[6], span('figure', 'Urban vs Rural'):
     st.subheader("7️⃣ Urban vs Rural Overview")
-    agg = filtered_df.groupby('rural_urban')[['total_tch','total_func_toilet']].mean().reset_index()
-    fig = px.line(agg.melt(id_vars='rural_urban'), x='rural_urban', y='value',
-                  color='variable', markers=True, text='value')
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', total_tch='mean', total_func_toilet='mean'))
+    def urban_vs_rural(agg):
+        fig = px.line(agg.melt(id_vars='rural_urban'), x='rural_urban', y='value',
+                      color='variable', markers=True, text='value')
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("""
     **Insights:**
     - Urban areas lead in both staff and sanitation infrastructure.
@@ -210,10 +207,24 @@ with tabs[6]:
     
     **Recommendation:** Jointly address staffing and sanitation gaps in rural schools.
     """)
+
+# TAB 8: Map
+with tabs[7], span('figure', 'Map'):
+    st.subheader("8️⃣ Teachers by State / District")
+    map_kind = st.radio("Areas", ['states', 'districts'], format_func=str.title, horizontal=True)
+    fig = choropleth(filters, map_kind, 'Total Teachers', 'Greens', total_tch='sum')
+    if fig is None:
+        st.info("No boundary files yet: build them with `python -m udise.geo states.geojson districts.geojson`.")
+    else:
+        st.plotly_chart(fig, use_container_width=True)
 st.markdown("""
 <footer>
     <hr>
     <p>Made with ❤️ and purpose by <b>The Role Players</b><br>
     Empowering Education through Data</p>
 </footer>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+downloads(filters, page_queries(filters))
+settle()
+end_rerun()
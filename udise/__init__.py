@@ -0,0 +1,6 @@
+"""Shared data layer for the UDISE dashboards.
+
+The Streamlit pages stay thin: loading, cleaning, filtering and aggregation
+live here so every page (and every tool around the pages) computes the same
+numbers the same way.
+"""
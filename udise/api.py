@@ -0,0 +1,309 @@
+"""Headless HTTP API over the query layer and the prediction models.
+
+Serves the same aggregates as the dashboards without a Streamlit rerun:
+requests go through the shared query service (identical concurrent requests
+share one computation) and the disk cache, and results are kept in memory
+per dataset fingerprint. Connections are HTTP/1.1 keep-alive, so a client
+pays the TCP handshake once.
+
+    python -m udise.api [--host 127.0.0.1] [--port 8601]
+
+    GET  /health
+    GET  /distinct/<column>[?source=trends]
+    GET  /aggregate?by=rural_urban&measure=facility_index:mean[&state=..&district=..&rural_urban=Rural&segment=2]
+    POST /predict/<dropout|retention|infra>    JSON records, lists of values in the model's input order,
+                                               {"input": [values]}, or an Arrow stream
+    GET  /stats/predict
+    GET  /export?format=csv|parquet[&columns=a,b&state=..]    the filtered school rows, streamed
+
+Responses are columnar: JSON {"column": [values], ...} by default, or an
+Arrow IPC stream when the request sends `Accept: application/vnd.apache.arrow.stream`
+(pyarrow: `pa.ipc.open_stream(body).read_pandas()`). A prediction request
+carries any number of rows; concurrent requests are batched into one model
+call by the prediction scheduler (`udise.inference`), whose throughput and
+queue latency are at GET /stats/predict. Exports are sent with chunked
+transfer encoding as they are read from the store (`udise.export`).
+"""
+import argparse
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pyarrow as pa
+
+from udise import export, inference, models, store
+from udise.diskcache import CachedEngine
+from udise.query import AGGS, Filters, get_engine, make_query
+from udise.service import QueryService
+
+ARROW = 'application/vnd.apache.arrow.stream'
+PORT = int(os.environ.get('UDISE_API_PORT', 8601))
+MEMORY_ENTRIES = 512  # aggregates kept in memory
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Download:
+    """A response body sent as it is produced rather than built first."""
+
+    def __init__(self, chunks, content_type, file_name):
+        self.chunks, self.content_type, self.file_name = chunks, content_type, file_name
+
+
+# --------------------------
+# REQUESTS -> QUERIES
+# --------------------------
+def _one(params, name, default):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def filters_from(params):
+    rural_urban = [v for value in params.get('rural_urban', []) for v in value.split(',') if v]
+    segment = _one(params, 'segment', None)
+    try:
+        segment = int(segment) if segment not in (None, '', 'All') else None
+    except ValueError:
+        raise ApiError(400, f"segment must be a number, not {segment!r}")
+    return Filters(state=_one(params, 'state', "All"), district=_one(params, 'district', "All"),
+                   rural_urban=tuple(rural_urban) if rural_urban else None, segment=segment)
+
+
+def query_from(params):
+    """Query of `?by=a,b&measure=col:agg&...`; measures default to the mean."""
+    by = [c for value in params.get('by', []) for c in value.split(',') if c]
+    measures = {}
+    for value in params.get('measure', []):
+        for item in value.split(','):
+            column, _, agg = item.partition(':')
+            measures[column] = agg or 'mean'
+    if not measures:
+        raise ApiError(400, f"at least one measure=<column>:<{'|'.join(AGGS)}> is required")
+    try:
+        return make_query(filters_from(params), by, _one(params, 'source', 'main'), **measures)
+    except ValueError as e:
+        raise ApiError(400, str(e))
+
+
+def export_from(params):
+    fmt = _one(params, 'format', 'csv')
+    if fmt not in export.FORMATS:
+        raise ApiError(400, f"format must be one of {', '.join(export.FORMATS)}")
+    filters = filters_from(params)
+    columns = [c for value in params.get('columns', []) for c in value.split(',') if c] or None
+    try:
+        chunks = export.rows(filters, columns, fmt)
+    except ValueError as e:
+        raise ApiError(400, str(e))
+    return Download(chunks, export.FORMATS[fmt], export.file_name('schools', filters, fmt))
+
+
+# --------------------------
+# SERVICE
+# --------------------------
+class Api:
+    """Query service plus an in-memory LRU of results keyed by the data fingerprint."""
+
+    def __init__(self, engine=None):
+        engine = engine or get_engine()
+        if os.environ.get('UDISE_DISK_CACHE', '1') != '0' and not isinstance(engine, CachedEngine):
+            engine = CachedEngine(engine)
+        self.engine = engine
+        self.service = QueryService(engine)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _version(self, source):
+        fingerprint = getattr(self.engine, 'fingerprint', None)
+        return fingerprint(source) if fingerprint else None
+
+    def _remembered(self, key, compute):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._memory[key]
+            self.stats['misses'] += 1
+        value = compute()
+        with self._lock:
+            self._memory[key] = value
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+        return value
+
+    def _check_columns(self, source, columns):
+        if source not in ('main', 'trends'):
+            raise ApiError(400, f"source must be main or trends, not {source!r}")
+        key = ('columns', source, self._version(source))
+        known = self._remembered(key, lambda: set(store.columns(source)))
+        unknown = [c for c in columns if c not in known]
+        if unknown:
+            raise ApiError(400, f"Unknown columns for {source}: {', '.join(unknown)}")
+
+    def aggregate(self, query):
+        self._check_columns(query.source, query.columns())
+        key = ('aggregate', query, self._version(query.source))
+        return self._remembered(key, lambda: self.service.aggregate(query))
+
+    def distinct(self, column, source='main'):
+        self._check_columns(source, [column])
+        key = ('distinct', column, source, self._version(source))
+        return self._remembered(key, lambda: pd.DataFrame({column: self.service.distinct(column, source)}))
+
+    def predict(self, name, rows):
+        try:
+            return pd.DataFrame({'prediction': inference.predict(name, rows)})
+        except (ValueError, TypeError) as e:
+            raise ApiError(400, str(e))
+        except FileNotFoundError:
+            raise ApiError(503, f"Model file {models.MODELS[name].path} is not deployed")
+
+
+# --------------------------
+# HTTP
+# --------------------------
+def to_json(df):
+    return json.dumps({c: df[c].astype(object).where(df[c].notna(), None).tolist() for c in df.columns},
+                      default=str).encode()
+
+
+def to_arrow(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def rows_from(body, content_type):
+    if content_type.startswith(ARROW):
+        return pa.ipc.open_stream(body).read_pandas()
+    try:
+        payload = json.loads(body or b'null')
+    except ValueError as e:
+        raise ApiError(400, f"invalid JSON: {e}")
+    if isinstance(payload, dict) and 'rows' in payload:
+        payload = payload['rows']
+    if not isinstance(payload, (list, dict)) or not payload:
+        raise ApiError(400, "send rows as a list of records, as lists of values in the model's input order "
+                            "or as {\"input\": [values]}")
+    return payload  # turned into the model's columns by `inference.as_frame`
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    api = None  # set by make_server()
+
+    def log_message(self, format, *args):
+        if os.environ.get('UDISE_API_LOG'):
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, download):
+        self.send_response(200)
+        self.send_header('Content-Type', download.content_type)
+        self.send_header('Content-Disposition', f'attachment; filename="{download.file_name}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in download.chunks:
+                if chunk:
+                    self.wfile.write(b'%x\r\n%b\r\n' % (len(chunk), chunk))
+        except Exception as e:  # too late for an error status
+            self.log_error("export failed: %s", e)
+            self.close_connection = True  # no terminating chunk: the client sees a cut-off body
+            return
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _respond(self, df):
+        if isinstance(df, Download):
+            self._stream(df)
+        elif ARROW in self.headers.get('Accept', ''):
+            self._send(200, to_arrow(df), ARROW)
+        else:
+            self._send(200, to_json(df), 'application/json')
+
+    def _handle(self, route):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        parts = [p for p in url.path.split('/') if p]
+        try:
+            self._respond(route(parts, params))
+        except ApiError as e:
+            self._send(e.status, json.dumps({'error': str(e)}).encode(), 'application/json')
+        except Exception as e:  # keep the connection and the server alive
+            self._send(500, json.dumps({'error': f"{type(e).__name__}: {e}"}).encode(), 'application/json')
+
+    def _get(self, parts, params):
+        if parts == ['health']:
+            return pd.DataFrame({'status': ['ok'], 'engine': [self.api.engine.name]})
+        if len(parts) == 2 and parts[0] == 'distinct':
+            return self.api.distinct(parts[1], _one(params, 'source', 'main'))
+        if parts == ['aggregate']:
+            return self.api.aggregate(query_from(params))
+        if parts == ['stats', 'predict']:
+            return inference.stats()
+        if parts == ['export']:
+            return export_from(params)
+        raise ApiError(404, f"no route for GET {self.path}")
+
+    def _post(self, parts, params):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if len(parts) == 2 and parts[0] == 'predict':
+            if parts[1] not in models.MODELS:
+                raise ApiError(404, f"Unknown model {parts[1]!r}; expected one of {', '.join(models.MODELS)}")
+            return self.api.predict(parts[1], rows_from(body, self.headers.get('Content-Type', '')))
+        raise ApiError(404, f"no route for POST {self.path}")
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+
+class Server(ThreadingHTTPServer):
+    request_queue_size = 128  # listen backlog; the default 5 resets bursts of concurrent clients
+    daemon_threads = True
+
+
+def make_server(host='127.0.0.1', port=PORT, api=None):
+    handler = type('UdiseHandler', (Handler,), {'api': api or Api()})
+    return Server((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port)
+    print(f"Serving the UDISE API on http://{args.host}:{args.port} ({server.RequestHandlerClass.api.engine.name})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.api.service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""Streamlit glue shared by the analytics pages.
+
+One engine and one query service per server process, and cached results per
+query, so reruns and sessions that ask the same question reuse the answer.
+Aggregates are also written through to the disk cache (`udise.diskcache`)
+unless UDISE_DISK_CACHE=0, so they survive restarts. The in-memory caches
+are keyed by the dataset fingerprint as well, so new data is never served
+from a stale entry.
+
+The sidebar filters (`sidebar_filters`) are shared by every page of a
+session and mirrored in the URL, so switching pages or following a link
+keeps the selection.
+"""
+import os
+from collections import Counter
+
+import streamlit as st
+
+from udise import binning, export, geo, metrics, rollup, segments
+from udise.diskcache import CachedEngine
+from udise.query import Filters, get_engine, make_query
+from udise.service import QueryService
+
+# Calls made by pages; compared with the service's counts this gives the
+# in-memory cache hit rate
+calls = Counter()
+
+
+@st.cache_resource(show_spinner=False)
+def load_engine():
+    engine = get_engine()
+    if os.environ.get('UDISE_DISK_CACHE', '1') != '0':
+        engine = CachedEngine(engine)
+    return engine
+
+
+@st.cache_resource(show_spinner=False)
+def load_service():
+    return QueryService(load_engine())
+
+
+def data_version(source='main'):
+    fingerprint = getattr(load_engine(), 'fingerprint', None)
+    return fingerprint(source) if fingerprint else None
+
+
+# --------------------------
+# SHARED FILTERS
+# --------------------------
+SHARED = 'udise_filters'  # session state key no widget owns, so it outlives every page
+
+
+def _from_url():
+    params = st.query_params
+    segment = params.get('segment', '')
+    return {
+        'state': params.get('state', "All"),
+        'district': params.get('district', "All"),
+        'rural_urban': tuple(v for v in params['rural_urban'].split(',') if v) if 'rural_urban' in params else None,
+        'segment': int(segment) if segment.isdigit() else None,
+    }
+
+
+def _to_url(shared, defaults):
+    for name, value in shared.items():
+        if value == defaults[name]:
+            st.query_params.pop(name, None)
+            continue
+        text = ','.join(value) if isinstance(value, tuple) else str(value)
+        if st.query_params.get(name) != text:
+            st.query_params[name] = text
+
+
+def _shared(name, widget, label, options, default, **kwargs):
+    """`widget` drawn with the session's shared value for `name`, which it then updates."""
+    shared = st.session_state[SHARED]
+    key = f'_filter_{name}'
+
+    def valid(v):
+        if isinstance(default, list):
+            return v is not None and all(x in options for x in v)
+        return v in options
+
+    # Streamlit forgets a widget's state when a page without it runs, so the
+    # shared copy seeds it; values another filter ruled out fall back to the default
+    if key not in st.session_state or not valid(st.session_state[key]):
+        value = shared[name] if valid(shared[name]) else default
+        st.session_state[key] = list(value) if isinstance(value, tuple) else value
+    value = widget(label, options, key=key, **kwargs)
+    shared[name] = tuple(value) if isinstance(value, list) else value
+    return value
+
+
+def sidebar_filters(location=True, segment=True):
+    """The session's shared State / District / Rural/Urban / Segment sidebar, as `Filters`."""
+    st.session_state.setdefault(SHARED, _from_url())
+    defaults = {'state': "All", 'district': "All", 'rural_urban': tuple(distinct('rural_urban')), 'segment': None}
+    values = dict(defaults)
+    if location:
+        state = _shared('state', st.sidebar.selectbox, "State", ["All"] + distinct('state'), "All")
+        # Only the districts of the chosen state, so a kept district always has data
+        values['state'] = state
+        values['district'] = _shared('district', st.sidebar.selectbox, "District",
+                                     ["All"] + (districts(state) if state != "All" else distinct('district')), "All")
+    values['rural_urban'] = _shared('rural_urban', st.sidebar.multiselect, "Rural/Urban", list(defaults['rural_urban']),
+                                    list(defaults['rural_urban']))
+    if segment:
+        labels = _segment_labels(segments.version(), data_version())
+        if labels:
+            values['segment'] = _shared('segment', st.sidebar.selectbox, "Segment", [None, *range(len(labels))], None,
+                                        format_func=lambda i: "All" if i is None else labels[i])
+    _to_url(st.session_state[SHARED], defaults)
+    return Filters(state=values['state'], district=values['district'],
+                   rural_urban=tuple(values['rural_urban']), segment=values['segment'])
+
+
+def districts(state):
+    """Districts of one state."""
+    return aggregate(make_query(Filters(state=state), 'district', total_tch='count'))['district'].tolist()
+
+
+@st.cache_data(show_spinner=False)
+def _segment_labels(version, data):
+    model = segments.Model.load() if segments.assigned() else None
+    return model.labels if model else []
+
+
+def downloads(filters, queries):
+    """Sidebar buttons for the filtered schools and the page's aggregates (`queries`).
+
+    Nothing is read until a button is clicked; the schools are then streamed
+    from the store (`udise.export`), never loaded as a DataFrame.
+    """
+    st.sidebar.header("Download")
+    fmt = st.sidebar.radio("Format", list(export.FORMATS), horizontal=True, format_func=str.upper)
+    service = load_service()
+    st.sidebar.download_button(
+        "⬇️ Schools", lambda: export.spool(export.rows(filters, fmt=fmt)),
+        file_name=export.file_name('schools', filters, fmt), mime=export.FORMATS[fmt])
+    st.sidebar.download_button(
+        "⬇️ Aggregates", lambda: export.spool(export.aggregates([(q, service.aggregate(q)) for q in queries], fmt)),
+        file_name=export.file_name('aggregates', filters, fmt), mime=export.FORMATS[fmt], disabled=not queries)
+
+
+def rollups(filters, measures, agg='mean'):
+    """Rollups of one or more measures (`udise.rollup`), shared by every session on the same data."""
+    base = Filters(rural_urban=filters.rural_urban, segment=filters.segment)
+    return _rollups(base, measures, agg, data_version())
+
+
+@st.cache_resource(show_spinner="Building the rollup cube...", max_entries=16)
+def _rollups(filters, measures, agg, version):
+    return rollup.Rollups.build(aggregate, filters, measures, agg)
+
+
+@st.cache_resource(show_spinner=False)
+def boundaries(kind, level, state="All"):
+    """Simplified boundaries (`udise.geo`), loaded once per process; None if not built."""
+    return geo.load(kind, level, state)
+
+
+def choropleth(filters, kind, label=None, scale='Blues', **measure):
+    """Map of one measure (`name='agg'`) by state or district, or None without boundaries.
+
+    District maps cover the selected state (the whole country for "All"),
+    state maps always cover the country; the selected area is outlined.
+    """
+    level, state = geo.view(kind, filters.state, filters.district)
+    geojson = boundaries(kind, level, state)
+    if geojson is None:
+        return None
+    by = ('state', 'district') if kind == 'districts' else ('state',)
+    agg = aggregate(make_query(Filters(state=state, rural_urban=filters.rural_urban, segment=filters.segment),
+                               by, **measure))
+    highlight = None
+    if kind == 'states' and filters.state != "All":
+        highlight = geo.feature_id(filters.state)
+    elif kind == 'districts' and filters.district != "All":
+        highlight = geo.feature_id(filters.state, filters.district)
+    (name, _), = measure.items()
+    return geo.choropleth(geojson, agg, name, kind, label, highlight, scale)
+
+
+# Spans start as cache hits; the cached function bodies only run on a miss
+def aggregate(query):
+    calls['aggregate'] += 1
+    with metrics.span('query', f"{query.source}:{'+'.join(query.by) or 'total'}") as s:
+        s.cache = 'hit'
+        return _aggregate(query, data_version(query.source))
+
+
+def distinct(column, source='main'):
+    calls['distinct'] += 1
+    with metrics.span('load', f"distinct {column}") as s:
+        s.cache = 'hit'
+        return _distinct(column, source, data_version(source))
+
+
+def sample(filters, columns, n):
+    calls['sample'] += 1
+    with metrics.span('query', f"sample {n}") as s:
+        s.cache = 'hit'
+        return _sample(filters, columns, n, data_version())
+
+
+def correlation(filters, columns):
+    calls['correlation'] += 1
+    with metrics.span('query', 'correlation') as s:
+        s.cache = 'hit'
+        return _correlation(filters, columns, data_version())
+
+
+def density(filters, x, y, bins=200, x_range=None, y_range=None):
+    """School-level (x, y) binned on the server; see `udise.binning`."""
+    calls['density'] += 1
+    with metrics.span('query', f"density {x}/{y}") as s:
+        s.cache = 'hit'
+        return _density(filters, x, y, bins, x_range, y_range, data_version())
+
+
+def points(filters, x, y, x_range, y_range):
+    """School-level (x, y) pairs inside the ranges, as an (n, 2) array."""
+    calls['points'] += 1
+    with metrics.span('query', f"points {x}/{y}") as s:
+        s.cache = 'hit'
+        return binning.window(_xy(filters, x, y, data_version()), x_range, y_range)
+
+
+@st.cache_data(show_spinner=False)
+def _aggregate(query, version):
+    metrics.mark_cache('miss')
+    return load_service().aggregate(query)
+
+
+@st.cache_data(show_spinner=False)
+def _distinct(column, source, version):
+    metrics.mark_cache('miss')
+    return load_service().distinct(column, source)
+
+
+@st.cache_data(show_spinner=False)
+def _sample(filters, columns, n, version):
+    metrics.mark_cache('miss')
+    return load_service().frame(filters, columns, sample=n)
+
+
+@st.cache_data(show_spinner=False)
+def _correlation(filters, columns, version):
+    metrics.mark_cache('miss')
+    return load_service().frame(filters, columns).corr()
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _xy(filters, x, y, version):
+    metrics.mark_cache('miss')
+    df = load_service().frame(filters, (x, y))
+    return df.to_numpy(dtype=float)
+
+
+@st.cache_data(show_spinner=False)
+def _density(filters, x, y, bins, x_range, y_range, version):
+    metrics.mark_cache('miss')
+    return binning.bin2d(_xy(filters, x, y, version), bins, x_range, y_range)
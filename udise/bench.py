@@ -0,0 +1,227 @@
+"""Benchmark suite at several synthetic dataset sizes.
+
+For each size the suite generates data with `udise.synth`, then times:
+
+- load_data: the original CSV load + cleaning every page did
+- read_csv: the same through the multi-threaded Arrow ingestion path
+- build_store: CSV -> partitioned Parquet
+- per engine: first sidebar read, filtering, and every aggregation the pages
+  issue (tabs, metric cards, preprocess_grouped, trend building), for the
+  national view and for the largest state
+- model inference for the three pickled models, when they are present
+
+The aggregation catalogue is recorded by running the real pages headlessly,
+so it tracks the pages without a hand-maintained copy. Results are written
+to bench_results/<git revision>.json and compared with the previous run.
+
+    python -m udise.bench --sizes 10000 100000 1000000 --engines pandas duckdb parallel
+"""
+import argparse
+import glob
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from udise import store, synth
+from udise.diskcache import APP_ROOT, analytics_pages
+from udise.query import Filters, Query, get_engine
+from udise.schema import MAIN_CSV, clean
+
+RESULTS_DIR = os.path.join(APP_ROOT, 'bench_results')
+REGRESSION_RATIO = 1.2
+MODELS = {
+    'dropout': ('xgb_dropout_model.pkl', 10),
+    'retention': ('xgb_retention_model.pkl', 10),
+    'infra': ('infra_score_model.pkl', 10),
+}
+
+
+def timed(fn, repeat=1):
+    """Best wall time of `repeat` calls, and the last result."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# --------------------------
+# QUERY CATALOGUE
+# --------------------------
+class RecordingEngine:
+    def __init__(self, engine):
+        self.engine = engine
+        self.name = engine.name
+        self.queries = []
+
+    def aggregate(self, query):
+        self.queries.append(query)
+        return self.engine.aggregate(query)
+
+    def frame(self, *args, **kwargs):
+        return self.engine.frame(*args, **kwargs)
+
+    def distinct(self, *args, **kwargs):
+        return self.engine.distinct(*args, **kwargs)
+
+
+def record_queries():
+    """Every aggregate the analytics pages issue with their default filters."""
+    from streamlit.testing.v1 import AppTest
+
+    import udise.app
+
+    recorder = RecordingEngine(get_engine('pandas'))
+    original = udise.app.get_engine
+    udise.app.get_engine = lambda: recorder
+    os.environ['UDISE_DISK_CACHE'] = '0'
+    try:
+        for path in analytics_pages():
+            udise.app.load_engine.clear()
+            udise.app.load_service.clear()
+            AppTest.from_file(path, default_timeout=600).run()
+    finally:
+        udise.app.get_engine = original
+        udise.app.load_engine.clear()
+        udise.app.load_service.clear()
+    return list(dict.fromkeys(recorder.queries))
+
+
+def label(query):
+    measures = ','.join(f"{c}.{a}" for c, a in query.measures)
+    return f"{query.source}:{'+'.join(query.by) or 'total'}:{measures}"
+
+
+# --------------------------
+# SUITE
+# --------------------------
+def bench_engine(name, queries, results, repeat):
+    engine = get_engine(name)
+    results[f"{name}.sidebar_first"], states = timed(lambda: engine.distinct('state'))
+    counts = engine.aggregate(Query(by=('state',), measures=(('total_tch', 'count'),)))
+    largest = counts.sort_values('total_tch').iloc[-1]['state'] if len(counts) else states[0]
+    scopes = {'all': None, 'state': largest}
+    for scope, state in scopes.items():
+        f = Filters() if state is None else Filters(state=state)
+        results[f"{name}.filter.{scope}"], _ = timed(lambda: engine.frame(f, ['total_tch']), repeat)
+        for q in queries:
+            filters = q.filters if state is None else Filters(state, q.filters.district, q.filters.rural_urban)
+            q = replace(q, filters=filters)
+            if q.source == 'trends' and state is not None:
+                continue
+            results[f"{name}.{scope}.{label(q)}"], _ = timed(lambda: engine.aggregate(q), repeat)
+    if hasattr(engine, 'close'):
+        engine.close()
+
+
+def bench_models(results):
+    for name, (filename, n_features) in MODELS.items():
+        path = os.path.join(APP_ROOT, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+        for batch in (1, 10_000):
+            X = np.random.default_rng(0).integers(0, 5, (batch, n_features)).astype(float)
+            if name == 'infra' and hasattr(model, 'feature_names_in_'):
+                X = pd.DataFrame(X, columns=model.feature_names_in_)
+            results[f"model.{name}.predict_{batch}"], _ = timed(lambda: model.predict(X), 3)
+
+
+def run(sizes, engines, repeat=3):
+    results = {}
+    queries = None
+    cwd = os.getcwd()
+    for n in sizes:
+        workdir = tempfile.mkdtemp(prefix=f'udise-bench-{n}-')
+        try:
+            synth.write(n, workdir)
+            os.chdir(workdir)
+            if queries is None:
+                queries = record_queries()
+            r = results[str(n)] = {}
+            r['load_data'], _ = timed(lambda: clean(pd.read_csv(MAIN_CSV, low_memory=False)))
+            r['read_csv'], _ = timed(store.read_csv)
+            r['build_store'], _ = timed(store.build_store)
+            for name in engines:
+                bench_engine(name, queries, r, repeat)
+            bench_models(r)
+            print(f"{n} rows: {len(r)} timings")
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+# --------------------------
+# RESULTS
+# --------------------------
+def revision():
+    try:
+        rev = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=APP_ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = 'unknown'
+    return rev
+
+
+def save(results):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    rev = revision()
+    doc = {
+        'revision': rev,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'results': results,
+    }
+    path = os.path.join(RESULTS_DIR, f"{rev}.json")
+    with open(path, 'w') as f:
+        json.dump(doc, f, indent=1, sort_keys=True)
+    return path
+
+
+def compare(current_path, previous_path=None):
+    """Print timings that got slower than REGRESSION_RATIO; return how many."""
+    if previous_path is None:
+        others = [p for p in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if p != current_path]
+        if not others:
+            return 0
+        previous_path = max(others, key=os.path.getmtime)
+    with open(current_path) as f:
+        current = json.load(f)
+    with open(previous_path) as f:
+        previous = json.load(f)
+    regressions = 0
+    for size, timings in current['results'].items():
+        before = previous['results'].get(size, {})
+        for metric, seconds in sorted(timings.items()):
+            if metric in before and before[metric] > 0 and seconds / before[metric] > REGRESSION_RATIO:
+                regressions += 1
+                print(f"REGRESSION {size} {metric}: {before[metric]:.4f}s -> {seconds:.4f}s")
+    print(f"Compared with {previous['revision']}: {regressions} regressions")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--engines', nargs='+', default=['pandas', 'duckdb', 'parallel'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compare', help='results file to compare against (default: previous run)')
+    args = parser.parse_args()
+    path = save(run(args.sizes, args.engines, args.repeat))
+    print(f"Saved {path}")
+    sys.exit(1 if compare(path, args.compare) else 0)
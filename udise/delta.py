@@ -0,0 +1,167 @@
+"""Delta ingestion of a new UDISE snapshot into the existing store.
+
+Schools are matched on the UDISE school key; each stored row carries a hash
+of its source columns, so the new snapshot is hashed the same way and
+compared: schools only in the new file are added, schools only in the store
+are removed, and schools whose hash differs have changed (including schools
+that moved state or district). Only the state partitions holding such
+schools are rewritten, with derived columns computed for their rows, and
+the disk cache then recomputes the national and touched-state aggregates;
+entries filtered to an untouched district are carried over as they are.
+
+    python -m udise.delta new_df_main.csv [--store df_main_store] [--dry-run]
+
+Stores segmented by `udise.segments` get the segment of each new or changed
+school from the saved centres. A store built before row hashes were
+recorded, or a snapshot whose columns or column types differ from the
+store's, is rebuilt in full (and needs segmenting again). The snapshot is
+then checked for drift against every model profiled by `udise.drift`.
+"""
+import argparse
+import glob
+import shutil
+from dataclasses import dataclass, field
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from udise import segments, store
+from udise.schema import ROW_HASH, SCHOOL_KEY, SEGMENT, STORE_DIR
+
+LOCATION = ['state', 'district']
+
+
+@dataclass
+class Delta:
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    states: set = field(default_factory=set)
+    districts: set = field(default_factory=set)  # (state, district)
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+
+def _store_schema(store_dir):
+    """Column types of the store, with the partition column the files leave out."""
+    files = sorted(glob.glob(store.store_glob(store_dir), recursive=True))
+    if not files:
+        return None
+    schema = pq.read_schema(files[0]).remove_metadata()
+    return schema.append(pa.field(store.PARTITION_COL, pa.string()))
+
+
+def _previous(store_dir):
+    dataset = ds.dataset(store_dir, format='parquet', partitioning=store.PARTITIONING)
+    df = dataset.to_table(columns=[SCHOOL_KEY, *LOCATION, ROW_HASH]).to_pandas()
+    df['state'] = df['state'].astype(object)
+    return df
+
+
+def diff(old, new):
+    """Compare (key, state, district, hash) frames of two snapshots."""
+    for name, df in (('store', old), ('snapshot', new)):
+        if df[SCHOOL_KEY].duplicated().any():
+            raise ValueError(f"Duplicate {SCHOOL_KEY} values in the {name}")
+    # Keys may be read as numbers in one snapshot and text in the other
+    old = old.assign(**{SCHOOL_KEY: old[SCHOOL_KEY].astype('string')})
+    new = new.assign(**{SCHOOL_KEY: new[SCHOOL_KEY].astype('string')})
+    merged = old.merge(new, on=SCHOOL_KEY, how='outer', suffixes=('_old', '_new'), indicator=True)
+    added = merged['_merge'] == 'right_only'
+    removed = merged['_merge'] == 'left_only'
+    changed = (merged['_merge'] == 'both') & (merged[f'{ROW_HASH}_old'] != merged[f'{ROW_HASH}_new'])
+    delta = Delta(int(added.sum()), int(changed.sum()), int(removed.sum()))
+    for side, mask in (('old', removed | changed), ('new', added | changed)):
+        rows = merged.loc[mask, [f'state_{side}', f'district_{side}']].drop_duplicates()
+        pairs = {(s, d) for s, d in rows.itertuples(index=False, name=None) if pd.notna(s)}
+        delta.districts |= pairs
+        delta.states |= {s for s, _ in pairs}
+    return delta
+
+
+def ingest(csv_path, store_dir=STORE_DIR, dry_run=False):
+    """Apply `csv_path` to the store; returns the Delta, or None after a full rebuild."""
+    schema = _store_schema(store_dir) if store.has_store(store_dir) else None
+    new = store.read_csv(csv_path)
+    if SCHOOL_KEY not in new.columns:
+        raise ValueError(f"{csv_path} has no {SCHOOL_KEY} column to match schools on")
+    new[ROW_HASH] = store.row_hash(new)
+    model = segments.Model.load() if schema is not None and SEGMENT in schema.names else None
+    if model is not None:
+        new[SEGMENT] = model.assign(new)
+    if schema is None or set(schema.names) != set(new.columns):
+        if not dry_run:
+            store.build_store(csv_path, store_dir)
+        return None
+
+    delta = diff(_previous(store_dir), new[[SCHOOL_KEY, *LOCATION, ROW_HASH]])
+    if dry_run or not delta:
+        return delta
+    touched = new[new['state'].isin(delta.states)]
+    try:
+        table = store.to_table(touched.reset_index(drop=True), schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # A column changed type; partitions must agree, so rewrite them all
+        store.build_store(csv_path, store_dir)
+        return None
+    if len(touched):
+        store.write_partitions(table, store_dir)
+    parts = store.partitions(store_dir)
+    for state in delta.states - set(touched['state']):
+        if state in parts:  # every school of the state is gone
+            shutil.rmtree(parts[state])
+    return delta
+
+
+def refresh_cache(delta):
+    from udise.diskcache import CachedEngine
+    from udise.query import get_engine
+
+    engine = get_engine()
+    try:
+        return CachedEngine(engine).refresh(delta.states, delta.districts)
+    finally:
+        if hasattr(engine, 'close'):
+            engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv', help='new snapshot in the df_main.csv layout')
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--dry-run', action='store_true', help='report the delta without writing')
+    args = parser.parse_args()
+
+    delta = ingest(args.csv, args.store, args.dry_run)
+    if delta is None:
+        print(f"Rebuilt {args.store} in full (no row hashes, or the columns changed)")
+        return
+    print(f"{delta.added} added, {delta.changed} changed, {delta.removed} removed; "
+          f"{len(delta.states)} states / {len(delta.districts)} districts touched")
+    if delta and not args.dry_run:
+        recomputed, carried = refresh_cache(delta)
+        print(f"Disk cache: {recomputed} aggregates recomputed, {carried} carried over")
+    if not args.dry_run:
+        report_drift(args.csv)
+
+
+def report_drift(csv_path):
+    """Print the features of the snapshot that drift from each profiled model's training data."""
+    from udise import drift
+
+    for model_path in drift.MODELS:
+        profile = drift.load_profile(model_path)
+        if profile is None:
+            continue
+        report = drift.check(profile, csv_path)
+        drifted = report[report['status'] == 'drift']
+        print(f"Drift vs {model_path}: " + (', '.join(f"{f} (PSI {p:.2f}, KS {k:.2f})" for f, p, k in
+                                                   drifted[['feature', 'psi', 'ks']].itertuples(index=False))
+                                         or "none"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""Persistent on-disk cache of aggregates, keyed by a dataset fingerprint.
+
+`st.cache_data` lives in process memory, so every deploy or restart starts
+cold. `CachedEngine` writes each aggregate through to Parquet under
+`.udise_cache/<source>/<scope>/<fingerprint>/`, where the fingerprint is a
+content hash of the files behind the scope: one state partition of the
+df_main store for queries filtered to a state, otherwise all files of the
+source (the store or CSV, or preprocessed_prompt2.parquet). When those files
+change the fingerprint changes, new entries go to a new directory and the
+stale one is removed, so a delta ingest that rewrites a few state partitions
+(`udise.delta`) keeps every other state's entries. Each entry records the
+call that produced it, so `refresh()` can recompute a stale scope eagerly.
+
+    python -m udise.diskcache --warm    # precompute every page's default view
+"""
+import glob
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from udise import metrics, store
+from udise.schema import MAIN_CSV, TRENDS_PARQUET
+
+CACHE_DIR = os.environ.get('UDISE_CACHE_DIR', '.udise_cache')
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECK_INTERVAL = 5.0  # seconds between stat checks of the source files
+
+
+# --------------------------
+# FINGERPRINTS
+# --------------------------
+def source_files(source, state="All"):
+    if source == 'trends':
+        return [TRENDS_PARQUET]
+    if not store.has_store():
+        return [MAIN_CSV]
+    if state != "All":
+        folder = store.partitions().get(state)
+        return sorted(glob.glob(os.path.join(folder, '*.parquet'))) if folder else []
+    return sorted(glob.glob(store.store_glob(), recursive=True))
+
+
+def scope(source, state="All"):
+    """Cache scope of a query: its state partition, or the whole source."""
+    if source == 'main' and state != "All" and store.has_store():
+        return state
+    return "All"
+
+
+def file_digest(path):
+    """blake2b hex digest of a file's content, read a megabyte at a time."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Fingerprints:
+    """Content fingerprints per source.
+
+    File digests are remembered against (size, mtime) in the cache directory,
+    so a restart with unchanged data does not re-read gigabytes of input.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self._index_path = os.path.join(cache_dir, 'fingerprints.json')
+        self._lock = threading.Lock()
+        self._current = {}  # source -> (checked_at, fingerprint)
+        try:
+            with open(self._index_path) as f:
+                self._digests = json.load(f)
+        except (OSError, ValueError):
+            self._digests = {}
+
+    def _digest(self, path):
+        st = os.stat(path)
+        known = self._digests.get(path)
+        if known and known[:2] == [st.st_size, st.st_mtime_ns]:
+            return known[2], False
+        digest = file_digest(path)
+        self._digests[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest, True
+
+    def __call__(self, source, state="All"):
+        with self._lock:
+            checked_at, fp = self._current.get((source, state), (0.0, None))
+            if fp is not None and time.monotonic() - checked_at < CHECK_INTERVAL:
+                return fp
+            h = hashlib.blake2b(digest_size=12)
+            changed = False
+            for path in source_files(source, state):
+                if not os.path.exists(path):
+                    continue
+                digest, new = self._digest(path)
+                changed |= new
+                h.update(f"{os.path.relpath(path)}:{digest};".encode())
+            fp = h.hexdigest()
+            self._current[(source, state)] = (time.monotonic(), fp)
+            if changed:
+                os.makedirs(os.path.dirname(self._index_path), exist_ok=True)
+                tmp = self._index_path + '.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump(self._digests, f)
+                os.replace(tmp, self._index_path)
+            return fp
+
+
+# --------------------------
+# CACHED ENGINE
+# --------------------------
+CALL_META = b'udise.call'  # pickled (method, *args) stored with each entry
+
+
+def _key(*parts):
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def _scope_dir(state):
+    return '_all' if state == "All" else 'state=' + quote(state, safe='')
+
+
+class CachedEngine:
+    """Write-through disk cache in front of any engine."""
+
+    def __init__(self, engine, cache_dir=CACHE_DIR):
+        self.engine = engine
+        self.name = engine.name
+        self._dir = cache_dir
+        self.fingerprint = Fingerprints(cache_dir)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _folder(self, source, state):
+        return os.path.join(self._dir, source, _scope_dir(state))
+
+    def _entry(self, source, key, state="All"):
+        fp = self.fingerprint(source, state)
+        folder = os.path.join(self._folder(source, state), fp)
+        if not os.path.isdir(folder):
+            os.makedirs(folder, exist_ok=True)
+            self._prune(source, state, keep=fp)
+        return os.path.join(folder, key + '.parquet')
+
+    def _prune(self, source, state, keep):
+        for old in glob.glob(os.path.join(self._folder(source, state), '*')):
+            if os.path.basename(old) != keep:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def _compute(self, call):
+        method, *args = call
+        if method == 'distinct':
+            column, source = args
+            return pd.DataFrame({column: self.engine.distinct(column, source)})
+        return self.engine.aggregate(*args)
+
+    def _write(self, path, df, call):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            meta = dict(table.schema.metadata or {})
+            meta[CALL_META] = pickle.dumps(call)
+            pq.write_table(table.replace_schema_metadata(meta), tmp)
+            os.replace(tmp, path)
+        except (OSError, ValueError, TypeError, pa.ArrowException):
+            # Unserialisable results are still returned, just not persisted
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _cached(self, path, call):
+        with metrics.span('disk') as s:
+            try:
+                df = pd.read_parquet(path)
+                self.stats['hits'] += 1
+                s.cache = 'hit'
+                return df
+            except (OSError, ValueError):
+                pass
+            self.stats['misses'] += 1
+            s.cache = 'miss'
+        df = self._compute(call)
+        self._write(path, df, call)
+        return df
+
+    def aggregate(self, query):
+        state = scope(query.source, query.filters.state)
+        path = self._entry(query.source, _key('aggregate', query), state)
+        return self._cached(path, ('aggregate', query))
+
+    def distinct(self, column, source='main'):
+        path = self._entry(source, _key('distinct', column))
+        return self._cached(path, ('distinct', column, source))[column].tolist()
+
+    def frame(self, filters, columns, source='main', sample=None):
+        return self.engine.frame(filters, columns, source, sample)
+
+    def refresh(self, states, districts=(), source='main'):
+        """Recompute the stale entries of the national scope and of `states`.
+
+        Entries filtered to a district outside `districts` ((state, district)
+        pairs) are carried over unchanged instead of recomputed. Returns
+        (recomputed, carried) counts.
+        """
+        touched = {district for _, district in districts}
+        recomputed = carried = 0
+        for state in ["All", *sorted(states)]:
+            fp = self.fingerprint(source, state)
+            current = os.path.join(self._folder(source, state), fp)
+            for old in glob.glob(os.path.join(self._folder(source, state), '*')):
+                if os.path.basename(old) == fp:
+                    continue
+                for path in glob.glob(os.path.join(old, '*.parquet')):
+                    try:
+                        call = pickle.loads(pq.read_schema(path).metadata[CALL_META])
+                    except (OSError, KeyError, TypeError, ValueError, pa.ArrowException):
+                        continue  # entries written before calls were recorded
+                    target = os.path.join(current, os.path.basename(path))
+                    os.makedirs(current, exist_ok=True)
+                    district = call[1].filters.district if call[0] == 'aggregate' else "All"
+                    if district != "All" and district not in touched:
+                        shutil.copyfile(path, target)
+                        carried += 1
+                    else:
+                        self._write(target, self._compute(call), call)
+                        recomputed += 1
+            if os.path.isdir(current):
+                self._prune(source, state, keep=fp)
+        return recomputed, carried
+
+
+# --------------------------
+# WARM-UP
+# --------------------------
+def analytics_pages(root=APP_ROOT):
+    """Page scripts that read through the shared query layer."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(root, '*.py'))):
+        with open(path, encoding='utf-8') as f:
+            if 'from udise.app import' in f.read():
+                pages.append(path)
+    return pages
+
+
+def warm(root=APP_ROOT, timeout=600):
+    """Run every analytics page once with its default ("All") filters."""
+    from streamlit.testing.v1 import AppTest
+
+    for path in analytics_pages(root):
+        start = time.perf_counter()
+        at = AppTest.from_file(path, default_timeout=timeout).run()
+        status = 'failed: ' + at.exception[0].value if at.exception else 'ok'
+        print(f"{os.path.basename(path)}: {status} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    if '--warm' in sys.argv:
+        warm()
@@ -0,0 +1,303 @@
+"""Feature drift of school data against the data each model was trained on.
+
+The prediction models were trained on one snapshot. `snapshot` records a
+histogram of every model input the school data carries (quantile bins of the
+training data, plus a bin for missing values) in
+$UDISE_DRIFT_DIR/<model>-<version>.json, where the version is a digest of
+the model file, so a retrained model needs a snapshot of its own.
+
+`Monitor` checks new data against a profile as it streams past: each batch
+is binned for every feature at once and added to running counts with a
+single `np.bincount`, so any number of batches costs one pass and
+n_features x bins integers of memory. From the counts it reports per feature
+
+    psi  population stability index, sum((p - q) * ln(p / q)) over the bins
+    ks   Kolmogorov-Smirnov distance between the binned distributions
+
+and flags a feature when PSI reaches PSI_DRIFT or KS exceeds its 1% critical
+value for the two sample sizes.
+
+    python -m udise.drift snapshot            # profile the current data for every model
+    python -m udise.drift check [new.csv]     # drift of a snapshot (default: the store)
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import streamlit as st
+
+from udise import store
+from udise.diskcache import file_digest
+from udise.schema import MAIN_CSV, STORE_DIR
+
+DRIFT_DIR = os.environ.get('UDISE_DRIFT_DIR', 'drift')
+BINS = 20
+BATCH_ROWS = 65_536
+PSI_DRIFT = 0.2  # rule of thumb: < 0.1 stable, 0.1-0.2 moderate shift, >= 0.2 drift
+PSI_WATCH = 0.1
+KS_ALPHA_C = 1.628  # c(alpha) of the two-sample KS test at alpha = 0.01
+RANGE = (0.005, 0.995)  # training quantiles an input should fall between
+EPSILON = 1e-4  # floor on bin shares, so empty bins do not make PSI infinite
+
+# Model file -> inputs that the school data records. Model inputs the data
+# has no column for (furniture, internet, building type, ...) cannot be
+# profiled; 'urban' is encoded from rural_urban as on the pages.
+MODELS = {
+    'xgb_dropout_model.pkl': ['electricity_availability', 'total_class_rooms', 'total_tch', 'trained_comp',
+                              'total_girls_func_toilet', 'library_availability', 'playground_available'],
+    'xgb_retention_model.pkl': ['urban', 'female', 'total_tch', 'trained_comp', 'library_availability',
+                                'electricity_availability'],
+    'infra_score_model.pkl': ['electricity_availability', 'playground_available', 'library_availability',
+                              'total_boys_func_toilet', 'classrooms_in_good_condition'],
+}
+
+
+def _raw(features):
+    return list(dict.fromkeys('rural_urban' if f == 'urban' else f for f in features))
+
+
+def features(table, names):
+    """(n, features) float matrix of an Arrow table; NaN where a value is missing."""
+    cols = []
+    for name in names:
+        if name == 'urban':
+            urban = pc.equal(pc.utf8_trim_whitespace(pc.cast(table['rural_urban'], pa.string())), 'Urban')
+            cols.append(pc.fill_null(urban, False).to_numpy(zero_copy_only=False).astype(float))
+        else:
+            column = store.to_numeric(table[name].combine_chunks())
+            cols.append(pc.cast(column, pa.float64()).to_numpy(zero_copy_only=False))
+    return np.column_stack(cols) if cols else np.empty((table.num_rows, 0))
+
+
+def batches(names, path=None, store_dir=STORE_DIR):
+    """Feature matrices of about BATCH_ROWS schools each, streamed from a CSV or the store."""
+    raw = _raw(names)
+    if path is None and store.has_store(store_dir):
+        reader = ds.dataset(store_dir, format='parquet', partitioning=store.PARTITIONING).to_batches(
+            columns=raw, batch_size=BATCH_ROWS)
+    else:
+        # Read as text and parse per batch: types inferred from the first block may not hold later
+        reader = pacsv.open_csv(path or MAIN_CSV, convert_options=pacsv.ConvertOptions(
+            include_columns=raw, column_types={c: pa.string() for c in raw}, strings_can_be_null=True))
+    pending, rows = [], 0
+    for batch in reader:
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= BATCH_ROWS:
+            yield features(pa.Table.from_batches(pending), names)
+            pending, rows = [], 0
+    if rows:
+        yield features(pa.Table.from_batches(pending), names)
+
+
+# --------------------------
+# PROFILES
+# --------------------------
+def model_version(model_path):
+    return file_digest(model_path)[:12]
+
+
+def profile_path(model_path, version, drift_dir=DRIFT_DIR):
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(drift_dir, f"{stem}-{version}.json")
+
+
+class Profile:
+    """Training histograms of a model's inputs: inner bin edges and counts per feature."""
+
+    def __init__(self, features, edges, counts, ranges, model=None, version=None):
+        self.features = list(features)
+        self.edges = [np.asarray(e, dtype=float) for e in edges]
+        self.counts = np.asarray(counts, dtype=np.int64)  # (features, BINS + 1); last bin = missing
+        self.ranges = ranges  # feature -> (low, high) training quantiles
+        self.model, self.version = model, version
+
+    @classmethod
+    def fit(cls, sample, features, model=None, version=None):
+        """Quantile edges and counts of the (n, features) training matrix."""
+        edges = []
+        for j in range(sample.shape[1]):
+            values = sample[:, j][~np.isnan(sample[:, j])]
+            inner = np.quantile(values, np.linspace(0, 1, BINS + 1)[1:-1]) if len(values) else []
+            edges.append(np.unique(inner))  # ties (e.g. yes/no features) collapse bins
+        profile = cls(features, edges, np.zeros((len(features), BINS + 1), dtype=np.int64), {}, model, version)
+        profile.counts = profile.histogram(sample)
+        profile.ranges = {f: [float(v) for v in np.nanquantile(sample[:, j], RANGE)]
+                          for j, f in enumerate(features) if not np.isnan(sample[:, j]).all()}
+        return profile
+
+    def histogram(self, x):
+        """Bin counts of an (n, features) matrix against the profile's edges, in one bincount."""
+        idx = np.empty(x.shape, dtype=np.intp)
+        for j, edges in enumerate(self.edges):
+            idx[:, j] = np.searchsorted(edges, x[:, j], side='right')
+        idx[np.isnan(x)] = BINS  # missing values
+        idx += np.arange(len(self.edges)) * (BINS + 1)
+        return np.bincount(idx.ravel(), minlength=len(self.edges) * (BINS + 1)).reshape(len(self.edges), BINS + 1)
+
+    def out_of_range(self, inputs):
+        """Features of `inputs` ({feature: value}) outside the bulk of the training data."""
+        return {f: self.ranges[f] for f, v in inputs.items()
+                if f in self.ranges and not self.ranges[f][0] <= v <= self.ranges[f][1]}
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'model': self.model, 'version': self.version, 'features': self.features,
+                       'edges': [e.tolist() for e in self.edges], 'counts': self.counts.tolist(),
+                       'ranges': self.ranges}, f)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path) as f:
+                spec = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(spec['features'], spec['edges'], spec['counts'], spec['ranges'], spec['model'], spec['version'])
+
+
+def load_profile(model_path, drift_dir=DRIFT_DIR):
+    """Profile of the model file as it is now; None if missing or taken for another version."""
+    if not os.path.exists(model_path):
+        return None
+    return Profile.load(profile_path(model_path, model_version(model_path), drift_dir))
+
+
+def snapshot(models=MODELS, path=None, drift_dir=DRIFT_DIR):
+    """Profile the data (CSV `path`, default the store) for every model file present."""
+    present = {m: f for m, f in models.items() if os.path.exists(m)}
+    names = list(dict.fromkeys(f for feats in present.values() for f in feats))
+    if not names:
+        return {}
+    data = np.vstack(list(batches(names, path)))
+    written = {}
+    for model_path, feats in present.items():
+        version = model_version(model_path)
+        sample = data[:, [names.index(f) for f in feats]]
+        target = profile_path(model_path, version, drift_dir)
+        Profile.fit(sample, feats, model_path, version).save(target)
+        written[model_path] = target
+    return written
+
+
+# --------------------------
+# DRIFT
+# --------------------------
+class Monitor:
+    """Running histograms of new data against a profile."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.counts = np.zeros_like(profile.counts)
+
+    def update(self, x):
+        self.counts += self.profile.histogram(x)
+        return self
+
+    def report(self):
+        """Per-feature PSI and KS of everything seen so far, drifting features first."""
+        expected, actual = self.profile.counts, self.counts
+        n_exp, n_act = expected.sum(axis=1), actual.sum(axis=1)
+        p = np.maximum(expected / np.maximum(n_exp, 1)[:, None], EPSILON)
+        q = np.maximum(actual / np.maximum(n_act, 1)[:, None], EPSILON)
+        psi = ((q - p) * np.log(q / p)).sum(axis=1)
+        # KS over the present values only; the missing bin counts towards PSI
+        m_exp, m_act = expected[:, :BINS].sum(axis=1), actual[:, :BINS].sum(axis=1)
+        cdf_exp = expected[:, :BINS].cumsum(axis=1) / np.maximum(m_exp, 1)[:, None]
+        cdf_act = actual[:, :BINS].cumsum(axis=1) / np.maximum(m_act, 1)[:, None]
+        ks = np.abs(cdf_exp - cdf_act).max(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            critical = KS_ALPHA_C * np.sqrt((m_exp + m_act) / (m_exp * m_act))
+        report = pd.DataFrame({
+            'feature': self.profile.features, 'rows': n_act, 'psi': psi, 'ks': ks, 'ks_critical': critical,
+            'missing': actual[:, BINS] / np.maximum(n_act, 1),
+        })
+        report['status'] = np.select(
+            [(n_act == 0), (psi >= PSI_DRIFT) | (ks > critical), psi >= PSI_WATCH],
+            ['no data', 'drift', 'watch'], 'stable')
+        order = report['status'].map({'drift': 0, 'watch': 1, 'stable': 2, 'no data': 3})
+        return report.assign(_order=order).sort_values(['_order', 'psi'], ascending=[True, False]) \
+            .drop(columns='_order').reset_index(drop=True)
+
+
+def check(profile, path=None, store_dir=STORE_DIR):
+    """Drift report of a CSV snapshot (default: the store) against `profile`, streamed."""
+    monitor = Monitor(profile)
+    for x in batches(profile.features, path, store_dir):
+        monitor.update(x)
+    return monitor.report()
+
+
+# --------------------------
+# PAGES
+# --------------------------
+@st.cache_resource(show_spinner=False)
+def _version(model_path, mtime):
+    return model_version(model_path)
+
+
+@st.cache_resource(show_spinner=False)
+def _profile(path, mtime):
+    return Profile.load(path)
+
+
+def profile(model_path):
+    """Training profile of the model file as deployed, re-read only when a file changes."""
+    try:
+        path = profile_path(model_path, _version(model_path, os.stat(model_path).st_mtime_ns))
+        return _profile(path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+
+
+def out_of_range(model_path, inputs):
+    """Inputs ({feature: value}) outside the bulk of the model's training data."""
+    p = profile(model_path)
+    return p.out_of_range(inputs) if p else {}
+
+
+@st.cache_data(show_spinner="Checking the data for drift...")
+def _current_drift(model_path, version, signature):
+    return check(profile(model_path))
+
+
+def current_drift(model_path):
+    """Drift report of the school data as it is now; None without a profile."""
+    p = profile(model_path)
+    return _current_drift(model_path, p.version, store.signature()) if p else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['snapshot', 'check'])
+    parser.add_argument('csv', nargs='?', help='data in the df_main.csv layout (default: the store, or df_main.csv)')
+    parser.add_argument('--out', default=DRIFT_DIR)
+    args = parser.parse_args()
+    if args.command == 'snapshot':
+        written = snapshot(path=args.csv, drift_dir=args.out)
+        if not written:
+            raise SystemExit(f"No model files found ({', '.join(MODELS)})")
+        for model_path, target in written.items():
+            print(f"{model_path}: {target}")
+        return
+    pd.set_option('display.width', 120)
+    for model_path in MODELS:
+        profile = load_profile(model_path, args.out)
+        if profile is None:
+            print(f"{model_path}: no profile for this model version (run `python -m udise.drift snapshot`)")
+            continue
+        report = check(profile, args.csv)
+        drifted = report.loc[report['status'] == 'drift', 'feature'].tolist()
+        print(f"\n{model_path} ({profile.version}): " + (f"drift in {', '.join(drifted)}" if drifted else "no drift"))
+        print(report.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == '__main__':
+    main()
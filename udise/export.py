@@ -0,0 +1,267 @@
+"""Streaming export of the filtered school rows and of the page aggregates.
+
+The school list for "All states" is too big to build as one DataFrame or
+one CSV string per session. Here the rows are scanned from the partitioned
+store in batches of BATCH_ROWS (whole states are pruned by the filter, as in
+the DuckDB engine), each batch is encoded as it arrives and the encoded
+bytes are handed on as a stream of chunks, so at most one batch of rows and
+one Parquet row group are held at a time. Without a store the CSV is read
+and cleaned block by block instead.
+
+The same generator feeds the command line, the API (`GET /export`, sent
+with chunked transfer encoding) and the download buttons in the sidebar of
+the analytics pages. Those are built when the button is clicked rather than
+on every rerun, spooled to a temporary file while they are encoded and
+handed to Streamlit as bytes, one of the types its deferred download
+accepts; `--check` builds both downloads that way and reads them back.
+
+    python -m udise.export [--state ..] [--district ..] [--rural-urban Rural] [--segment 2]
+                           [--columns a,b] [--format csv|parquet] out.csv
+    python -m udise.export --check [--state ..]   # exits 1 if a download cannot be served
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from udise import store
+from udise.query import Filters
+from udise.schema import MAIN_CSV, ROW_HASH, STORE_DIR, clean
+
+BATCH_ROWS = 64 * 1024  # rows scanned and encoded at a time
+SPOOL_BYTES = 32 * 1024 * 1024  # a download is kept in memory up to this size, then on disk
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+class _Sink:
+    """Write-only file whose bytes are taken out as they are written."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self):
+        data, self._parts = b''.join(self._parts), []
+        return data
+
+
+# --------------------------
+# ROWS
+# --------------------------
+def _expression(filters, names):
+    expression = None
+    for col, op, value in filters.predicates():
+        if col not in names:
+            continue  # e.g. a segment filter before segmentation has written the column
+        term = ds.field(col).isin(list(value)) if op == 'in' else ds.field(col) == value
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _csv_batches(filters, columns, csv_path):
+    # Read as text and cleaned a block at a time: types inferred from the first block may not hold later
+    names = pacsv.open_csv(csv_path).schema.names
+    reader = pacsv.open_csv(csv_path, read_options=pacsv.ReadOptions(block_size=BATCH_ROWS * 256),
+                            convert_options=pacsv.ConvertOptions(
+                                column_types={c: pa.string() for c in names}, strings_can_be_null=True))
+    schema = None
+    for batch in reader:
+        df = clean(batch.to_pandas())
+        mask = pd.Series(True, index=df.index)
+        for col, op, value in filters.predicates():
+            if col in df.columns:
+                mask &= df[col].isin(value) if op == 'in' else df[col] == value
+        df = df.loc[mask, columns or [c for c in df.columns if c != ROW_HASH]]
+        table = store.to_table(df.reset_index(drop=True), schema)
+        schema = schema or table.schema
+        yield from table.to_batches()
+
+
+def scan(filters=Filters(), columns=None, store_dir=STORE_DIR, csv_path=MAIN_CSV):
+    """(schema, batches) of the rows matching `filters`, from the store if built, else from the CSV."""
+    if not store.has_store(store_dir):
+        batches = _csv_batches(filters, columns, csv_path)
+        first = next(batches, None)
+        if first is None:
+            return pa.schema([(c, pa.string()) for c in columns or []]), iter(())
+        return first.schema, _chain(first, batches)
+    dataset = ds.dataset(store_dir, format='parquet', partitioning=store.PARTITIONING)
+    names = dataset.schema.names
+    columns = list(columns or [c for c in names if c != ROW_HASH])
+    unknown = [c for c in columns if c not in names]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    schema = pa.schema([dataset.schema.field(c) for c in columns])
+    # Little read-ahead: the consumer is a network client or a disk, not the CPU
+    return schema, dataset.to_batches(columns=columns, filter=_expression(filters, names), batch_size=BATCH_ROWS,
+                                      batch_readahead=2, fragment_readahead=1)
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+# --------------------------
+# ENCODING
+# --------------------------
+def encode(schema, batches, fmt='csv'):
+    """Bytes of `batches` written as CSV or Parquet, yielded a batch (or a row group) at a time."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    sink = _Sink()
+    out = pa.PythonFile(sink, mode='w')
+    if fmt == 'csv':
+        writer = pacsv.CSVWriter(out, schema)
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+    else:
+        writer = pq.ParquetWriter(out, schema, compression='zstd')
+        pending, rows = [], 0
+        for batch in batches:
+            pending.append(batch)
+            rows += batch.num_rows
+            if rows >= BATCH_ROWS:  # small scan batches would make small row groups
+                writer.write_table(pa.Table.from_batches(pending, schema))
+                pending, rows = [], 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema))
+    writer.close()
+    yield sink.drain()
+
+
+def rows(filters=Filters(), columns=None, fmt='csv', store_dir=STORE_DIR, csv_path=MAIN_CSV):
+    """Chunks of the filtered school rows encoded as `fmt`."""
+    schema, batches = scan(filters, columns, store_dir, csv_path)
+    return encode(schema, batches, fmt)
+
+
+def aggregates(results, fmt='csv'):
+    """Chunks of (query, result) pairs as one long table: group keys, measure, agg, value."""
+    frames = []
+    for query, df in results:
+        by = list(query.by)
+        long = df.melt(id_vars=by, value_vars=[c for c, _ in query.measures], var_name='measure')
+        long.insert(0, 'group_by', '+'.join(by) or 'total')
+        long['agg'] = long['measure'].map(dict(query.measures))
+        frames.append(long)
+    table = store.to_table(pd.concat(frames, ignore_index=True) if frames else
+                           pd.DataFrame(columns=['group_by', 'measure', 'value', 'agg']))
+    return encode(table.schema, table.to_batches(), fmt)
+
+
+def spool(chunks):
+    """The chunks as bytes, kept in memory up to SPOOL_BYTES and on disk beyond while they are encoded."""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.seek(0)
+        return f.read()
+
+
+def file_name(kind, filters, fmt):
+    parts = [kind] + [str(v) for v in (filters.state, filters.district) if v != "All"]
+    if filters.segment is not None:
+        parts.append(f"segment{filters.segment}")
+    return '_'.join(p.replace(' ', '-').replace('/', '-') for p in parts) + f".{fmt}"
+
+
+# --------------------------
+# CHECK
+# --------------------------
+def _read(data, fmt):
+    return pd.read_csv(io.BytesIO(data)) if fmt == 'csv' else pq.read_table(io.BytesIO(data)).to_pandas()
+
+
+def check(filters=Filters()):
+    """Build both sidebar downloads as the pages do and convert them as Streamlit does; the problems found."""
+    from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+    from udise.query import get_engine, make_query
+
+    engine = get_engine()
+    queries = [make_query(filters, 'state', total_tch='sum', total_func_toilet='mean')]
+    problems = []
+    for fmt in FORMATS:
+        downloads = {
+            'schools': lambda: spool(rows(filters, fmt=fmt)),
+            'aggregates': lambda: spool(aggregates([(q, engine.aggregate(q)) for q in queries], fmt)),
+        }
+        for kind, download in downloads.items():
+            data = download()
+            try:
+                data, _ = convert_data_to_bytes_and_infer_mime(data, TypeError(f"unsupported type {type(data)}"))
+                print(f"{kind} {fmt}: {len(data) / 1e6:,.1f} MB, {len(_read(data, fmt)):,} rows")
+            except Exception as e:
+                problems.append(f"{kind} {fmt}: {e}")
+    return problems
+
+
+# --------------------------
+# COMMAND LINE
+# --------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out', nargs='?', help="output file, or - for stdout")
+    parser.add_argument('--check', action='store_true', help="build the sidebar downloads and read them back")
+    parser.add_argument('--state', default="All")
+    parser.add_argument('--district', default="All")
+    parser.add_argument('--rural-urban', help="comma-separated, e.g. Rural,Urban")
+    parser.add_argument('--segment', type=int)
+    parser.add_argument('--columns', help="comma-separated; default every column")
+    parser.add_argument('--format', choices=list(FORMATS))
+    args = parser.parse_args()
+    if not args.check and not args.out:
+        parser.error("an output file is required")
+    filters = Filters(state=args.state, district=args.district, segment=args.segment,
+                      rural_urban=tuple(args.rural_urban.split(',')) if args.rural_urban else None)
+    if args.check:
+        problems = check(filters)
+        for problem in problems:
+            print(f"FAIL {problem}")
+        sys.exit(1 if problems else 0)
+    fmt = args.format or ('parquet' if args.out.endswith('.parquet') else 'csv')
+    columns = args.columns.split(',') if args.columns else None
+    out = sys.stdout.buffer if args.out == '-' else open(args.out, 'wb')
+    written = 0
+    try:
+        for chunk in rows(filters, columns, fmt):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    if args.out != '-':
+        print(f"Wrote {written / 1e6:,.1f} MB to {os.path.abspath(args.out)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""State and district boundaries for the choropleth tabs.
+
+Boundary files are bundled with the app under $UDISE_GEO_DIR (default geo/),
+simplified ahead of time for each zoom level, so a page never ships more
+vertices than the view can show:
+
+    india     the whole country (national state and district maps)
+    state     one state's districts
+    district  one district, outlined among its state's districts
+
+Build them once from any state and district GeoJSON (for example the
+datameet India boundaries):
+
+    python -m udise.geo states.geojson districts.geojson [--state-field ST_NM] [--district-field DISTRICT]
+
+Features are matched to the data on state and district names, compared
+case- and whitespace-insensitively. Pages get the geometry through
+`udise.app.boundaries`, which loads each file once per process.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+GEO_DIR = os.environ.get('UDISE_GEO_DIR', 'geo')
+LEVELS = {'india': 0.02, 'state': 0.004, 'district': 0.001}  # tolerance in degrees
+KINDS = {'states': ('india',), 'districts': tuple(LEVELS)}  # levels built per kind
+DIGITS = 4  # ~10 m, well below the finest tolerance
+
+
+def name_key(name):
+    return ' '.join(str(name).split()).upper()
+
+
+def feature_id(state, district=None):
+    """Id of a boundary feature: 'STATE' or 'STATE|DISTRICT'."""
+    return name_key(state) if district is None else f"{name_key(state)}|{name_key(district)}"
+
+
+def path(kind, level, geo_dir=GEO_DIR):
+    return os.path.join(geo_dir, f"{kind}_{level}.geojson")
+
+
+# --------------------------
+# SIMPLIFICATION
+# --------------------------
+def simplify(ring, tolerance):
+    """Douglas-Peucker simplification of an (n, 2) coordinate array."""
+    n = len(ring)
+    if n < 3:
+        return ring
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        seg = ring[last] - ring[first]
+        rel = ring[first + 1:last] - ring[first]
+        length = np.hypot(*seg)
+        if length == 0:  # closed ring: distance to the start point
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / length
+        i = int(dist.argmax())
+        if dist[i] > tolerance:
+            mid = first + 1 + i
+            keep[mid] = True
+            stack += [(first, mid), (mid, last)]
+    return ring[keep]
+
+
+def _polygon(rings, tolerance):
+    """Simplified rings of one polygon, or None if its exterior collapses."""
+    out = []
+    for k, ring in enumerate(rings):
+        simple = np.round(simplify(np.asarray(ring, dtype=float), tolerance), DIGITS)
+        if len(simple) < 4:  # a closed ring needs at least a triangle
+            if k == 0:
+                return None
+            continue
+        out.append(simple.tolist())
+    return out
+
+
+def simplify_geometry(geometry, tolerance):
+    polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+    kept = [p for p in (_polygon(rings, tolerance) for rings in polygons) if p]
+    if not kept:
+        # Smaller than the tolerance: keep the largest polygon as it is
+        largest = max(polygons, key=lambda rings: len(rings[0]))
+        kept = [[np.round(np.asarray(r, dtype=float), DIGITS).tolist() for r in largest]]
+    if len(kept) == 1:
+        return {'type': 'Polygon', 'coordinates': kept[0]}
+    return {'type': 'MultiPolygon', 'coordinates': kept}
+
+
+# --------------------------
+# BUILD AND LOAD
+# --------------------------
+def build(src, kind, state_field='ST_NM', district_field='DISTRICT', geo_dir=GEO_DIR):
+    """Write `kind` boundaries from the GeoJSON `src` at every level; returns file sizes."""
+    with open(src, encoding='utf-8') as f:
+        features = json.load(f)['features']
+    os.makedirs(geo_dir, exist_ok=True)
+    sizes = {}
+    for level in KINDS[kind]:
+        tolerance = LEVELS[level]
+        out = []
+        for feature in features:
+            props, geometry = feature['properties'], feature.get('geometry')
+            if not geometry or geometry['type'] not in ('Polygon', 'MultiPolygon'):
+                continue
+            state = props[state_field]
+            district = props[district_field] if kind == 'districts' else None
+            out.append({
+                'type': 'Feature',
+                'id': feature_id(state, district),
+                'properties': {'state': name_key(state), **({'district': name_key(district)} if district else {})},
+                'geometry': simplify_geometry(geometry, tolerance),
+            })
+        target = path(kind, level, geo_dir)
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump({'type': 'FeatureCollection', 'features': out}, f, separators=(',', ':'))
+        sizes[level] = os.path.getsize(target)
+    return sizes
+
+
+def load(kind, level, state="All", geo_dir=GEO_DIR):
+    """Boundaries of `kind` at `level`, limited to one state's features; None if not built."""
+    try:
+        with open(path(kind, level, geo_dir), encoding='utf-8') as f:
+            collection = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state != "All":
+        key = name_key(state)
+        collection['features'] = [f for f in collection['features'] if f['properties']['state'] == key]
+    return collection
+
+
+def view(kind, state="All", district="All"):
+    """(level, state) of the boundary file a map of `kind` needs for the filters."""
+    if kind == 'states' or state == "All":
+        return 'india', "All"
+    return ('district' if district != "All" else 'state'), state
+
+
+# --------------------------
+# FIGURES
+# --------------------------
+def choropleth(geojson, agg, measure, kind, label=None, highlight=None, scale='Blues'):
+    """Choropleth of `agg[measure]` over the features of `geojson`.
+
+    `agg` has a state (and, for districts, a district) column; the feature
+    `highlight` (an id) gets a heavier outline.
+    """
+    import plotly.graph_objects as go
+
+    district = agg['district'] if kind == 'districts' else None
+    ids = [feature_id(s, d) for s, d in zip(agg['state'], district if district is not None else [None] * len(agg))]
+    names = agg['district'] if kind == 'districts' else agg['state']
+    widths = [2.5 if i == highlight else 0.4 for i in ids]
+    fig = go.Figure(go.Choropleth(
+        geojson=geojson, featureidkey='id', locations=ids, z=agg[measure], text=names,
+        colorscale=scale, marker_line_width=widths, marker_line_color='#333',
+        colorbar=dict(title=label or measure),
+        hovertemplate='%{text}: %{z:,.3g}<extra></extra>',
+    ))
+    fig.update_geos(fitbounds='locations', visible=False)
+    fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), height=600)
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('states', help='state boundaries (GeoJSON)')
+    parser.add_argument('districts', help='district boundaries (GeoJSON)')
+    parser.add_argument('--state-field', default='ST_NM')
+    parser.add_argument('--district-field', default='DISTRICT')
+    parser.add_argument('--out', default=GEO_DIR)
+    args = parser.parse_args()
+    for kind, src in zip(KINDS, (args.states, args.districts)):
+        sizes = build(src, kind, args.state_field, args.district_field, args.out)
+        print(f"{kind}: " + ', '.join(f"{level} {size / 1024:,.0f} KiB" for level, size in sizes.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Import-time budget per page.
+
+Each page's module-level imports are replayed in a fresh interpreter and
+timed, so a new eager import of a heavy library shows up as a budget
+failure instead of a slower first paint. Imports made through
+`udise.lazy.lazy_import` are not counted: they are paid on first use.
+
+    python -m udise.importbudget        # exits 1 if any page is over budget
+"""
+import ast
+import glob
+import os
+import subprocess
+import sys
+
+from udise.diskcache import APP_ROOT
+
+DEFAULT_BUDGET_MS = 1500
+PAGE_BUDGETS_MS = {
+    'Home.py': 1000,
+    '🧠 ML_Model.py': 1000,
+    '🧠 ML_Model_2.py': 1000,
+}
+
+TIMER = """
+import time
+_start = time.perf_counter()
+{imports}
+print(round((time.perf_counter() - _start) * 1000, 1))
+"""
+
+
+def page_imports(path):
+    """Module-level import statements of a page, and the modules they name."""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    tree = ast.parse(source)
+    nodes = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    modules = set()
+    for n in nodes:
+        modules.update([a.name for a in n.names] if isinstance(n, ast.Import) else [n.module])
+    return '\n'.join(ast.get_source_segment(source, n) for n in nodes), modules
+
+
+def heaviest(stderr, modules, n=3):
+    """The page's imports with the largest cumulative time from -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() in modules:
+            rows.append((int(cumulative), name.strip()))
+    return [f"{name} {us / 1000:.0f}ms" for us, name in sorted(rows, reverse=True)[:n]]
+
+
+def measure(path):
+    imports, modules = page_imports(path)
+    code = TIMER.format(imports=imports)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=APP_ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return float(proc.stdout.strip().splitlines()[-1]), heaviest(proc.stderr, modules)
+
+
+def main():
+    over = False
+    for path in sorted(glob.glob(os.path.join(APP_ROOT, '*.py'))):
+        name = os.path.basename(path)
+        budget = PAGE_BUDGETS_MS.get(name, DEFAULT_BUDGET_MS)
+        try:
+            ms, top = measure(path)
+        except RuntimeError as e:
+            print(f"{name}: import failed ({e})")
+            over = True
+            continue
+        status = 'ok' if ms <= budget else 'OVER'
+        over |= ms > budget
+        print(f"{name}: {ms:.0f}ms / {budget}ms {status}  [{', '.join(top)}]")
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
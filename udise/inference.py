@@ -0,0 +1,224 @@
+"""Shared prediction scheduler: concurrent requests run as one batch per model.
+
+Every session's Predict button, and every API request, used to make its own
+single-row `predict` call, and with many sessions the fixed cost per call
+(input conversion, the booster's own setup) dominated. Here each model has
+a queue drained by one worker thread: the worker takes the first request,
+keeps collecting for up to MAX_WAIT seconds or until MAX_BATCH rows are
+waiting, runs a single vectorised `predict` over all of them and hands each
+caller its own rows back. A lone request waits at most MAX_WAIT. Inputs are
+converted to numbers on submit, so a bad value fails only the request that
+sent it; should a batch fail anyway, its requests are retried one by one.
+
+Per model the scheduler counts requests, rows and batches and times the
+queue wait of each request and the model call of each batch; the totals go
+to the Prometheus file with the rerun metrics (`udise.metrics`), and
+`stats()` summarises throughput and queue latency percentiles.
+
+    python -m udise.inference --threads 64 --requests 5000    # batched vs one call per request
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from udise import metrics, models
+
+MAX_BATCH = int(os.environ.get('UDISE_PREDICT_BATCH', 256))  # rows per model call
+MAX_WAIT = float(os.environ.get('UDISE_PREDICT_WAIT_MS', 2)) / 1000  # seconds a batch stays open
+WINDOW = 10_000  # recent queue waits kept for percentiles
+
+
+def as_frame(name, rows):
+    """Input rows as a DataFrame with the model's inputs as columns.
+
+    `rows` is a DataFrame, records, lists of values in the model's input order,
+    {'input': one such list or a list of them}, or {input_name: value or [values]}.
+    """
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    if isinstance(rows, dict) and list(rows) == ['input']:
+        rows = rows['input']
+        if not isinstance(rows, (list, tuple)) or not rows:
+            raise ValueError("'input' must be a list of values in the model's input order, or a list of such lists")
+        if not isinstance(rows[0], (list, tuple, dict)):
+            rows = [rows]
+    if isinstance(rows, dict):
+        return pd.DataFrame({k: v if isinstance(v, (list, tuple, np.ndarray)) else [v] for k, v in rows.items()})
+    rows = list(rows)
+    if rows and not isinstance(rows[0], dict):
+        return pd.DataFrame(rows, columns=list(models.MODELS[name].features))
+    return pd.DataFrame(rows)
+
+
+class Batcher:
+    """Queue and worker thread of one model."""
+
+    def __init__(self, name, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.name = name
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.started = time.monotonic()
+        self.counts = {'requests': 0, 'rows': 0, 'batches': 0}
+        self.batch_seconds = 0.0
+        self.waits = deque(maxlen=WINDOW)
+
+    def submit(self, rows):
+        """Future of the predictions for `rows`, a DataFrame with the model's inputs."""
+        features = list(models.MODELS[self.name].features)
+        missing = [f for f in features if f not in rows.columns]
+        if missing:
+            raise ValueError(f"Missing inputs for {self.name}: {', '.join(missing)}")
+        try:  # queued as a float array: a bad value fails here, in its own request
+            values = (rows if list(rows.columns) == features else rows[features]).to_numpy(dtype=float)
+        except (TypeError, ValueError):
+            invalid = [f for f in features if pd.to_numeric(rows[f], errors='coerce').isna().gt(rows[f].isna()).any()]
+            raise ValueError(f"Inputs of {self.name} that are not numbers: {', '.join(invalid) or 'unknown'}") from None
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'udise-predict-{self.name}', daemon=True)
+                self._thread.start()
+        self._queue.put((values, future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _frame(self, values):
+        return pd.DataFrame(values, columns=list(models.MODELS[self.name].features))
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            waits = [start - submitted for _, _, submitted in batch]
+            try:
+                values = batch[0][0] if len(batch) == 1 else np.concatenate([v for v, _, _ in batch])
+                predictions = models.predict(self.name, self._frame(values))
+            except Exception:
+                predictions = None
+            if predictions is None:  # one by one, so only the request at fault gets the error
+                for values, future, _ in batch:
+                    try:
+                        future.set_result(models.predict(self.name, self._frame(values)))
+                    except Exception as e:
+                        future.set_exception(e)
+            else:
+                offset = 0
+                for rows, future, _ in batch:
+                    future.set_result(predictions[offset:offset + len(rows)])
+                    offset += len(rows)
+            seconds = time.perf_counter() - start
+            self._record(len(batch), sum(len(r) for r, _, _ in batch), waits, seconds)
+
+    def _record(self, requests, rows, waits, seconds):
+        with self._lock:
+            self.counts['requests'] += requests
+            self.counts['rows'] += rows
+            self.counts['batches'] += 1
+            self.batch_seconds += seconds
+            self.waits.extend(waits)
+        metrics.REGISTRY.record_inference(self.name, requests, rows, sum(waits), seconds)
+        metrics.REGISTRY.maybe_export()
+
+    def stats(self):
+        with self._lock:
+            counts, waits, busy = dict(self.counts), np.array(self.waits), self.batch_seconds
+        elapsed = time.monotonic() - self.started
+        p50, p95, p99 = np.percentile(waits, [50, 95, 99]) * 1000 if len(waits) else (np.nan,) * 3
+        return {
+            'model': self.name, **counts,
+            'rows_per_batch': counts['rows'] / counts['batches'] if counts['batches'] else np.nan,
+            'rows_per_second': counts['rows'] / elapsed if elapsed else np.nan,
+            'predict_ms_per_batch': busy / counts['batches'] * 1000 if counts['batches'] else np.nan,
+            'queue_ms_p50': p50, 'queue_ms_p95': p95, 'queue_ms_p99': p99,
+        }
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def batcher(name):
+    if name not in models.MODELS:
+        raise KeyError(f"Unknown model {name!r}; expected one of {', '.join(models.MODELS)}")
+    with _batchers_lock:
+        if name not in _batchers:
+            _batchers[name] = Batcher(name)
+        return _batchers[name]
+
+
+def predict(name, rows):
+    """Predictions of model `name` for `rows` (see `as_frame`), batched with concurrent callers."""
+    return batcher(name).submit(as_frame(name, rows)).result()
+
+
+def warm(*names):
+    """Load the models now rather than inside the first batch."""
+    for name in names or models.MODELS:
+        models.load(name)
+
+
+def stats():
+    """Throughput and queue latency per model served so far."""
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    return pd.DataFrame([b.stats() for b in batchers])
+
+
+# --------------------------
+# BENCHMARK
+# --------------------------
+def _example(name):
+    return [[1] * len(models.MODELS[name].features)]
+
+
+def bench(name, threads, requests):
+    """(direct, batched) requests per second for single-row requests from `threads` threads."""
+    rows = as_frame(name, _example(name))
+    models.predict(name, rows)  # load outside the timing
+    results = []
+    for call in (lambda: models.predict(name, rows), lambda: predict(name, rows)):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda _: call(), range(requests)))
+        results.append(requests / (time.perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='dropout', choices=list(models.MODELS))
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+    direct, batched = bench(args.model, args.threads, args.requests)
+    print(f"{args.model}, {args.threads} threads: {direct:,.0f} req/s one call each, {batched:,.0f} req/s batched")
+    print(stats().to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Deferred imports for the page scripts.
+
+    px = lazy_import('plotly.express')
+
+binds `px` immediately but imports plotly only when the first attribute is
+used, so a page can draw its title, sidebar and metrics before paying for
+the plotting stack (or the model libraries pulled in by unpickling).
+"""
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    return LazyModule(name)
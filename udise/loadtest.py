@@ -0,0 +1,161 @@
+"""Headless concurrent-session load test for the dashboards.
+
+Each simulated session drives a real page script through Streamlit's
+AppTest: one initial run, then a stream of sidebar clicks (state, district,
+Rural/Urban, and any in-page selectbox), each followed by a rerun, with a
+short think time in between. All sessions share the process-wide engine,
+query service and caches, as they would on a server. Tabs are not clicked:
+Streamlit executes every tab on each rerun, so a tab switch costs nothing.
+
+Reported per page: rerun latency p50/p95/p99, peak RSS, the in-memory
+(st.cache_data) and disk cache hit rates, and how many engine requests were
+coalesced by the query service.
+
+    python -m udise.loadtest --sessions 50 --clicks 20 [--pages Teacher Infrastructure]
+"""
+import argparse
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
+
+from udise.diskcache import analytics_pages
+
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux reports KiB
+
+
+@contextmanager
+def shared_runtime():
+    """One runtime for every concurrent AppTest.
+
+    Each AppTest run installs its own mock runtime in a process global and
+    clears it when it finishes, which breaks any other session mid-run. A
+    server has exactly one runtime, so hand every session the same one.
+    """
+    from streamlit import runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    shared = mock.MagicMock(spec=runtime.Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.dataframe_source_mgr = DataframeSourceManager()
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    with mock.patch.object(runtime, 'get_instance', return_value=shared), \
+            mock.patch.object(runtime, 'exists', return_value=True):
+        yield
+
+
+def click(at, rng):
+    """Change one random selectbox or multiselect; False if the page has none."""
+    widgets = list(at.selectbox) + list(at.multiselect)
+    if not widgets:
+        return False
+    widget = rng.choice(widgets)
+    options = list(widget.options)
+    if hasattr(widget, 'select') and not hasattr(widget, 'unselect'):  # selectbox
+        choice = options[0] if options[0] == "All" and rng.random() < 0.4 else rng.choice(options)
+        widget.select(choice)
+    else:
+        widget.set_value(rng.sample(options, rng.randint(1, len(options))))
+    return True
+
+
+def run_session(path, clicks, think, seed, latencies, errors):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(path, default_timeout=600)
+    for step in range(clicks + 1):
+        if step and not click(at, rng):
+            break
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            errors.append(at.exception[0].value)
+        time.sleep(rng.uniform(0, think))
+
+
+def cache_counters():
+    import udise.app
+
+    counters = {'calls': sum(udise.app.calls.values())}
+    service = udise.app.load_service()
+    counters.update(service.stats)
+    counters.update(getattr(service.engine, 'stats', {}))
+    return counters
+
+
+def run_page(path, sessions, clicks, think, seed=0):
+    import udise.app
+
+    udise.app.calls.clear()
+    before = cache_counters()
+    latencies, errors = [], []
+    rss_before = _rss_mb()
+    lock = threading.Lock()
+    with shared_runtime(), ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, path, clicks, think, seed + i, latencies, errors)
+                   for i in range(sessions)]
+        for f in futures:
+            try:
+                f.result()
+            except Exception as e:  # a crashed session is a result, not a harness failure
+                with lock:
+                    errors.append(repr(e))
+    after = cache_counters()
+    delta = {k: after.get(k, 0) - before.get(k, 0) for k in after}
+    engine_requests = delta.get('computed', 0) + delta.get('coalesced', 0)
+    disk = delta.get('hits', 0) + delta.get('misses', 0)
+    lat = np.array(latencies) * 1000
+    return {
+        'page': os.path.basename(path),
+        'reruns': len(latencies),
+        'errors': len(errors),
+        'p50_ms': float(np.percentile(lat, 50)) if len(lat) else float('nan'),
+        'p95_ms': float(np.percentile(lat, 95)) if len(lat) else float('nan'),
+        'p99_ms': float(np.percentile(lat, 99)) if len(lat) else float('nan'),
+        'peak_rss_mb': _rss_mb(),
+        'rss_growth_mb': _rss_mb() - rss_before,
+        'memory_hit_rate': 1 - engine_requests / delta['calls'] if delta['calls'] else float('nan'),
+        'disk_hit_rate': delta.get('hits', 0) / disk if disk else float('nan'),
+        'coalesced': delta.get('coalesced', 0),
+        'first_error': errors[0] if errors else '',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--clicks', type=int, default=20)
+    parser.add_argument('--think', type=float, default=0.5, help='max seconds between clicks')
+    parser.add_argument('--pages', nargs='*', help='substrings of page file names (default: all)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = analytics_pages()
+    if args.pages:
+        pages = [p for p in pages if any(s in os.path.basename(p) for s in args.pages)]
+    for path in pages:
+        r = run_page(path, args.sessions, args.clicks, args.think, args.seed)
+        print(f"{r['page']}: {r['reruns']} reruns, {r['errors']} errors | "
+              f"p50 {r['p50_ms']:.0f}ms p95 {r['p95_ms']:.0f}ms p99 {r['p99_ms']:.0f}ms | "
+              f"peak RSS {r['peak_rss_mb']:.0f}MB (+{r['rss_growth_mb']:.0f}) | "
+              f"memory hits {r['memory_hit_rate']:.0%} disk hits {r['disk_hit_rate']:.0%} "
+              f"coalesced {r['coalesced']}")
+        if r['first_error']:
+            print(f"  first error: {r['first_error']}")
+
+
+if __name__ == '__main__':
+    main()
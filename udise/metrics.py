@@ -0,0 +1,297 @@
+"""Per-rerun timing and memory spans.
+
+A page opens a rerun at the top and closes it at the bottom:
+
+    rerun = metrics.begin_rerun("Teacher")
+    ...
+    with metrics.span('figure', 'Total Teachers'):
+        fig = px.bar(...)
+    ...
+    metrics.end_rerun()
+
+Spans record wall time, rows scanned, bytes allocated (tracemalloc, only
+while tracing is on) and whether a cache answered. The query layer opens its
+own spans ('load', 'query', 'disk', 'filter', 'group', 'scan'), including
+on the query service's worker threads, which attach to the caller's rerun.
+
+A single rerun can also be captured with cProfile (`udise.profiling`).
+
+Opt in to the per-rerun debug panel with `?debug=1` or UDISE_DEBUG=1.
+tracemalloc slows every allocation in the process, for every session, so it
+is only switched on by the operator with UDISE_TRACEMALLOC=1. Totals per
+page and stage are exported in Prometheus text format to
+$UDISE_METRICS_FILE (default udise_metrics.prom) for the node exporter's
+textfile collector, together with the prediction scheduler's per-model
+totals (`udise.inference`).
+"""
+import atexit
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from udise import profiling
+
+METRICS_FILE = os.environ.get('UDISE_METRICS_FILE', 'udise_metrics.prom')
+EXPORT_INTERVAL = 5.0  # seconds between metric file rewrites
+
+_local = threading.local()
+
+
+@dataclass
+class Span:
+    stage: str
+    label: str = ''
+    depth: int = 0
+    seconds: float = 0.0
+    rows: int | None = None
+    alloc_bytes: int | None = None
+    cache: str | None = None  # 'hit' / 'miss'
+
+
+class Rerun:
+    def __init__(self, page, debug=False):
+        self.page = page
+        self.debug = debug
+        self.spans = []
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.profiled = False
+
+
+class _NullSpan(Span):
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL = _NullSpan('none')
+
+
+def _debug_requested():
+    if os.environ.get('UDISE_DEBUG') == '1':
+        return True
+    try:
+        import streamlit as st
+
+        return st.query_params.get('debug') == '1'
+    except Exception:  # no script context (tools, workers)
+        return False
+
+
+# --------------------------
+# RERUNS AND SPANS
+# --------------------------
+def begin_rerun(page):
+    debug = _debug_requested()
+    if os.environ.get('UDISE_TRACEMALLOC') == '1' and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    rerun = Rerun(page, debug)
+    _local.rerun = rerun
+    _local.stack = []
+    _local.base = 0
+    rerun.profiled = profiling.start()
+    return rerun
+
+
+def current():
+    return getattr(_local, 'rerun', None)
+
+
+def capture():
+    """This thread's rerun and span depth, to hand to a worker thread."""
+    return current(), len(getattr(_local, 'stack', ()))
+
+
+@contextmanager
+def attached(captured):
+    """Record spans from this thread into a captured rerun (e.g. on a worker thread)."""
+    rerun, depth = captured
+    previous, previous_stack = current(), getattr(_local, 'stack', [])
+    _local.rerun, _local.stack, _local.base = rerun, [], depth
+    try:
+        yield
+    finally:
+        _local.rerun, _local.stack, _local.base = previous, previous_stack, 0
+
+
+@contextmanager
+def span(stage, label='', rows=None):
+    rerun = current()
+    if rerun is None:
+        yield _NULL
+        return
+    stack = _local.stack
+    s = Span(stage, label, depth=getattr(_local, 'base', 0) + len(stack), rows=rows)
+    rerun.spans.append(s)
+    stack.append(s)
+    tracing = tracemalloc.is_tracing()
+    mem_start = tracemalloc.get_traced_memory()[0] if tracing else 0
+    start = time.perf_counter()
+    try:
+        yield s
+    finally:
+        s.seconds = time.perf_counter() - start
+        if tracing:
+            # Net growth of traced memory; approximate when sessions overlap
+            s.alloc_bytes = max(0, tracemalloc.get_traced_memory()[0] - mem_start)
+        stack.pop()
+
+
+def add_rows(n):
+    stack = getattr(_local, 'stack', None)
+    if stack and n is not None:
+        stack[-1].rows = (stack[-1].rows or 0) + n
+
+
+def mark_cache(status):
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1].cache = status
+
+
+def end_rerun():
+    rerun = current()
+    if rerun is None:
+        return None
+    rerun.seconds = time.perf_counter() - rerun.started
+    _local.rerun = None
+    if rerun.profiled:
+        profiling.finish(rerun.page)
+    REGISTRY.record(rerun)
+    REGISTRY.maybe_export()
+    if rerun.debug:
+        render_debug_panel(rerun)
+        profiling.render_arm_button()
+    if rerun.profiled or rerun.debug:
+        profiling.render_controls()
+    return rerun
+
+
+# --------------------------
+# EXPORT
+# --------------------------
+class Registry:
+    """Process-wide totals per (page, stage), written as Prometheus text."""
+
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stage = defaultdict(lambda: [0, 0.0, 0, 0])  # count, seconds, rows, bytes
+        self._cache = defaultdict(int)
+        self._reruns = defaultdict(lambda: [0, 0.0])
+        self._inference = defaultdict(lambda: [0, 0, 0, 0.0, 0.0])  # requests, rows, batches, queue s, predict s
+        self._exported = 0.0
+
+    def record(self, rerun):
+        with self._lock:
+            runs = self._reruns[rerun.page]
+            runs[0] += 1
+            runs[1] += rerun.seconds
+            for s in rerun.spans:
+                totals = self._stage[(rerun.page, s.stage)]
+                totals[0] += 1
+                totals[1] += s.seconds
+                totals[2] += s.rows or 0
+                totals[3] += s.alloc_bytes or 0
+                if s.cache:
+                    self._cache[(rerun.page, s.stage, s.cache)] += 1
+
+    def record_inference(self, model, requests, rows, queue_seconds, predict_seconds):
+        """One batch of the prediction scheduler (`udise.inference`)."""
+        with self._lock:
+            totals = self._inference[model]
+            totals[0] += requests
+            totals[1] += rows
+            totals[2] += 1
+            totals[3] += queue_seconds
+            totals[4] += predict_seconds
+
+    def render(self):
+        lines = [
+            '# HELP udise_rerun_seconds Wall time of page reruns.',
+            '# TYPE udise_rerun_seconds summary',
+        ]
+        with self._lock:
+            for page, (count, seconds) in sorted(self._reruns.items()):
+                lines.append(f'udise_rerun_seconds_count{{page="{_esc(page)}"}} {count}')
+                lines.append(f'udise_rerun_seconds_sum{{page="{_esc(page)}"}} {seconds:.6f}')
+            stage = sorted(self._stage.items())
+            cache = sorted(self._cache.items())
+            inference = sorted(self._inference.items())
+        lines += ['# HELP udise_stage_seconds Wall time spent per page stage.',
+                  '# TYPE udise_stage_seconds summary']
+        for (page, name), (count, seconds, _, _) in stage:
+            labels = f'page="{_esc(page)}",stage="{name}"'
+            lines.append(f'udise_stage_seconds_count{{{labels}}} {count}')
+            lines.append(f'udise_stage_seconds_sum{{{labels}}} {seconds:.6f}')
+        lines += ['# HELP udise_stage_rows_scanned_total Rows scanned per page stage.',
+                  '# TYPE udise_stage_rows_scanned_total counter']
+        for (page, name), (_, _, rows, _) in stage:
+            lines.append(f'udise_stage_rows_scanned_total{{page="{_esc(page)}",stage="{name}"}} {rows}')
+        lines += ['# HELP udise_stage_alloc_bytes_total Bytes allocated per page stage (tracemalloc).',
+                  '# TYPE udise_stage_alloc_bytes_total counter']
+        for (page, name), (_, _, _, alloc) in stage:
+            lines.append(f'udise_stage_alloc_bytes_total{{page="{_esc(page)}",stage="{name}"}} {alloc}')
+        lines += ['# HELP udise_cache_requests_total Cache lookups per page stage and result.',
+                  '# TYPE udise_cache_requests_total counter']
+        for (page, name, result), count in cache:
+            lines.append(
+                f'udise_cache_requests_total{{page="{_esc(page)}",stage="{name}",result="{result}"}} {count}')
+        if inference:
+            lines += ['# HELP udise_inference_rows_total Rows predicted per model.',
+                      '# TYPE udise_inference_rows_total counter']
+            lines += [f'udise_inference_rows_total{{model="{m}"}} {t[1]}' for m, t in inference]
+            lines += ['# HELP udise_inference_queue_seconds Time prediction requests waited for their batch.',
+                      '# TYPE udise_inference_queue_seconds summary']
+            for m, (requests, _, _, waited, _) in inference:
+                lines.append(f'udise_inference_queue_seconds_count{{model="{m}"}} {requests}')
+                lines.append(f'udise_inference_queue_seconds_sum{{model="{m}"}} {waited:.6f}')
+            lines += ['# HELP udise_inference_batch_seconds Model call time per prediction batch.',
+                      '# TYPE udise_inference_batch_seconds summary']
+            for m, (_, _, batches, _, busy) in inference:
+                lines.append(f'udise_inference_batch_seconds_count{{model="{m}"}} {batches}')
+                lines.append(f'udise_inference_batch_seconds_sum{{model="{m}"}} {busy:.6f}')
+        return '\n'.join(lines) + '\n'
+
+    def maybe_export(self, force=False):
+        now = time.monotonic()
+        if not self.path or (not force and now - self._exported < EXPORT_INTERVAL):
+            return
+        self._exported = now
+        tmp = f"{self.path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                f.write(self.render())
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # metrics must never break a page
+
+
+def _esc(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.maybe_export, force=True)
+
+
+# --------------------------
+# DEBUG PANEL
+# --------------------------
+def render_debug_panel(rerun):
+    import pandas as pd
+    import streamlit as st
+
+    rows = [{
+        'stage': '· ' * s.depth + s.stage,
+        'label': s.label,
+        'ms': round(s.seconds * 1000, 1),
+        'rows scanned': s.rows,
+        'KiB allocated': None if s.alloc_bytes is None else round(s.alloc_bytes / 1024, 1),
+        'cache': s.cache,
+    } for s in rerun.spans]
+    with st.sidebar.expander(f"⏱️ Rerun {rerun.seconds * 1000:.0f} ms", expanded=True):
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
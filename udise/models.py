@@ -0,0 +1,60 @@
+"""The prediction models behind the ML pages, for callers outside Streamlit.
+
+Each model takes its inputs encoded the way the pages encode them: yes/no
+as 1/0, 'urban' as 1 for Urban, school category and management as their
+index in the pages' option lists, building status and computer lab
+condition on the infrastructure page's 0-3 scales. Models are unpickled on
+first use and kept for the life of the process.
+"""
+import pickle
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Spec:
+    path: str
+    features: tuple  # in the order the model was trained on
+    named: bool = False  # trained on a DataFrame, so it is given one
+
+
+MODELS = {
+    'dropout': Spec('xgb_dropout_model.pkl', (
+        'electricity_availability', 'total_class_rooms', 'total_tch', 'trained_comp', 'furniture',
+        'total_girls_func_toilet', 'library_availability', 'internet', 'pucca_building', 'playground_available')),
+    'retention': Spec('xgb_retention_model.pkl', (
+        'urban', 'school_category', 'management', 'female', 'total_tch', 'trained_comp',
+        'library_availability', 'ramps', 'medical_checkups', 'electricity_availability')),
+    'infra': Spec('infra_score_model.pkl', (
+        'building_status', 'boundary_wall', 'electricity_availability', 'tap_fun_yn', 'internet',
+        'playground_available', 'comp_lab_cond', 'library_availability', 'total_boys_func_toilet',
+        'classrooms_in_good_condition'), named=True),
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def load(name):
+    with _lock:
+        if name not in _loaded:
+            with open(MODELS[name].path, 'rb') as f:
+                _loaded[name] = pickle.load(f)
+        return _loaded[name]
+
+
+def predict(name, rows):
+    """Predictions of model `name` for a DataFrame with one column per input."""
+    if name not in MODELS:
+        raise KeyError(f"Unknown model {name!r}; expected one of {', '.join(MODELS)}")
+    spec = MODELS[name]
+    missing = [f for f in spec.features if f not in rows.columns]
+    if missing:
+        raise ValueError(f"Missing inputs for {name}: {', '.join(missing)}")
+    x = rows[list(spec.features)]
+    model = load(name)
+    return np.asarray(model.predict(x if spec.named else x.to_numpy(dtype=float)))
+
@@ -0,0 +1,130 @@
+"""Comparable-schools search for the prediction pages.
+
+The inputs a user enters on a model page are matched against every school
+in the data on the same features, standardised so that a classroom and a
+teacher weigh alike. Each state partition of the store gets its own KD-tree
+(scipy's cKDTree), built on first use and kept for the life of the process;
+a query asks every tree for its k nearest and keeps the k closest overall,
+a few milliseconds in all. When the store changes (`udise.delta` rewrites
+the partitions of touched states) only the trees whose partition files
+changed are rebuilt, as seen through the disk cache's per-state
+fingerprints. The standardisation is fixed when the index is first built,
+so rebuilt partitions stay comparable with the untouched ones.
+
+The outcomes shown are the ones the data records per school: enrolment
+(the total_gender proxy) and the facility index.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import streamlit as st
+
+from udise import metrics, store
+from udise.diskcache import Fingerprints
+from udise.schema import SCHOOL_KEY
+
+K = 20
+OUTCOMES = {'total_gender': 'Students (proxy)', 'facility_index': 'Facility Index'}
+# Features computed from a school-table column rather than read as they are
+ENCODED = {'urban': ('rural_urban', lambda s: (s.astype('string').str.strip() == 'Urban').astype(float))}
+
+
+def _read(folder, features):
+    """Feature matrix and display rows of one state partition (or of the CSV)."""
+    raw = [ENCODED[f][0] if f in ENCODED else f for f in features]
+    wanted = list(dict.fromkeys([SCHOOL_KEY, 'state', 'district', *raw, *OUTCOMES]))
+    if folder is None:
+        df = store.read_main()
+    else:
+        available = ds.dataset(folder, format='parquet').schema.names
+        df = pq.read_table(folder, columns=[c for c in wanted if c in available]).to_pandas()
+    df = df[[c for c in wanted if c in df.columns]]
+    encoded = [f for f in features if f in ENCODED]
+    for f in encoded:
+        col, encode = ENCODED[f]
+        df[f] = encode(df[col])
+    return df[list(features)].to_numpy(dtype=float), df.drop(columns=encoded)
+
+
+class ComparableIndex:
+    """Per-partition KD-trees over standardised feature vectors."""
+
+    def __init__(self, features):
+        self.features = tuple(features)
+        self._fingerprint = Fingerprints()
+        self._lock = threading.Lock()
+        self._parts = {}  # partition -> (fingerprint, tree, rows)
+        self._scale = None  # (mean, std) per feature
+        self.rebuilt = []  # partitions rebuilt by the last refresh
+
+    def _partitions(self):
+        if store.has_store():
+            return store.partitions()
+        return {"All": None}
+
+    def refresh(self):
+        """Rebuild the trees of partitions whose files changed since they were built."""
+        from scipy.spatial import cKDTree
+
+        with self._lock:
+            parts = self._partitions()
+            for gone in set(self._parts) - set(parts):
+                del self._parts[gone]
+            stale = {}
+            for name, folder in parts.items():
+                fp = self._fingerprint('main', name)
+                if self._parts.get(name, (None,))[0] != fp:
+                    stale[name] = (fp, *_read(folder, self.features))
+            if self._scale is None and stale:
+                x = np.vstack([x for _, x, _ in stale.values()])
+                mean = np.nanmean(x, axis=0)
+                std = np.nanstd(x, axis=0)
+                self._scale = mean, np.where(std > 0, std, 1.0)
+            for name, (fp, x, rows) in stale.items():
+                if name != "All" and 'state' not in rows:
+                    rows.insert(0, 'state', name)
+                # Plain object columns: picking 20 rows from Arrow-backed strings is slow
+                rows = rows.astype({c: object for c in rows.columns if rows[c].dtype == 'string'})
+                with metrics.span('index', name, rows=len(x)):
+                    self._parts[name] = (fp, cKDTree(self._standardise(x)), rows.reset_index(drop=True))
+            self.rebuilt = sorted(stale)
+            return self.rebuilt
+
+    def _standardise(self, x):
+        mean, std = self._scale
+        # Missing values sit at the mean, i.e. they do not pull a school either way
+        return np.nan_to_num((x - mean) / std, nan=0.0)
+
+    def query(self, values, k=K):
+        """The k schools nearest to `values` (one per feature), closest first."""
+        self.refresh()
+        with self._lock:  # a snapshot: a concurrent refresh replaces entries of _parts
+            parts = [(tree, rows) for _, tree, rows in self._parts.values() if tree.n]
+        point = self._standardise(np.asarray(values, dtype=float)[None, :])[0]
+        if not parts:
+            return pd.DataFrame()
+        dists, owners, indices = [], [], []
+        for p, (tree, _) in enumerate(parts):
+            dist, idx = tree.query(point, k=min(k, tree.n))
+            dists.append(np.atleast_1d(dist))
+            indices.append(np.atleast_1d(idx))
+            owners.append(np.full(len(dists[-1]), p))
+        dist, owner, idx = np.concatenate(dists), np.concatenate(owners), np.concatenate(indices)
+        best = np.argsort(dist, kind='stable')[:k]
+        found = pd.concat([parts[p][1].iloc[idx[best[owner[best] == p]]].assign(distance=dist[best[owner[best] == p]])
+                           for p in np.unique(owner[best])], ignore_index=True)
+        return found.sort_values('distance', kind='stable').reset_index(drop=True)
+
+
+@st.cache_resource(show_spinner="Indexing schools...")
+def comparable_index(features):
+    return ComparableIndex(features)
+
+
+def comparable_schools(inputs, k=K):
+    """The k schools most similar to `inputs` ({feature: value}), with their outcomes."""
+    with metrics.span('query', 'comparable schools', rows=k):
+        return comparable_index(tuple(inputs)).query(list(inputs.values()), k)
@@ -0,0 +1,263 @@
+"""Partition-parallel map-reduce aggregation over the Parquet store.
+
+Each state partition is scanned in its own worker process, which returns
+per-group partials (count, sum, min, max and the second central moment).
+The partials are merged with the parallel-variance combination, so `mean`,
+`sum`, `count`, `min`, `max` and `std` come out exactly as a single pass
+would give them. With 16 cores an "All states" view scans 16 states at once
+instead of one frame on one core.
+
+The workers are `python -m udise.parallel --worker` processes fed over
+their stdin and stdout rather than a multiprocessing pool: spawn re-imports
+`__main__` in each child, and under Streamlit `__main__` is the running
+page, so a pool could only be started by swapping `sys.modules['__main__']`
+under every other thread of the server.
+"""
+import os
+import queue
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from udise import metrics, store
+from udise.schema import STORE_DIR
+
+ALL_KEY = '_all'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # for `-m udise.parallel`
+
+
+# --------------------------
+# MAP: one state partition
+# --------------------------
+def _expression(predicates, partition=False):
+    expr = None
+    for col, op, value in predicates:
+        if col == store.PARTITION_COL and not partition:
+            continue  # handled by choosing partitions
+        term = ds.field(col).isin(list(value)) if op == 'in' else ds.field(col) == value
+        expr = term if expr is None else expr & term
+    return expr
+
+
+def partition_partials(path, state, predicates, by, columns, nulls=False):
+    """Partials for one partition, indexed by the group keys.
+
+    Arguments are plain data (predicates rather than `Filters`) so they pickle
+    cleanly into workers whatever module the caller runs as.
+    """
+    read_cols = [c for c in dict.fromkeys(list(by) + list(columns)) if c != store.PARTITION_COL]
+    df = ds.dataset(path, format='parquet').to_table(columns=read_cols, filter=_expression(predicates)).to_pandas()
+    if store.PARTITION_COL in by:
+        df[store.PARTITION_COL] = state
+    keys = list(by) or [ALL_KEY]
+    if not by:
+        df[ALL_KEY] = 0
+    grouped = df.groupby(keys, dropna=not nulls)[list(columns)]
+    stats = grouped.agg(['count', 'sum', 'min', 'max', 'var'])
+    out = {}
+    for col in columns:
+        count = stats[(col, 'count')]
+        out[f"{col}__count"] = count
+        out[f"{col}__sum"] = stats[(col, 'sum')]
+        out[f"{col}__min"] = stats[(col, 'min')]
+        out[f"{col}__max"] = stats[(col, 'max')]
+        out[f"{col}__m2"] = stats[(col, 'var')].fillna(0) * (count - 1).clip(lower=0)
+    return pd.DataFrame(out)
+
+
+# --------------------------
+# REDUCE
+# --------------------------
+def merge_partials(partials, by, measures, nulls=False):
+    """Combine partition partials into the final aggregate frame."""
+    keys = list(by) or [ALL_KEY]
+    columns = list(dict.fromkeys(col for col, _ in measures))
+    if not partials:
+        if by:
+            return pd.DataFrame(columns=keys + [col for col, _ in measures])
+        empty = {'sum': 0.0, 'count': 0}
+        return pd.DataFrame([{col: empty.get(agg, np.nan) for col, agg in measures}])
+
+    allp = pd.concat(partials)
+    levels = list(range(len(keys)))
+    grouped = allp.groupby(level=levels, dropna=not nulls)
+    result = {}
+    for col in columns:
+        count = grouped[f"{col}__count"].sum()
+        total = grouped[f"{col}__sum"].sum()
+        mean = total / count.where(count > 0)
+        part_mean = allp[f"{col}__sum"] / allp[f"{col}__count"].where(allp[f"{col}__count"] > 0)
+        spread = allp[f"{col}__count"] * (part_mean - mean.reindex(allp.index).to_numpy()) ** 2
+        m2 = (allp[f"{col}__m2"] + spread.fillna(0)).groupby(level=levels, dropna=not nulls).sum()
+        result[col] = {
+            'count': count,
+            'sum': total,
+            'mean': mean,
+            'min': grouped[f"{col}__min"].min(),
+            'max': grouped[f"{col}__max"].max(),
+            'std': np.sqrt(m2 / (count - 1).where(count > 1)),
+        }
+    out = pd.DataFrame({col: result[col][agg] for col, agg in measures})
+    out.index.names = keys
+    out = out.reset_index()
+    return out.drop(columns=ALL_KEY) if not by else out
+
+
+# --------------------------
+# ENGINE
+# --------------------------
+class _Worker:
+    """One `python -m udise.parallel --worker` process, spoken to over its stdin and stdout."""
+
+    def __init__(self):
+        # Started from the module, not by multiprocessing: spawn would re-import
+        # `__main__` in the child, which under Streamlit is the running page
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+        self.process = subprocess.Popen([sys.executable, '-m', 'udise.parallel', '--worker'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+        self._requests = Connection(os.dup(self.process.stdin.fileno()), readable=False)
+        self._replies = Connection(os.dup(self.process.stdout.fileno()), writable=False)
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+    def call(self, args):
+        self._requests.send(args)
+        ok, result = self._replies.recv()
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        self._requests.close()  # end of input: the worker exits
+        self._replies.close()
+        self.process.wait()
+
+
+class Workers:
+    """A fixed set of worker processes running `partition_partials`, shared by every calling thread."""
+
+    def __init__(self, n):
+        self._idle = queue.SimpleQueue()
+        for _ in range(n):
+            self._idle.put(_Worker())
+        self._n = n
+        self._threads = ThreadPoolExecutor(n, thread_name_prefix='udise-partials')
+
+    def _call(self, args):
+        worker = self._idle.get()
+        try:
+            return worker.call(args)
+        except (EOFError, OSError):  # the process died: replace it, fail this call
+            worker.close()
+            worker = _Worker()
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def map(self, args):
+        """partition_partials(*a) for each a, in order, spread over the workers."""
+        return list(self._threads.map(self._call, args))
+
+    def close(self):
+        self._threads.shutdown()
+        for _ in range(self._n):
+            self._idle.get().close()
+
+
+def _serve():
+    """Worker loop: the partials of each request on stdin, answered on stdout."""
+    requests = Connection(os.dup(0), writable=False)
+    replies = Connection(os.dup(1), readable=False)
+    os.dup2(2, 1)  # a stray print must not land in the replies
+    while True:
+        try:
+            args = requests.recv()
+        except EOFError:
+            return
+        try:
+            reply = (True, partition_partials(*args))
+        except Exception as e:
+            reply = (False, e)
+        try:
+            replies.send(reply)
+        except Exception as e:  # an exception that does not pickle
+            replies.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class ParallelEngine:
+    name = 'parallel'
+
+    def __init__(self, store_dir=STORE_DIR, workers=None):
+        from udise.query import PandasEngine
+
+        self._store_dir = store_dir
+        self._workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._pool_lock = threading.Lock()  # the query service calls in from several threads
+        # The trends table is small; keep it on the in-process engine
+        self._local = PandasEngine()
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # New processes, not fork: the Streamlit server is multi-threaded
+                self._pool = Workers(self._workers)
+            return self._pool
+
+    def aggregate(self, query):
+        if query.source != 'main':
+            return self._local.aggregate(query)
+        parts = store.partitions(self._store_dir)
+        if query.filters.state != "All":
+            parts = {k: v for k, v in parts.items() if k == query.filters.state}
+        columns = list(dict.fromkeys(col for col, _ in query.measures))
+        args = [(path, state, query.filters.predicates(), query.by, columns, query.nulls)
+                for state, path in parts.items()]
+        rows = store.partition_rows(query.filters.state, self._store_dir) if metrics.current() else None
+        with metrics.span('scan', f"{len(args)} partitions", rows=rows):
+            if len(args) <= 1:
+                partials = [partition_partials(*a) for a in args]
+            else:
+                partials = self._executor().map(args)
+        with metrics.span('merge'):
+            return merge_partials([p for p in partials if len(p)], query.by, query.measures, query.nulls)
+
+    def _dataset(self):
+        return ds.dataset(self._store_dir, format='parquet', partitioning=store.PARTITIONING)
+
+    def frame(self, filters, columns, source='main', sample=None):
+        if source != 'main':
+            return self._local.frame(filters, columns, source, sample)
+        expr = _expression(filters.predicates(), partition=True)
+        rows = store.partition_rows(filters.state, self._store_dir) if metrics.current() else None
+        with metrics.span('scan', rows=rows):
+            table = self._dataset().to_table(columns=list(columns), filter=expr)
+        df = table.to_pandas()
+        if sample is not None:
+            df = df.sample(min(sample, len(df)))
+        return df.reset_index(drop=True)
+
+    def distinct(self, column, source='main'):
+        if source != 'main':
+            return self._local.distinct(column, source)
+        if column == store.PARTITION_COL:
+            return sorted(store.partitions(self._store_dir))
+        values = self._dataset().to_table(columns=[column]).column(0).unique().drop_null()
+        return sorted(values.to_pylist())
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == '__main__':
+    if '--worker' in sys.argv:
+        _serve()
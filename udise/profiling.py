@@ -0,0 +1,124 @@
+"""On-demand cProfile capture of a single rerun.
+
+Two ways to ask for one, neither needing a redeploy:
+
+- open the page with `?profile=1`: that rerun is profiled and the parameter
+  is dropped, so later reruns run normally;
+- in the debug panel (`?debug=1`), press "Profile next rerun", then change
+  the filters you want to diagnose: the rerun after the click is profiled.
+
+While a rerun is profiled the query service runs its engine calls on the
+script thread (no pool, no coalescing), so the engine's work shows up in the
+profile instead of a wait on a future. Cached results are still served from
+the caches, exactly as in production. The .prof file (for snakeviz,
+`python -m pstats` or gprof2dot) is offered as a download in the sidebar and
+kept under $UDISE_PROFILE_DIR (default udise_profiles/).
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+
+PROFILE_DIR = os.environ.get('UDISE_PROFILE_DIR', 'udise_profiles')
+TOP_FUNCTIONS = 25
+
+_ARMED = '_udise_profile_armed'  # session state: None / 'armed' / 'waiting'
+_LAST = '_udise_last_profile'
+
+_local = threading.local()
+
+
+def active():
+    """True while this thread's rerun is being profiled."""
+    return getattr(_local, 'profiler', None) is not None
+
+
+def _requested(st):
+    if st.query_params.get('profile') == '1':
+        del st.query_params['profile']
+        return True
+    state = st.session_state.get(_ARMED)
+    if state == 'armed':
+        # This rerun is the button click itself; profile the one after it
+        st.session_state[_ARMED] = 'waiting'
+    elif state == 'waiting':
+        st.session_state[_ARMED] = None
+        return True
+    return False
+
+
+def _discard():
+    # A rerun stopped by st.rerun()/st.stop() never reaches finish(): drop its profiler
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _local.profiler = None
+
+
+def start():
+    _discard()
+    try:
+        import streamlit as st
+
+        if not _requested(st):
+            return False
+    except Exception:  # no script context (tools, workers)
+        return False
+    profiler = cProfile.Profile()
+    _local.profiler = profiler
+    profiler.enable()
+    return True
+
+
+def finish(page):
+    """Stop the profiler, save the .prof file and remember it for download."""
+    import streamlit as st
+
+    profiler = _local.profiler
+    profiler.disable()
+    _local.profiler = None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{page}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+    path = os.path.join(PROFILE_DIR, name)
+    profiler.dump_stats(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    st.session_state[_LAST] = {'name': name, 'data': data, 'summary': summary.getvalue()}
+
+
+def _arm():
+    import streamlit as st
+
+    st.session_state[_ARMED] = 'armed'
+
+
+def _dismiss():
+    import streamlit as st
+
+    st.session_state.pop(_LAST, None)
+
+
+def render_controls():
+    """Download and top functions of the last captured profile."""
+    import streamlit as st
+
+    last = st.session_state.get(_LAST)
+    if last:
+        with st.sidebar.expander(f"🔬 Profile {last['name']}"):
+            st.download_button("Download .prof", last['data'], file_name=last['name'],
+                               mime='application/octet-stream', on_click='ignore')
+            st.code(last['summary'], language=None)
+            st.button("Dismiss profile", on_click=_dismiss)
+
+
+def render_arm_button():
+    import streamlit as st
+
+    if st.session_state.get(_ARMED):
+        st.sidebar.caption("🔬 The next rerun will be profiled")
+    else:
+        st.sidebar.button("🔬 Profile next rerun", on_click=_arm)
@@ -0,0 +1,213 @@
+"""Approximate-first rendering of national ("All states") views.
+
+A page hands a query and the code that draws it to `progressive`:
+
+    @progressive(make_query(filters, 'rural_urban', total_tch='mean'))
+    def total_teachers(agg):
+        st.plotly_chart(px.bar(agg, x='rural_urban', y='total_tch'))
+
+    ...
+    settle()   # at the end of the page
+
+For a national view whose exact answer is not cached yet, the block is drawn
+at once from a stratified sample of schools (strata: state x rural_urban)
+with a caption giving 95% confidence intervals, while the exact aggregate
+runs on the query service. `settle()` waits for the exact answers and
+redraws each block in place. Filtered views, cached answers and a sample
+that is still being built (it is drawn in the background on first use) are
+drawn exactly straight away. UDISE_PROGRESSIVE=0 turns the mode off.
+
+Estimates use the stratified (Horvitz-Thompson) estimator with weights
+N_h / n_h; sums and counts are domain totals and means are ratio estimates,
+with linearised variances. min, max and std are sample values without an
+interval.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from udise.app import aggregate, data_version, load_service
+from udise.query import Filters
+from udise.schema import DERIVED_COLS, DIMENSIONS, NUMERIC_COLS
+
+SAMPLE_POOL = 200_000  # uniform draw the strata are taken from
+STRATUM_SIZE = 1_500  # schools kept per state x rural_urban stratum
+Z95 = 1.96
+STRATA = ['state', 'rural_urban']
+
+_local = threading.local()
+_exact = set()  # (query, version) already computed exactly in this process
+_lock = threading.Lock()
+
+
+# --------------------------
+# STRATIFIED SAMPLE
+# --------------------------
+def _draw(service, seed=0):
+    population = service.frame(Filters(), STRATA).value_counts().rename('N')
+    columns = list(dict.fromkeys(['district'] + DIMENSIONS + NUMERIC_COLS + DERIVED_COLS))
+    pool = service.frame(Filters(), columns, sample=SAMPLE_POOL)
+    pool = pool.sample(frac=1, random_state=seed)  # reservoir samples are not in random order
+    sample = pool.groupby(STRATA, sort=False).head(STRATUM_SIZE).reset_index(drop=True)
+    strata = sample.groupby(STRATA).size().rename('n').to_frame().join(population, how='inner')
+    strata['weight'] = strata['N'] / strata['n']
+    # N^2 (1 - f) / (n (n - 1)): per-stratum factor of the variance of a total
+    f = strata['n'] / strata['N']
+    strata['var_factor'] = np.where(
+        strata['n'] > 1, strata['N'] ** 2 * (1 - f) / (strata['n'] * (strata['n'] - 1)).clip(lower=1), 0.0)
+    strata['code'] = np.arange(len(strata))
+    sample = sample.join(strata[['weight', 'code']], on=STRATA, how='inner')
+    return sample.rename(columns={'weight': '_weight', 'code': '_stratum'}), strata.reset_index(drop=True)
+
+
+@st.cache_resource(show_spinner=False)
+def _sampler(version):
+    """Future of (sample, strata) for one data version, drawn in the background."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='udise-sample').submit(_draw, load_service())
+
+
+def stratified_sample():
+    """(sample, strata) if the sample for the current data is ready, else None."""
+    future = _sampler(data_version())
+    if not future.done() or future.exception() is not None:
+        return None
+    sample, strata = future.result()
+    # A sample holding every school is the exact answer, not an estimate
+    return None if (strata['n'] >= strata['N']).all() else (sample, strata)
+
+
+# --------------------------
+# ESTIMATES
+# --------------------------
+def _filtered(sample, filters):
+    mask = pd.Series(True, index=sample.index)
+    for col, op, value in filters.predicates():
+        mask &= sample[col].isin(value) if op == 'in' else sample[col] == value
+    return sample[mask]
+
+
+def _half_width(z, groups, df, strata):
+    """95% CI half-width of a total whose per-row contributions are `z`."""
+    t = pd.DataFrame({'g': groups, 'h': df['_stratum'].to_numpy(), 'z': z, 'z2': z * z})
+    t = t.groupby(['g', 'h']).sum()
+    h = t.index.get_level_values('h')
+    n = strata['n'].to_numpy()[h]
+    var = strata['var_factor'].to_numpy()[h] * (t['z2'] - t['z'] ** 2 / n)
+    return Z95 * np.sqrt(var.groupby(level='g').sum().clip(lower=0))
+
+
+def estimate(sample, strata, query):
+    """(estimate, 95% CI half-widths, sample rows used) for the query's aggregate."""
+    df = _filtered(sample, query.filters)
+    by = list(query.by)
+    if by:
+        df = df.dropna(subset=by)
+        groups = df.groupby(by, sort=True).ngroup().to_numpy()
+        keys = df.groupby(by, sort=True).size().reset_index()[by]
+    else:
+        groups = np.zeros(len(df), dtype=int)
+        keys = pd.DataFrame(index=[0])
+    w = df['_weight'].to_numpy()
+    out, ci = keys.copy(), keys.copy()
+    for col, agg in query.measures:
+        y = df[col].to_numpy(dtype=float)
+        valid = ~np.isnan(y)
+        y0 = np.where(valid, y, 0.0)
+        count = np.bincount(groups, w * valid, minlength=len(keys))
+        total = np.bincount(groups, w * y0, minlength=len(keys))
+        if agg in ('sum', 'count'):
+            z = y0 if agg == 'sum' else valid.astype(float)
+            value = total if agg == 'sum' else count
+            half = _half_width(z, groups, df, strata)
+        elif agg == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                value = total / count
+                z = np.where(valid, (y - value[groups]) / count[groups], 0.0)
+            half = _half_width(z, groups, df, strata)
+        else:
+            by_group = pd.Series(y).groupby(groups)
+            if agg == 'std':
+                mean = total / np.where(count > 0, count, np.nan)
+                var = np.bincount(groups, w * valid * (y0 - mean[groups]) ** 2, minlength=len(keys))
+                value = np.sqrt(var / np.where(count > 0, count, np.nan))
+            else:
+                value = getattr(by_group, agg)().reindex(range(len(keys))).to_numpy()
+            half = pd.Series(np.nan, index=range(len(keys)))
+        out[col] = value
+        ci[col] = pd.Series(half).reindex(range(len(keys))).to_numpy()
+    return out, ci, len(df)
+
+
+def _caption(ci, sample_size, by):
+    measures = [c for c in ci.columns if c not in by]
+    rows = []
+    for _, row in ci.head(8).iterrows():
+        label = ' / '.join(str(row[k]) for k in by)
+        bounds = ', '.join(f"{c} ±{row[c]:,.3g}" for c in measures if pd.notna(row[c]))
+        if bounds:
+            rows.append(f"{label}: {bounds}" if label else bounds)
+    text = f"≈ Estimated from a stratified sample of {sample_size:,} schools; exact figures follow."
+    return text + (" 95% CI " + "; ".join(rows) if rows else "")
+
+
+# --------------------------
+# PAGE API
+# --------------------------
+def _enabled(query):
+    return (os.environ.get('UDISE_PROGRESSIVE', '1') != '0'
+            and query.source == 'main' and query.filters.state == "All" and query.filters.segment is None)
+
+
+def progressive(query):
+    """Decorator: draw `render(agg)` now, approximately if that is faster."""
+    def decorate(render):
+        queries = getattr(_local, 'queries', None)
+        if queries is None:
+            queries = _local.queries = []
+        queries.append(query)
+        key = (query, data_version(query.source))
+        with _lock:
+            exact_known = key in _exact
+        drawn = _enabled(query) and not exact_known and stratified_sample()
+        if not drawn:
+            render(aggregate(query))
+            with _lock:
+                _exact.add(key)
+            return render
+        load_service().submit('aggregate', query)  # start the exact answer now
+        # The block and its caption in separate slots: settle() redraws one and empties the other
+        block = st.container()
+        placeholder, note = block.empty(), block.empty()
+        approx, ci, sample_size = estimate(*drawn, query)
+        with placeholder.container():
+            render(approx)
+        note.caption(_caption(ci, sample_size, query.by))
+        pending = getattr(_local, 'pending', None)
+        if pending is None:
+            pending = _local.pending = []
+        pending.append((placeholder, note, query, render, key))
+        return render
+    return decorate
+
+
+def page_queries(filters):
+    """Distinct queries on `filters` drawn so far in this rerun (the page's aggregates)."""
+    # Filtering on `filters` drops leftovers of a rerun that stopped before settle()
+    return list(dict.fromkeys(q for q in getattr(_local, 'queries', None) or [] if q.filters == filters))
+
+
+def settle():
+    """Swap every approximate block of this rerun for its exact answer."""
+    pending, _local.pending = getattr(_local, 'pending', None) or [], []
+    _local.queries = []
+    for placeholder, note, query, render, key in pending:
+        exact = aggregate(query)
+        with placeholder.container():
+            render(exact)
+        note.empty()
+        with _lock:
+            _exact.add(key)
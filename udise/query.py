@@ -0,0 +1,302 @@
+"""Filter + group-by queries and the engines that execute them.
+
+A page describes what it wants once, as a `Query`, and hands it to an engine:
+
+    q = make_query(filters, 'rural_urban', total_gender='sum')
+    agg = engine.aggregate(q)
+
+`PandasEngine` keeps the original behaviour (one in-memory frame, boolean
+masks, `groupby().agg()`). `DuckDBEngine` runs the same query as SQL directly
+over the Parquet store, multi-threaded, reading only the partitions and
+columns the query touches. `udise.parallel.ParallelEngine` map-reduces over
+the state partitions in a process pool. `python -m udise.query --parity`
+checks that all engines return the same aggregates.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from udise import metrics, store
+from udise.schema import STORE_DIR, TRENDS_PARQUET
+
+AGGS = ('sum', 'mean', 'count', 'min', 'max', 'std')
+
+
+# --------------------------
+# QUERY SPEC
+# --------------------------
+@dataclass(frozen=True)
+class Filters:
+    state: str = "All"
+    district: str = "All"
+    rural_urban: tuple | None = None  # None means no Rural/Urban filter
+    segment: int | None = None  # `udise.segments` id; None means every segment
+
+    def predicates(self):
+        """(column, op, value) triples for the active filters."""
+        preds = []
+        if self.state != "All":
+            preds.append(('state', '==', self.state))
+        if self.district != "All":
+            preds.append(('district', '==', self.district))
+        if self.rural_urban is not None:
+            preds.append(('rural_urban', 'in', tuple(self.rural_urban)))
+        if self.segment is not None:
+            preds.append(('segment', '==', self.segment))
+        return preds
+
+
+@dataclass(frozen=True)
+class Query:
+    filters: Filters = field(default_factory=Filters)
+    by: tuple = ()
+    measures: tuple = ()  # ((column, agg), ...)
+    source: str = 'main'  # 'main' (df_main) or 'trends' (preprocessed_prompt2)
+    nulls: bool = False  # keep rows with a NULL group key as their own group
+
+    def columns(self):
+        cols = list(self.by) + [col for col, _ in self.measures]
+        return list(dict.fromkeys(cols))
+
+
+def make_query(filters, by=(), source='main', nulls=False, **measures):
+    if isinstance(by, str):
+        by = (by,)
+    for col, agg in measures.items():
+        if agg not in AGGS:
+            raise ValueError(f"Unsupported aggregation {agg!r} for {col!r}")
+    return Query(filters=filters, by=tuple(by), measures=tuple(measures.items()), source=source, nulls=nulls)
+
+
+# --------------------------
+# PANDAS ENGINE
+# --------------------------
+class PandasEngine:
+    name = 'pandas'
+    POSITION_ENTRIES = 64  # filters whose matching row positions are kept
+
+    def __init__(self):
+        self._frames = {}
+        self._positions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _known(self, source):
+        # Reload when the files change (delta ingest, segmentation)
+        signature = store.signature(source)
+        with self._lock:
+            known = self._frames.get(source)
+            if known is None or known[0] != signature:
+                df = store.read_trends() if source == 'trends' else store.read_main()
+                self._frames[source] = known = (signature, df)
+                self._positions.clear()
+            return known
+
+    def _frame(self, source):
+        return self._known(source)[1]
+
+    def _filtered(self, filters, source, columns):
+        # Every query of a page, and of the next page, shares the session's
+        # filters: the matching rows are found once and kept as positions
+        signature, df = self._known(source)
+        predicates = [(col, op, value) for col, op, value in filters.predicates() if col in df.columns]
+        if not predicates:
+            return df[columns]
+        key = (source, signature, tuple(predicates))
+        with self._lock:
+            positions = self._positions.get(key)
+            if positions is not None:
+                self._positions.move_to_end(key)
+        if positions is None:
+            mask = np.ones(len(df), dtype=bool)
+            for col, op, value in predicates:
+                mask &= (df[col].isin(value) if op == 'in' else df[col] == value).to_numpy()
+            positions = np.flatnonzero(mask)
+            with self._lock:
+                self._positions[key] = positions
+                while len(self._positions) > self.POSITION_ENTRIES:
+                    self._positions.popitem(last=False)
+        return df[columns].take(positions)
+
+    def aggregate(self, query):
+        with metrics.span('filter', rows=len(self._frame(query.source))):
+            df = self._filtered(query.filters, query.source, query.columns())
+        spec = dict(query.measures)
+        with metrics.span('group', rows=len(df)):
+            if query.by:
+                return df.groupby(list(query.by), dropna=not query.nulls)[list(spec)].agg(spec).reset_index()
+            return pd.DataFrame([df[list(spec)].agg(spec)]).reset_index(drop=True)
+
+    def frame(self, filters, columns, source='main', sample=None):
+        with metrics.span('filter', rows=len(self._frame(source))):
+            df = self._filtered(filters, source, list(columns))
+        if sample is not None:
+            df = df.sample(min(sample, len(df)))
+        return df.reset_index(drop=True)
+
+    def distinct(self, column, source='main'):
+        return sorted(self._frame(source)[column].dropna().unique().tolist())
+
+
+# --------------------------
+# DUCKDB ENGINE
+# --------------------------
+SQL_AGGS = {
+    'sum': 'COALESCE(SUM({c}), 0)',
+    'mean': 'AVG({c})',
+    'count': 'COUNT({c})',
+    'min': 'MIN({c})',
+    'max': 'MAX({c})',
+    'std': 'STDDEV_SAMP({c})',
+}
+
+
+def _ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBEngine:
+    name = 'duckdb'
+
+    def __init__(self, store_dir=STORE_DIR, trends_path=TRENDS_PARQUET, threads=None):
+        import duckdb
+
+        self._con = duckdb.connect()
+        self._con.execute(f"SET threads TO {int(threads or os.cpu_count() or 1)}")
+        self._store_dir, self._trends_path = store_dir, trends_path
+        glob = store.store_glob(store_dir).replace("'", "''")
+        self._sources = {
+            'main': f"read_parquet('{glob}', hive_partitioning = true, hive_types = {{'state': VARCHAR}})",
+            'trends': f"read_parquet('{trends_path}')",
+        }
+
+    def _run(self, sql, params, rows=None):
+        # A cursor per call: cursors share the database but are safe across script threads
+        with metrics.span('scan', rows=rows):
+            return self._con.cursor().execute(sql, params).df()
+
+    def _scanned(self, filters, source):
+        """Rows DuckDB has to read for `filters`, from Parquet footers (no data read)."""
+        if metrics.current() is None:
+            return None
+        if source == 'trends':
+            return store.parquet_rows(self._trends_path)
+        return store.partition_rows(filters.state, self._store_dir)
+
+    def _where(self, filters, extra=()):
+        clauses, params = [], []
+        for col, op, value in filters.predicates():
+            if op == 'in':
+                if not value:
+                    clauses.append('FALSE')
+                    continue
+                clauses.append(f"{_ident(col)} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{_ident(col)} = ?")
+                params.append(value)
+        clauses.extend(extra)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def aggregate(self, query):
+        by = [_ident(c) for c in query.by]
+        selects = by + [f"{SQL_AGGS[agg].format(c=_ident(col))} AS {_ident(col)}" for col, agg in query.measures]
+        # pandas drops NULL group keys, so do the same here unless they are asked for
+        where, params = self._where(query.filters, [] if query.nulls else [f"{c} IS NOT NULL" for c in by])
+        sql = f"SELECT {', '.join(selects)} FROM {self._sources[query.source]}{where}"
+        if by:
+            sql += f" GROUP BY {', '.join(by)} ORDER BY {', '.join(f'{c} NULLS LAST' for c in by)}"
+        return self._run(sql, params, self._scanned(query.filters, query.source))
+
+    def frame(self, filters, columns, source='main', sample=None):
+        where, params = self._where(filters)
+        sql = f"SELECT {', '.join(_ident(c) for c in columns)} FROM {self._sources[source]}{where}"
+        if sample is not None:
+            sql = f"SELECT * FROM ({sql}) USING SAMPLE {int(sample)} ROWS"
+        return self._run(sql, params, self._scanned(filters, source))
+
+    def distinct(self, column, source='main'):
+        col = _ident(column)
+        sql = f"SELECT DISTINCT {col} FROM {self._sources[source]} WHERE {col} IS NOT NULL ORDER BY 1"
+        return self._run(sql, [])[column].tolist()
+
+
+# --------------------------
+# ENGINE SELECTION
+# --------------------------
+def get_engine(name=None):
+    """Engine named by `name` or $UDISE_ENGINE; 'auto' prefers DuckDB when the store exists."""
+    name = name or os.environ.get('UDISE_ENGINE', 'auto')
+    if name == 'pandas':
+        return PandasEngine()
+    if name == 'duckdb':
+        return DuckDBEngine()
+    if name == 'parallel':
+        from udise.parallel import ParallelEngine
+
+        return ParallelEngine()
+    if name != 'auto':
+        raise ValueError(f"Unknown engine {name!r}")
+    if store.has_store():
+        try:
+            return DuckDBEngine()
+        except ImportError:
+            pass
+    return PandasEngine()
+
+
+# --------------------------
+# PARITY CHECK
+# --------------------------
+PARITY_QUERIES = [
+    make_query(Filters(), (), total_tch='mean', total_gender='mean', trained_comp='mean', facility_index='mean'),
+    make_query(Filters(), 'rural_urban', total_gender='sum', total_tch='mean', facility_index='mean'),
+    make_query(Filters(), 'rural_urban', male='sum', female='sum', transgender='sum'),
+    make_query(Filters(), 'rural_urban', gen_tch='sum', sc_tch='sum', st_tch='sum', obc_tch='sum'),
+    make_query(Filters(), 'rural_urban', classrooms_in_good_condition='mean', total_func_toilet='mean',
+               cwsn_toilet='mean', pucca_building_blocks='mean', no_building_blocks='mean'),
+    make_query(Filters(), ('rural_urban', 'highclass'), total_tch='sum'),
+    make_query(Filters(), ('rural_urban', 'school_type'), total_gender='sum', total_tch='mean',
+               facility_index='mean'),
+    make_query(Filters(), 'school_type', total_gender='sum', total_tch='count'),
+    make_query(Filters(), ('state', 'rural_urban'), facility_index='std', total_tch='max', trained_comp='min'),
+    make_query(Filters(), ('rural_urban', 'school_type'), nulls=True, total_tch='sum', facility_index='mean',
+               trained_comp='count'),
+]
+
+
+def check_parity(engines=None, filters=None):
+    """Run PARITY_QUERIES on every engine; raise AssertionError on any mismatch."""
+    if engines is None:
+        from udise.parallel import ParallelEngine
+
+        engines = [PandasEngine(), DuckDBEngine(), ParallelEngine()]
+    base, others = engines[0], engines[1:]
+    filter_sets = filters or [Filters()]
+    if filters is None:
+        states = base.distinct('state')
+        if states:
+            filter_sets.append(Filters(state=states[0], rural_urban=tuple(base.distinct('rural_urban')[:1])))
+    checked = 0
+    for f in filter_sets:
+        for q in PARITY_QUERIES:
+            q = replace(q, filters=f)
+            expected = base.aggregate(q)
+            for engine in others:
+                got = engine.aggregate(q)
+                pd.testing.assert_frame_equal(
+                    expected.reset_index(drop=True), got.reset_index(drop=True),
+                    check_dtype=False, check_exact=False, rtol=1e-9,
+                    obj=f"{engine.name} vs {base.name}: {q}",
+                )
+            checked += 1
+    return checked
+
+
+if __name__ == '__main__':
+    if '--parity' in sys.argv:
+        print(f"{check_parity()} queries match across engines")
@@ -0,0 +1,498 @@
+"""Static HTML reports per district, generated in bulk.
+
+Each report carries the metric cards, the seven tab charts and the insight
+text of the Retention, Teacher and Infrastructure pages for one district.
+Every aggregate is queried once for the whole country, grouped by state and
+district (through the disk cache, so a second run or the dashboard reuses
+them), and split per district; the school-level frame behind the box plot
+and correlation heatmap is read once and split the same way. A pool of
+worker processes then renders the districts.
+
+Figures are built as plain Plotly JSON rather than through plotly.express,
+and everything every report shares is serialised once per process: the
+Plotly template travels once per report instead of once per figure, and
+plotly.js is written once next to the reports (or inlined with --inline-js,
+for single files to mail around).
+
+    python -m udise.reports [--out reports] [--state "State 1"] [--workers 8] [--inline-js]
+"""
+import argparse
+import functools
+import html
+import multiprocessing
+import os
+import re
+import textwrap
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from udise.query import Filters, make_query
+
+OUT_DIR = 'reports'
+SAMPLE = 5000  # schools in the box plot, as on the Infrastructure page
+PLOTLY_JS = 'plotly.min.js'
+KEYS = ['state', 'district']
+CORR_COLS = ['classrooms_in_good_condition', 'classrooms_needs_minor_repair', 'classrooms_needs_major_repair',
+             'total_func_toilet', 'cwsn_toilet', 'facility_index', 'total_tch', 'total_gender']
+SCHOOL_COLS = list(dict.fromkeys(['rural_urban', 'facility_index', *CORR_COLS]))
+
+
+def _palette(name):
+    from plotly.colors import qualitative
+
+    return getattr(qualitative, name)
+
+
+# --------------------------
+# FIGURES (plain Plotly JSON)
+# --------------------------
+def _label(v):
+    if pd.isna(v):
+        return ""
+    return f"{v:,.0f}" if float(v).is_integer() else f"{v:,.2f}"
+
+
+def _layout(x, y, legend, **extra):
+    return {'xaxis': {'title': {'text': x}}, 'yaxis': {'title': {'text': y}},
+            'legend': {'title': {'text': legend}}, 'margin': {'t': 30}, **extra}
+
+
+def _groups(cols, color):
+    """(name, columns) per value of the `color` column, in order of appearance."""
+    if color is None:
+        return [(None, cols)]
+    values = cols[color]
+    return [(name, {c: v[values == name] for c, v in cols.items()}) for name in pd.unique(values)]
+
+
+def bars(cols, x, y, color=None, palette=None, barmode='relative', text=True, textposition=None):
+    """Bar chart of long-form columns, one trace per `color` value as px.bar draws it."""
+    colors = _palette(palette) if palette else None
+    data = []
+    for i, (name, group) in enumerate(_groups(cols, color)):
+        trace = {'type': 'bar', 'x': group[x], 'y': group[y], 'name': str(name),
+                 'showlegend': name is not None, 'offsetgroup': str(name) if barmode == 'group' else None}
+        if colors:
+            trace['marker'] = {'color': colors[i % len(colors)]}
+        if text:
+            trace['text'] = [_label(v) for v in group[y]]
+            trace['textposition'] = textposition or 'auto'
+        data.append(trace)
+    return {'data': data, 'layout': _layout(x, y, color, barmode=barmode)}
+
+
+def lines(cols, x, y, color=None, text=False):
+    data = []
+    for name, group in _groups(cols, color):
+        trace = {'type': 'scatter', 'mode': 'lines+markers' + ('+text' if text else ''), 'name': str(name),
+                 'x': group[x], 'y': group[y]}
+        if text:
+            trace['text'] = [_label(v) for v in group[y]]
+            trace['textposition'] = 'top center'
+        data.append(trace)
+    return {'data': data, 'layout': _layout(x, y, color)}
+
+
+def boxes(cols, x, y, palette=None):
+    colors = _palette(palette) if palette else None
+    data = []
+    for i, (name, group) in enumerate(_groups(cols, x)):
+        trace = {'type': 'box', 'name': str(name), 'x': group[x], 'y': group[y], 'boxpoints': 'outliers'}
+        if colors:
+            trace['marker'] = {'color': colors[i % len(colors)]}
+        data.append(trace)
+    return {'data': data, 'layout': _layout(x, y, x)}
+
+
+def heatmap(corr, scale='Blues'):
+    return {'data': [{'type': 'heatmap', 'z': np.round(corr.to_numpy(), 2),
+                      'x': list(corr.columns), 'y': list(corr.index), 'colorscale': scale,
+                      'texttemplate': '%{z}'}],
+            'layout': {'yaxis': {'autorange': 'reversed'}, 'height': 700, 'margin': {'t': 30}}}
+
+
+def _sampled(cols, n=SAMPLE):
+    """At most n schools of a district, the same ones on every run."""
+    rows = len(next(iter(cols.values())))
+    if rows <= n:
+        return cols
+    keep = np.sort(np.random.default_rng(0).choice(rows, n, replace=False))
+    return {c: v[keep] for c, v in cols.items()}
+
+
+# --------------------------
+# REPORT CONTENT
+# --------------------------
+@dataclass
+class Card:
+    label: str
+    column: str
+    agg: str = 'mean'
+    fmt: str = '{:.1f}'
+
+
+@dataclass
+class Chart:
+    title: str
+    draw: object  # {column: values} of the aggregate (or of the schools) -> figure dict
+    insight: str
+    by: tuple = ()
+    measures: dict = field(default_factory=dict)
+    melt: tuple = None  # (var_name, value_name): measures melted to long form first, as the pages do
+    schools: bool = False
+
+
+@dataclass
+class Page:
+    title: str
+    cards: list
+    charts: list
+
+
+RU = ('rural_urban',)
+
+PAGES = [
+    Page("🎓 Dropout & Retention", [
+        Card("👩‍🏫 Avg Teachers", 'total_tch'),
+        Card("🚻 Avg Total Gender Teachers", 'total_gender'),
+        Card("🎓 Trained Teachers (%)", 'trained_comp'),
+        Card("🏫 Facility Index", 'facility_index', fmt='{:.2f}'),
+    ], [
+        Chart("Total Teachers / Students by Rural vs Urban",
+              lambda a: bars(a, 'rural_urban', 'total_gender', 'rural_urban', 'Pastel', textposition='outside'), """
+              **Insights:** Rural schools have fewer teachers. Female teacher % is lower in rural areas. Imbalanced allocation affects retention.
+              **Recommendation:** Recruit more teachers, especially female, in rural schools.
+              """, RU, {'total_gender': 'sum'}),
+        Chart("Gender Distribution",
+              lambda a: bars(a, 'Gender', 'Count', 'rural_urban', 'Safe', 'group'), """
+              **Insights:** Male teachers dominate, rural schools have lower female representation.
+              **Recommendation:** Increase female teachers in rural schools.
+              """, RU, {'male': 'sum', 'female': 'sum', 'transgender': 'sum'}, ('Gender', 'Count')),
+        Chart("Caste Distribution",
+              lambda a: bars(a, 'Caste', 'Count', 'rural_urban', 'Prism', 'group'), """
+              **Insights:** SC/ST underrepresented in urban areas. General category dominates both rural/urban.
+              **Recommendation:** Focus on equitable caste representation for teacher recruitment.
+              """, RU, {'gen_tch': 'sum', 'sc_tch': 'sum', 'st_tch': 'sum', 'obc_tch': 'sum'}, ('Caste', 'Count')),
+        Chart("Teacher Qualification",
+              lambda a: bars(a, 'Qualification', 'Count', 'rural_urban', 'Set2', 'group'), """
+              **Insights:** Rural schools have more below-graduate teachers. Graduate/post-grad concentrated in urban areas.
+              **Recommendation:** Improve qualification levels in rural schools via training/education.
+              """, RU, {'below_graduate': 'sum', 'graduate': 'sum', 'post_graduate_and_above': 'sum'},
+              ('Qualification', 'Count')),
+        Chart("Trained Teachers",
+              lambda a: bars(a, 'rural_urban', 'trained_comp', 'rural_urban', 'Bold'), """
+              **Insights:** Urban schools have more trained teachers.
+              **Recommendation:** Expand teacher training in rural schools.
+              """, RU, {'trained_comp': 'sum'}),
+        Chart("Facility Index",
+              lambda a: bars(a, 'rural_urban', 'facility_index', 'rural_urban', 'Vivid'), """
+              **Insights:** Facility index higher in urban schools. Rural schools lack classrooms, electricity, libraries, playgrounds.
+              **Recommendation:** Improve infrastructure to reduce dropouts.
+              """, RU, {'facility_index': 'mean'}),
+        Chart("Class Range vs Total Teachers",
+              lambda a: lines(a, 'highclass', 'total_tch', 'rural_urban'), """
+              **Insights:** Teacher numbers drop in higher classes in rural schools, indicating dropout risk.
+              **Recommendation:** Adjust teacher allocation across classes in rural schools.
+              """, ('rural_urban', 'highclass'), {'total_tch': 'sum'}),
+    ]),
+    Page("📊 Teachers & Functional Toilets", [
+        Card("👩‍🏫 Avg Teachers", 'total_tch'),
+        Card("🚻 Avg Functional Toilets", 'total_func_toilet'),
+        Card("🎓 Trained Teachers (%)", 'trained_comp'),
+        Card("🏫 Facility Index", 'facility_index', fmt='{:.2f}'),
+    ], [
+        Chart("Total Teachers vs Retention",
+              lambda a: bars(a, 'rural_urban', 'total_tch', 'rural_urban', 'Pastel', textposition='outside'), """
+              **Insights:**
+              - Rural schools have significantly fewer teachers on average.
+              - More teachers lead to better student attention and lower dropout rates.
+
+              **Recommendation:** Deploy additional teachers to rural schools for balanced staffing.
+              """, RU, {'total_tch': 'mean'}),
+        Chart("Functional Toilets and Retention",
+              lambda a: bars(a, 'rural_urban', 'total_func_toilet', 'rural_urban', 'Vivid'), """
+              **Insights:**
+              - Urban schools generally have more functional toilets than rural ones.
+              - Proper toilet facilities encourage better attendance and retention.
+
+              **Recommendation:** Invest in functional toilets, especially for girls in rural areas.
+              """, RU, {'total_func_toilet': 'mean'}),
+        Chart("Trained Teachers vs Retention",
+              lambda a: bars(a, 'rural_urban', 'trained_comp', 'rural_urban', 'Prism'), """
+              **Insights:**
+              - Teacher training levels are higher in urban schools.
+              - Well-trained teachers improve learning and student satisfaction.
+
+              **Recommendation:** Launch regular upskilling programs for rural teachers.
+              """, RU, {'trained_comp': 'mean'}),
+        Chart("Gender Distribution of Teachers",
+              lambda a: bars(a, 'Gender', 'Count', 'rural_urban', 'Safe', 'group', text=False), """
+              **Insights:**
+              - Female teacher representation is much lower in rural areas.
+              - Female teachers improve gender inclusivity and retention of girl students.
+
+              **Recommendation:** Provide incentives for female teachers to work in rural schools.
+              """, RU, {'male': 'sum', 'female': 'sum'}, ('Gender', 'Count')),
+        Chart("CWSN Friendly Toilets and Retention",
+              lambda a: bars(a, 'rural_urban', 'cwsn_toilet', 'rural_urban', 'Bold'), """
+              **Insights:**
+              - Inclusive infrastructure is lacking in many rural schools.
+              - CWSN-friendly toilets help children with disabilities stay enrolled longer.
+
+              **Recommendation:** Prioritize accessible toilet infrastructure for inclusivity.
+              """, RU, {'cwsn_toilet': 'mean'}),
+        Chart("Facility Index and Retention",
+              lambda a: bars(a, 'rural_urban', 'facility_index', 'rural_urban', 'T10'), """
+              **Insights:**
+              - Facility availability is higher in urban schools.
+              - Schools with good classrooms, libraries, and electricity show higher retention.
+
+              **Recommendation:** Focus on holistic facility upgrades in rural schools.
+              """, RU, {'facility_index': 'mean'}),
+        Chart("Urban vs Rural Overview",
+              lambda a: lines(a, 'rural_urban', 'value', 'variable', text=True), """
+              **Insights:**
+              - Urban areas lead in both staff and sanitation infrastructure.
+              - Balanced improvement in both aspects can boost rural retention.
+
+              **Recommendation:** Jointly address staffing and sanitation gaps in rural schools.
+              """, RU, {'total_tch': 'mean', 'total_func_toilet': 'mean'}, ('variable', 'value')),
+    ]),
+    Page("🏫 Infrastructure", [
+        Card("🏫 Avg Good Classrooms", 'classrooms_in_good_condition'),
+        Card("🚻 Avg Functional Toilets", 'total_func_toilet'),
+        Card("📊 Avg Facility Index", 'facility_index', fmt='{:.2f}'),
+    ], [
+        Chart("Classrooms Condition",
+              lambda a: bars(a, 'rural_urban', 'value', 'variable', 'Set2', 'group'),
+              "", RU, {'classrooms_in_good_condition': 'mean', 'classrooms_needs_minor_repair': 'mean',
+                       'classrooms_needs_major_repair': 'mean'}, ('variable', 'value')),
+        Chart("Functional Toilets",
+              lambda a: bars(a, 'rural_urban', 'total_func_toilet', 'rural_urban', 'Vivid'),
+              "", RU, {'total_func_toilet': 'mean'}),
+        Chart("CWSN Toilets",
+              lambda a: bars(a, 'rural_urban', 'cwsn_toilet', 'rural_urban', 'Bold'),
+              "", RU, {'cwsn_toilet': 'mean'}),
+        Chart("Facility Index",
+              lambda a: bars(a, 'rural_urban', 'facility_index', 'rural_urban', 'T10'),
+              "", RU, {'facility_index': 'mean'}),
+        Chart("Building Type",
+              lambda a: bars(a, 'rural_urban', 'value', 'variable', barmode='group'),
+              "", RU, {'pucca_building_blocks': 'mean', 'no_building_blocks': 'mean'}, ('variable', 'value')),
+        Chart("Rural vs Urban",
+              lambda s: boxes(_sampled(s), 'rural_urban', 'facility_index', 'Pastel'),
+              "", schools=True),
+        Chart("Correlation Heatmap",
+              lambda s: heatmap(pd.DataFrame({c: s[c] for c in CORR_COLS}).corr()),
+              "", schools=True),
+    ]),
+]
+
+
+def _queries(filters):
+    """By-district query of every page's cards and charts: {key: (Query, melt)}."""
+    out = {}
+    for p, page in enumerate(PAGES):
+        out[f"cards{p}"] = make_query(filters, KEYS, **{c.column: c.agg for c in page.cards}), None
+        for c, chart in enumerate(page.charts):
+            if not chart.schools:
+                out[f"chart{p}.{c}"] = make_query(filters, (*KEYS, *chart.by), **chart.measures), chart.melt
+    return out
+
+
+# --------------------------
+# HTML
+# --------------------------
+STYLE = """
+body {font-family: system-ui, sans-serif; margin: 0 auto; max-width: 1100px; padding: 0 24px; color: #1b1b1b;}
+h1 {color: #0b3d91;} h2 {color: #0b3d91; border-bottom: 2px solid #0b3d91; padding-bottom: 4px; margin-top: 48px;}
+nav a {margin-right: 16px;}
+.cards {display: flex; gap: 16px; flex-wrap: wrap;}
+.card {flex: 1; min-width: 180px; background: #f7faff; border-radius: 10px; padding: 12px 16px;}
+.card .label {font-size: 14px; color: #555;} .card .value {font-size: 30px; font-weight: 600;}
+.insight {background: #e8f1fb; border-radius: 8px; padding: 8px 16px;}
+footer {margin: 48px 0 24px; color: #777; font-size: 14px;}
+"""
+
+
+def _markdown(text):
+    """The **bold** and '- ' bullet subset of Markdown the insight texts use."""
+    out, items = [], []
+    for line in textwrap.dedent(text).strip().splitlines():
+        line = re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', html.escape(line.strip()))
+        if line.startswith('- '):
+            items.append(f"<li>{line[2:]}</li>")
+            continue
+        if items:
+            out.append(f"<ul>{''.join(items)}</ul>")
+            items = []
+        if line:
+            out.append(f"<p>{line}</p>")
+    if items:
+        out.append(f"<ul>{''.join(items)}</ul>")
+    return '\n'.join(out)
+
+
+@functools.lru_cache(maxsize=None)
+def _template_json():
+    import plotly.io as pio
+
+    return pio.json.to_json_plotly(pio.templates['plotly'].to_plotly_json())
+
+
+@functools.lru_cache(maxsize=None)
+def _plotly_js():
+    from plotly.offline import get_plotlyjs
+
+    return get_plotlyjs()
+
+
+def _script(inline_js, depth):
+    if inline_js:
+        return f"<script>{_plotly_js()}</script>"
+    return f'<script src="{"../" * depth}{PLOTLY_JS}"></script>'
+
+
+def slug(name):
+    return re.sub(r'[^\w-]+', '_', str(name)).strip('_') or '_'
+
+
+def render(state, district, results, schools):
+    """HTML of one district's report from its slices of the national aggregates."""
+    import plotly.io as pio
+
+    body, figures = [], {}
+    for p, page in enumerate(PAGES):
+        body.append(f'<h2 id="page{p}">{html.escape(page.title)}</h2>')
+        values = {c: v[0] for c, v in results.get(f"cards{p}", {}).items()}
+        body.append('<div class="cards">' + ''.join(
+            f'<div class="card"><div class="label">{html.escape(c.label)}</div>'
+            f'<div class="value">{c.fmt.format(values[c.column]) if c.column in values else "-"}</div></div>'
+            for c in page.cards) + '</div>')
+        for c, chart in enumerate(page.charts):
+            data = schools if chart.schools else results.get(f"chart{p}.{c}")
+            body.append(f"<h3>{c + 1}. {html.escape(chart.title)}</h3>")
+            if not data or not len(next(iter(data.values()))):
+                body.append("<p>No schools.</p>")
+                continue
+            figures[f"fig{p}-{c}"] = chart.draw(data)
+            body.append(f'<div id="fig{p}-{c}"></div>')
+            if chart.insight:
+                body.append(f'<div class="insight">{_markdown(chart.insight)}</div>')
+    nav = ''.join(f'<a href="#page{p}">{html.escape(page.title)}</a>' for p, page in enumerate(PAGES))
+    title = f"{district}, {state}"
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)} · UDISE report</title>
+<style>{STYLE}</style>__PLOTLY__</head>
+<body>
+<h1>{html.escape(district)}</h1>
+<p>{html.escape(state)} · generated {time.strftime('%Y-%m-%d')}</p>
+<nav>{nav}</nav>
+{chr(10).join(body)}
+<footer><hr>Made with ❤️ and purpose by <b>The Role Players</b> · Empowering Education through Data</footer>
+<script>
+const T = {_template_json()};
+const F = {pio.json.to_json_plotly(figures)};
+for (const [id, f] of Object.entries(F)) {{
+  Plotly.newPlot(id, f.data, Object.assign({{template: T}}, f.layout), {{displaylogo: false, responsive: true}});
+}}
+</script>
+</body></html>
+"""
+
+
+def write_report(task):
+    """Worker: render one district and write it; returns (path, bytes)."""
+    state, district, results, schools, out_dir, inline_js = task
+    path = os.path.join(out_dir, slug(state), slug(district) + '.html')
+    page = render(state, district, results, schools).replace('__PLOTLY__', _script(inline_js, depth=1), 1)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return path, len(page)
+
+
+def write_index(districts, out_dir):
+    rows = []
+    for state in sorted({s for s, _ in districts}):
+        links = ', '.join(f'<a href="{slug(state)}/{slug(d)}.html">{html.escape(d)}</a>'
+                          for d in sorted(d for s, d in districts if s == state))
+        rows.append(f"<h2>{html.escape(state)}</h2><p>{links}</p>")
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>UDISE district reports</title><style>{STYLE}</style></head>
+<body><h1>UDISE district reports</h1><p>{len(districts)} districts · generated {time.strftime('%Y-%m-%d')}</p>
+{''.join(rows)}</body></html>
+""")
+
+
+# --------------------------
+# BATCH
+# --------------------------
+def _split(df):
+    """{(state, district): {column: values}} of a national frame, without the key columns.
+
+    Plain arrays rather than a DataFrame per district: the figures only read
+    columns, and a few thousand small frames would cost more than the charts.
+    """
+    columns = {c: df[c].to_numpy() for c in df.columns if c not in KEYS}
+    groups = df.groupby(KEYS, sort=False, observed=True).indices
+    return {key: {c: v[rows] for c, v in columns.items()} for key, rows in groups.items()}
+
+
+def tasks(engine, state="All"):
+    """(state, district, results, schools) per district, from one query per chart for all of them."""
+    filters = Filters(state=state)
+    results, done = {}, {}
+    for key, (query, melt) in _queries(filters).items():
+        if (query, melt) not in done:
+            agg = engine.aggregate(query)
+            if melt:
+                agg = agg.melt(id_vars=[c for c in query.by], var_name=melt[0], value_name=melt[1])
+            done[query, melt] = _split(agg)
+        for district, part in done[query, melt].items():
+            results.setdefault(district, {})[key] = part
+    schools = _split(engine.frame(filters, KEYS + SCHOOL_COLS))
+    districts = sorted(set(results) | set(schools))
+    return [(s, d, results.get((s, d), {}), schools.get((s, d))) for s, d in districts]
+
+
+def generate(out_dir=OUT_DIR, state="All", workers=None, inline_js=False, engine=None):
+    """Write every district's report and an index; returns (reports, bytes)."""
+    from udise.diskcache import CachedEngine
+    from udise.query import get_engine
+
+    engine = engine or CachedEngine(get_engine())
+    work = [(*t, out_dir, inline_js) for t in tasks(engine, state)]
+    os.makedirs(out_dir, exist_ok=True)
+    if not inline_js:
+        with open(os.path.join(out_dir, PLOTLY_JS), 'w', encoding='utf-8') as f:
+            f.write(_plotly_js())
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(work) < 2:
+        written = [write_report(t) for t in work]
+    else:
+        with multiprocessing.get_context('spawn').Pool(workers) as pool:
+            written = list(pool.imap_unordered(write_report, work, chunksize=max(1, len(work) // (workers * 8))))
+    write_index([(t[0], t[1]) for t in work], out_dir)
+    return len(written), sum(size for _, size in written)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default=OUT_DIR)
+    parser.add_argument('--state', default="All", help='only the districts of this state')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per core)')
+    parser.add_argument('--inline-js', action='store_true', help='embed plotly.js in every report')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    count, size = generate(args.out, args.state, args.workers, args.inline_js)
+    print(f"{count} district reports ({size / 2 ** 20:,.1f} MiB) in {args.out}/ "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
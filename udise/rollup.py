@@ -0,0 +1,211 @@
+"""Hierarchical rollups behind the pivot and ranking pages.
+
+A pivot cell is one measure over the schools of a (row, column) pair of
+dimensions within a scope: the whole country, a state or a district. All of
+them are answered from one cube: the measures grouped by every dimension
+(state, district, rural_urban, school_type, highclass), queried once per
+filter through the query service and the disk cache, with one query per
+partial for all the measures together. The cube has a row per combination
+present, tens of thousands at most rather than one per school, and it keeps
+re-aggregable partials (a mean is kept as sum and count), so any coarser
+grouping, or any rural_urban / school_type slice (`where`), is a small
+groupby of the cube and never a scan of the schools. Each rollup is
+memoised as well: drilling back up or switching dimensions is a dictionary
+lookup. Rankings select the top and bottom N of a rollup with
+`np.argpartition` and sort only those N.
+
+A school with a missing dimension stays in the cube, with a NULL key: it
+counts in every rollup except those grouped by that dimension, exactly as
+the engines count it. `python -m udise.rollup --parity` checks rollups and
+rankings against `engine.aggregate`.
+"""
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from udise.query import Filters, get_engine, make_query
+from udise.schema import DIMENSIONS
+
+# Partials kept in the cube for each aggregation, and how they roll up
+PARTIALS = {'sum': ('sum',), 'mean': ('sum', 'count'), 'count': ('count',), 'min': ('min',), 'max': ('max',)}
+COMBINE = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+LEVELS = ('state', 'district')  # the drill-down hierarchy
+MEMO_ENTRIES = 256
+
+
+def _partial(measure, partial):
+    return f"{measure}:{partial}"
+
+
+class Rollups:
+    """The cube of some measures under one filter, and the rollups drawn from it so far."""
+
+    def __init__(self, cube, measures, agg):
+        self.cube = cube
+        self.measures = (measures,) if isinstance(measures, str) else tuple(measures)
+        self.measure = self.measures[0]
+        self.agg = agg
+        # Row positions per state and per (state, district): scoping is a lookup too
+        self._scopes = {"All": np.arange(len(cube))}
+        for state, idx in cube.groupby('state', sort=False).indices.items():
+            self._scopes[state] = idx
+        for key, idx in cube.groupby(list(LEVELS), sort=False).indices.items():
+            self._scopes[key] = idx
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, aggregate, filters, measures, agg='mean'):
+        """Cube of `measures` under `filters` (state and district are ignored: they are the drill-down)."""
+        if agg not in PARTIALS:
+            raise ValueError(f"Unsupported aggregation {agg!r} for a rollup; expected one of {', '.join(PARTIALS)}")
+        measures = (measures,) if isinstance(measures, str) else tuple(measures)
+        base = Filters(rural_urban=filters.rural_urban, segment=filters.segment)
+        cube = None
+        for partial in PARTIALS[agg]:
+            df = aggregate(make_query(base, DIMENSIONS, nulls=True, **{m: partial for m in measures}))
+            df = df.rename(columns={m: _partial(m, partial) for m in measures})
+            cube = df if cube is None else cube.merge(df, on=DIMENSIONS, how='outer')
+        return cls(cube.reset_index(drop=True), measures, agg)
+
+    def _scope(self, state, district):
+        if district != "All":
+            return self._scopes.get((state, district), np.arange(0))
+        return self._scopes.get(state, np.arange(0))
+
+    def rollup(self, by, state="All", district="All", where=()):
+        """The measures grouped by `by` (a tuple of dimensions) within the scope.
+
+        `where` is ((dimension, (values, ...)), ...), e.g. (('rural_urban', ('Rural',)),).
+        """
+        key = (tuple(by), state, district, tuple(where))
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        scoped = self.cube.iloc[self._scope(state, district)]
+        for dimension, values in where:
+            scoped = scoped[scoped[dimension].isin(values)]
+        spec = {_partial(m, p): COMBINE[p] for m in self.measures for p in PARTIALS[self.agg]}
+        if by:  # NULL keys of `by` are dropped here, as the engines drop them
+            grouped = scoped.groupby(list(by), sort=True)[list(spec)].agg(spec)
+        else:
+            grouped = pd.DataFrame([scoped[list(spec)].agg(spec)])
+        out = pd.DataFrame(index=grouped.index)
+        for m in self.measures:
+            if self.agg == 'mean':
+                count = grouped[_partial(m, 'count')]
+                out[m] = grouped[_partial(m, 'sum')] / count.where(count > 0)
+            else:
+                out[m] = grouped[_partial(m, PARTIALS[self.agg][0])]
+        out = out.reset_index(drop=not by)
+        with self._lock:
+            if len(self._memo) >= MEMO_ENTRIES:
+                self._memo.pop(next(iter(self._memo)))
+            self._memo[key] = out
+        return out
+
+    @staticmethod
+    def _keys(dimension, state, other):
+        # District names repeat across states: over the whole country a district keeps its state
+        if dimension == 'district' and state == "All" and other != 'state':
+            return ['state', 'district']
+        return [dimension]
+
+    def pivot(self, rows, columns=None, state="All", district="All", measure=None):
+        """Wide table: one row per value of `rows`, one column per value of `columns` (if any).
+
+        Over the whole country, districts are keyed by (state, district).
+        """
+        measure = measure or self.measure
+        index = self._keys(rows, state, columns)
+        if not columns:
+            return self.rollup(tuple(index), state, district).set_index(index)[[measure]]
+        keys = self._keys(columns, state, rows)
+        table = self.rollup(tuple(index + keys), state, district)
+        return table.pivot(index=index if len(index) > 1 else rows, columns=keys if len(keys) > 1 else columns,
+                           values=measure)
+
+    def members(self, level, state="All"):
+        """Values of a hierarchy level within a state, for the drill-down choices.
+
+        Districts over the whole country are (state, district) pairs.
+        """
+        keys = self._keys(level, state, None)
+        table = self.rollup(tuple(keys), state)
+        return table[level].tolist() if len(keys) == 1 else list(table[keys].itertuples(index=False, name=None))
+
+    def values(self, dimension):
+        """Values of any dimension present in the cube."""
+        return sorted(self.cube[dimension].dropna().unique().tolist())
+
+    def ranking(self, level, measure=None, n=10, state="All", where=()):
+        """(top, bottom): the `n` highest and lowest states or districts on a measure, best first / worst first."""
+        measure = measure or self.measure
+        by = LEVELS[:LEVELS.index(level) + 1]  # districts keep their state: names repeat across states
+        table = self.rollup(by, state, where=where)
+        values = table[measure].to_numpy(dtype=float)
+        ranked = np.flatnonzero(~np.isnan(values))
+        k = min(n, len(ranked))
+        if k == 0:
+            return table.iloc[:0], table.iloc[:0]
+        # Partial selection: O(rows) to find the k extremes, then only k are sorted
+        top = ranked[np.argpartition(-values[ranked], k - 1)[:k]]
+        bottom = ranked[np.argpartition(values[ranked], k - 1)[:k]]
+        top = top[np.argsort(-values[top], kind='stable')]
+        bottom = bottom[np.argsort(values[bottom], kind='stable')]
+        return table.iloc[top].reset_index(drop=True), table.iloc[bottom].reset_index(drop=True)
+
+
+# --------------------------
+# PARITY CHECK
+# --------------------------
+PARITY_BY = [(), ('state',), ('state', 'district'), ('rural_urban',), ('school_type', 'rural_urban'), ('highclass',)]
+PARITY_MEASURES = ('total_tch', 'facility_index', 'trained_comp')
+
+
+def _assert_same(expected, got, obj):
+    pd.testing.assert_frame_equal(expected.reset_index(drop=True), got.reset_index(drop=True), check_dtype=False,
+                                  check_exact=False, rtol=1e-9, obj=obj)
+
+
+def check_parity(engine=None):
+    """Rollups and rankings of every aggregation against `engine.aggregate`; raise AssertionError on a mismatch."""
+    engine = engine or get_engine()
+    states = engine.distinct('state')
+    values = tuple(engine.distinct('rural_urban'))
+    # No slice keeps schools without a rural_urban; every value (the Rankings page's default) leaves them out
+    slices = [(), (('rural_urban', values[:1]),), (('rural_urban', values),)]
+    checked = 0
+    for agg in PARTIALS:
+        rollups = Rollups.build(engine.aggregate, Filters(), PARITY_MEASURES, agg)
+        for state in ["All"] + states[:1]:
+            for where in slices:
+                filters = Filters(state=state, rural_urban=dict(where).get('rural_urban'))
+                for by in PARITY_BY:
+                    by = tuple(d for d in by if not (state != "All" and d == 'state'))
+                    expected = engine.aggregate(make_query(filters, by, **{m: agg for m in PARITY_MEASURES}))
+                    got = rollups.rollup(by, state, where=where)
+                    _assert_same(expected, got[list(by) + list(PARITY_MEASURES)],
+                                 f"rollup {agg} by {by} in {state} where {where}")
+                    checked += 1
+                # Rankings: the same n extremes as sorting the engine's result
+                for level in LEVELS:
+                    if level == 'state' and state != "All":
+                        continue
+                    by = LEVELS[:LEVELS.index(level) + 1]
+                    full = engine.aggregate(make_query(filters, by, **{m: agg for m in PARITY_MEASURES}))
+                    for measure in PARITY_MEASURES:
+                        top, bottom = rollups.ranking(level, measure, 5, state, where)
+                        ranked = full[measure].dropna()
+                        for got, expected in [(top, ranked.nlargest(5)), (bottom, ranked.nsmallest(5))]:
+                            np.testing.assert_allclose(got[measure].to_numpy(), expected.to_numpy(), rtol=1e-9,
+                                                       err_msg=f"ranking {agg} {measure} by {level} in {state}")
+                        checked += 1
+    return checked
+
+
+if __name__ == '__main__':
+    if '--parity' in sys.argv:
+        print(f"{check_parity()} rollups and rankings match the engine")
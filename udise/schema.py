@@ -0,0 +1,52 @@
+import pandas as pd
+
+# --------------------------
+# FILE LOCATIONS
+# --------------------------
+MAIN_CSV = "df_main.csv"
+STORE_DIR = "df_main_store"
+TRENDS_PARQUET = "preprocessed_prompt2.parquet"
+SEGMENTS_JSON = "segments.json"
+
+# --------------------------
+# COLUMNS
+# --------------------------
+SCHOOL_KEY = 'pseudocode'  # UDISE school identifier
+ROW_HASH = '_row_hash'  # hash of a school's source columns, stored with each row
+SEGMENT = 'segment'  # k-means segment of a school, stored once `udise.segments` has run
+
+DIMENSIONS = ['state', 'district', 'rural_urban', 'school_type', 'highclass']
+
+NUMERIC_COLS = [
+    'total_tch', 'male', 'female', 'transgender',
+    'gen_tch', 'sc_tch', 'st_tch', 'obc_tch',
+    'trained_comp', 'post_graduate_and_above', 'graduate', 'below_graduate',
+    'total_class_rooms', 'classrooms_in_good_condition',
+    'classrooms_needs_minor_repair', 'classrooms_needs_major_repair',
+    'total_boys_func_toilet', 'total_girls_func_toilet',
+    'func_boys_cwsn_friendly', 'func_girls_cwsn_friendly',
+    'library_availability', 'electricity_availability', 'playground_available',
+    'pucca_building_blocks', 'no_building_blocks',
+]
+
+FACILITY_COLS = ['total_class_rooms', 'library_availability', 'electricity_availability', 'playground_available']
+
+DERIVED_COLS = ['total_gender', 'facility_index', 'total_func_toilet', 'cwsn_toilet']
+
+
+def clean(df):
+    """Apply the cleaning every page used to do on df_main.csv, in place."""
+    df['rural_urban'] = df['rural_urban'].astype(str).str.strip()
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return add_derived(df)
+
+
+def add_derived(df):
+    """Add the derived measures shared by the analytics pages."""
+    df['total_gender'] = df[['male', 'female', 'transgender']].sum(axis=1)
+    df['facility_index'] = df[FACILITY_COLS].mean(axis=1)
+    df['total_func_toilet'] = df['total_boys_func_toilet'].fillna(0) + df['total_girls_func_toilet'].fillna(0)
+    df['cwsn_toilet'] = df['func_boys_cwsn_friendly'].fillna(0) + df['func_girls_cwsn_friendly'].fillna(0)
+    return df
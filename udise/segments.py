@@ -0,0 +1,232 @@
+"""School segments: mini-batch k-means over the columnar store.
+
+Schools are clustered on the infrastructure and staffing features behind
+facility_index and the infrastructure model (count features log-scaled,
+everything standardised). The store is streamed in record batches, so memory
+stays bounded whatever the number of schools:
+
+1. one pass accumulates the mean and variance of every feature;
+2. `EPOCHS` passes of mini-batch k-means (Sculley, 2010): each batch is
+   assigned to its nearest centres and each centre moves towards its points
+   with a per-centre learning rate of 1 / (points seen);
+3. one pass per state partition writes the final assignment back as a
+   `segment` column, so every engine can filter on it (`Filters.segment`).
+
+Centres, scaling and a readable label per segment are saved to
+segments.json; `udise.delta` uses them to assign new and changed schools.
+
+    python -m udise.segments [--k 8] [--store df_main_store]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from udise import store
+from udise.schema import SEGMENT, SEGMENTS_JSON, STORE_DIR
+
+K = 8
+EPOCHS = 3
+BATCH_ROWS = 65_536
+SEED = 0
+
+# feature -> (phrase when low, phrase when high)
+FEATURES = {
+    'electricity_availability': ('no electricity', 'electricity'),
+    'library_availability': ('no library', 'library'),
+    'playground_available': ('no playground', 'playground'),
+    'total_class_rooms': ('few classrooms', 'many classrooms'),
+    'classrooms_in_good_condition': ('few good classrooms', 'well-kept classrooms'),
+    'total_func_toilet': ('few toilets', 'many toilets'),
+    'pucca_building_blocks': ('no pucca building', 'pucca buildings'),
+    'total_tch': ('few teachers', 'large staff'),
+    'trained_comp': ('few computer-trained teachers', 'computer-trained staff'),
+    'female': ('few female teachers', 'many female teachers'),
+    'urban': ('rural', 'urban'),
+}
+COUNTS = ['total_class_rooms', 'classrooms_in_good_condition', 'total_func_toilet',
+          'pucca_building_blocks', 'total_tch', 'trained_comp', 'female']
+RAW_COLUMNS = [c for c in FEATURES if c not in ('urban', 'total_func_toilet')] + [
+    'rural_urban', 'total_boys_func_toilet', 'total_girls_func_toilet']
+
+
+def features(table):
+    """Unscaled feature matrix of an Arrow table with the RAW_COLUMNS."""
+    def column(name):
+        return pc.cast(table[name], pa.float64()).to_numpy(zero_copy_only=False)
+
+    cols = {c: column(c) for c in RAW_COLUMNS if c in FEATURES}
+    cols['total_func_toilet'] = (np.nan_to_num(column('total_boys_func_toilet'))
+                                 + np.nan_to_num(column('total_girls_func_toilet')))
+    urban = pc.equal(pc.utf8_trim_whitespace(pc.cast(table['rural_urban'], pa.string())), 'Urban')
+    cols['urban'] = pc.fill_null(urban, False).to_numpy(zero_copy_only=False).astype(float)
+    x = np.column_stack([cols[c] for c in FEATURES])
+    counts = [list(FEATURES).index(c) for c in COUNTS]
+    x[:, counts] = np.log1p(np.clip(x[:, counts], 0, None))
+    return x
+
+
+def _batches(store_dir):
+    """Feature matrices of about BATCH_ROWS schools each, streamed from the store."""
+    dataset = ds.dataset(store_dir, format='parquet', partitioning=store.PARTITIONING)
+    pending, rows = [], 0
+    for batch in dataset.to_batches(columns=RAW_COLUMNS, batch_size=BATCH_ROWS):
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= BATCH_ROWS:
+            yield features(pa.Table.from_batches(pending))
+            pending, rows = [], 0
+    if rows:
+        yield features(pa.Table.from_batches(pending))
+
+
+class Model:
+    def __init__(self, mean, std, centres, labels=None, sizes=None):
+        self.mean, self.std, self.centres = np.asarray(mean), np.asarray(std), np.asarray(centres)
+        self.labels = labels or []
+        self.sizes = sizes or []
+
+    def scale(self, x):
+        # Missing values sit at the mean and do not pull a school towards any centre
+        return np.nan_to_num((x - self.mean) / self.std, nan=0.0)
+
+    def nearest(self, z):
+        # |z - c|^2 = |z|^2 - 2 z.c + |c|^2; |z|^2 is the same for every centre
+        d = (self.centres ** 2).sum(axis=1) - 2 * z @ self.centres.T
+        return d.argmin(axis=1)
+
+    def assign(self, data):
+        """Segment of each school in an Arrow table or DataFrame."""
+        if not isinstance(data, pa.Table):
+            data = pa.Table.from_pandas(data[RAW_COLUMNS], preserve_index=False)
+        return self.nearest(self.scale(features(data))).astype(np.int32)
+
+    def save(self, path=SEGMENTS_JSON):
+        with open(path, 'w') as f:
+            json.dump({'features': list(FEATURES), 'mean': self.mean.tolist(), 'std': self.std.tolist(),
+                       'centres': self.centres.tolist(), 'labels': self.labels, 'sizes': self.sizes}, f, indent=1)
+
+    @classmethod
+    def load(cls, path=SEGMENTS_JSON):
+        try:
+            with open(path) as f:
+                spec = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if spec.get('features') != list(FEATURES):
+            return None
+        return cls(spec['mean'], spec['std'], spec['centres'], spec['labels'], spec['sizes'])
+
+
+def version(path=SEGMENTS_JSON):
+    """mtime of the saved model, to key caches on; None before the first run."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def assigned(store_dir=STORE_DIR):
+    """True if the store has a `segment` column; a store rebuilt since the last run has none."""
+    return store.has_store(store_dir) and SEGMENT in store.columns('main', store_dir)
+
+
+def label(centre, model):
+    """'Urban · electricity, large staff': area plus the two most distinctive features."""
+    names = list(FEATURES)
+    u = names.index('urban')
+    area = 'Urban' if centre[u] * model.std[u] + model.mean[u] >= 0.5 else 'Rural'
+    ranked = sorted((i for i, n in enumerate(names) if n != 'urban'), key=lambda i: -abs(centre[i]))
+    return f"{area} · " + ', '.join(FEATURES[names[i]][int(centre[i] > 0)] for i in ranked[:2])
+
+
+# --------------------------
+# TRAINING
+# --------------------------
+def _moments(store_dir):
+    n = total = square = 0
+    for x in _batches(store_dir):
+        valid = ~np.isnan(x)
+        n = n + valid.sum(axis=0)
+        total = total + np.where(valid, x, 0).sum(axis=0)
+        square = square + np.where(valid, x * x, 0).sum(axis=0)
+    mean = total / np.maximum(n, 1)
+    std = np.sqrt(np.maximum(square / np.maximum(n, 1) - mean ** 2, 0))
+    return mean, np.where(std > 0, std, 1.0)
+
+
+def _init(z, k, rng):
+    """k-means++ seeding on one batch."""
+    centres = [z[rng.integers(len(z))]]
+    d2 = ((z - centres[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        p = d2 / d2.sum() if d2.sum() > 0 else None
+        centres.append(z[rng.choice(len(z), p=p)])
+        d2 = np.minimum(d2, ((z - centres[-1]) ** 2).sum(axis=1))
+    return np.array(centres)
+
+
+def fit(store_dir=STORE_DIR, k=K, epochs=EPOCHS, seed=SEED):
+    mean, std = _moments(store_dir)
+    model = Model(mean, std, np.zeros((k, len(FEATURES))))
+    rng = np.random.default_rng(seed)
+    seen = np.zeros(k)
+    for epoch in range(epochs):
+        for x in _batches(store_dir):
+            z = model.scale(x)
+            if not seen.any():
+                model.centres = _init(z, k, rng)
+            nearest = model.nearest(z)
+            counts = np.bincount(nearest, minlength=k)
+            sums = np.column_stack([np.bincount(nearest, z[:, j], minlength=k) for j in range(z.shape[1])])
+            # Per-centre rate 1/seen: the batch's points move their centre
+            # exactly as far as a running mean would
+            seen += counts
+            hit = counts > 0
+            rate = counts[hit] / seen[hit]
+            model.centres[hit] += rate[:, None] * (sums[hit] / counts[hit, None] - model.centres[hit])
+    return model
+
+
+def write_assignments(model, store_dir=STORE_DIR):
+    """Add the `segment` column to every state partition; returns schools per segment."""
+    sizes = np.zeros(len(model.centres), dtype=int)
+    for state, folder in store.partitions(store_dir).items():
+        table = pq.read_table(folder)
+        if SEGMENT in table.column_names:
+            table = table.drop_columns([SEGMENT])
+        segment = model.assign(table.select(RAW_COLUMNS))
+        sizes += np.bincount(segment, minlength=len(sizes))
+        table = table.append_column(SEGMENT, pa.array(segment))
+        table = table.append_column(store.PARTITION_COL, pa.array([state] * len(table), pa.string()))
+        store.write_partitions(table, store_dir)
+    return sizes
+
+
+def segment(store_dir=STORE_DIR, k=K, path=SEGMENTS_JSON):
+    if not store.has_store(store_dir):
+        raise SystemExit(f"No store at {store_dir}: build it with `python -m udise.store` first")
+    model = fit(store_dir, k)
+    model.labels = [f"S{i + 1} · {label(c, model)}" for i, c in enumerate(model.centres)]
+    model.sizes = write_assignments(model, store_dir).tolist()
+    model.save(path)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--k', type=int, default=K, help='number of segments')
+    parser.add_argument('--store', default=STORE_DIR)
+    args = parser.parse_args()
+    model = segment(args.store, args.k)
+    for name, size in zip(model.labels, model.sizes):
+        print(f"{size:>10,}  {name}")
+
+
+if __name__ == '__main__':
+    main()
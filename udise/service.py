@@ -0,0 +1,66 @@
+"""Shared query service: single-flight coalescing on a bounded worker pool.
+
+When a shared dashboard link brings many sessions to the same uncached
+filter at once, every script thread would otherwise run the same group-by
+side by side and fight over the GIL. The service keys each request by
+(method, arguments); the first caller starts the work on the pool and every
+identical request that arrives while it is running waits on the same future.
+The pool size bounds how much heavy work runs at once, whatever the number
+of sessions.
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from udise import metrics, profiling
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class QueryService:
+    def __init__(self, engine, workers=None):
+        self.engine = engine
+        workers = workers or int(os.environ.get('UDISE_QUERY_WORKERS', DEFAULT_WORKERS))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='udise-query')
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'computed': 0, 'coalesced': 0}
+
+    def submit(self, method, *args):
+        """Future for engine.<method>(*args), shared with identical in-flight requests."""
+        key = (method, args)
+        if profiling.active():
+            # Run on the profiled script thread so the engine's work is in the profile
+            future = Future()
+            future.set_result(getattr(self.engine, method)(*args))
+            return future
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future
+            self.stats['computed'] += 1
+            future = self._pool.submit(self._call, key, method, args, metrics.capture())
+            self._inflight[key] = future
+        return future
+
+    def _call(self, key, method, args, captured=(None, 0)):
+        # Engine spans land in the rerun that started the work
+        try:
+            with metrics.attached(captured):
+                return getattr(self.engine, method)(*args)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def aggregate(self, query):
+        return self.submit('aggregate', query).result()
+
+    def frame(self, filters, columns, source='main', sample=None):
+        return self.submit('frame', filters, tuple(columns), source, sample).result()
+
+    def distinct(self, column, source='main'):
+        return self.submit('distinct', column, source).result()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
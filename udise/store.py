@@ -0,0 +1,200 @@
+"""Columnar store for df_main.csv.
+
+The CSV is cleaned once and written as a Parquet dataset partitioned by
+state, so readers can prune whole states and read only the columns they need.
+The CSV is parsed by Arrow's multi-threaded reader and cleaned column by
+column with Arrow compute kernels on a thread pool, with the same result as
+`schema.clean` on a pandas read.
+
+    python -m udise.store [df_main.csv] [df_main_store]
+"""
+import glob
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from udise.schema import DERIVED_COLS, MAIN_CSV, NUMERIC_COLS, ROW_HASH, STORE_DIR, TRENDS_PARQUET, add_derived
+
+PARTITION_COL = 'state'
+ROW_GROUP_ROWS = 128 * 1024
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COL, pa.string())]), flavor='hive')
+# What pd.to_numeric accepts, after trimming; anything else becomes null
+NUMBER_RE = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+
+
+# --------------------------
+# CSV INGESTION
+# --------------------------
+def _strip(column):
+    return pc.utf8_trim_whitespace(column.cast(pa.string()))
+
+
+def to_numeric(column):
+    """An Arrow column as float64, with anything that is not a number as null (as `pd.to_numeric(errors='coerce')`)."""
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+        return column
+    if pa.types.is_null(column.type):
+        return column.cast(pa.float64())
+    text = pc.utf8_trim_whitespace(column.cast(pa.string()))
+    numbers = pc.if_else(pc.match_substring_regex(text, NUMBER_RE), text, pa.scalar(None, pa.string()))
+    return numbers.cast(pa.float64())
+
+
+def _clean_column(name, column):
+    if name == 'rural_urban':
+        return _strip(column)
+    if name in NUMERIC_COLS:
+        return to_numeric(column)
+    if pa.types.is_null(column.type):
+        return column.cast(pa.float64())  # pandas reads an empty column as float
+    return column
+
+
+def read_csv(csv_path=MAIN_CSV, threads=None):
+    """df_main.csv parsed and cleaned; equivalent to `clean(pd.read_csv(...))`."""
+    table = pacsv.read_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True),  # empty -> NaN, as pandas
+    )
+    # Arrow kernels release the GIL, so the columns clean in parallel
+    with ThreadPoolExecutor(max_workers=threads or os.cpu_count()) as pool:
+        columns = list(pool.map(_clean_column, table.column_names, table.columns))
+    df = pa.table(columns, names=table.column_names).to_pandas()
+    return add_derived(df)
+
+
+# --------------------------
+# STORE
+# --------------------------
+def row_hash(df):
+    """64-bit hash of each row's source columns, stable across CSV type inference."""
+    cols = sorted(c for c in df.columns if c not in DERIVED_COLS and c != ROW_HASH)
+    canon = pd.DataFrame({
+        c: df[c].astype('float64') if pd.api.types.is_numeric_dtype(df[c]) else df[c].astype('string')
+        for c in cols
+    })
+    return pd.util.hash_pandas_object(canon, index=False).to_numpy()
+
+
+def to_table(df, schema=None):
+    # Mixed object columns cannot be written to Parquet as-is
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype('string')
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return table if schema is None else table.select(schema.names).cast(schema)
+
+
+def write_partitions(table, store_dir=STORE_DIR):
+    """Write `table`, replacing only the state partitions it contains."""
+    ds.write_dataset(
+        table, store_dir, format='parquet',
+        partitioning=PARTITIONING,
+        existing_data_behavior='delete_matching',
+        # Batches from the CSV reader are small; without this every few
+        # hundred rows become a row group and scans pay per-group overhead
+        min_rows_per_group=ROW_GROUP_ROWS,
+        max_rows_per_group=ROW_GROUP_ROWS,
+    )
+
+
+def build_store(csv_path=MAIN_CSV, store_dir=STORE_DIR):
+    df = read_csv(csv_path)
+    df[ROW_HASH] = row_hash(df)
+    write_partitions(to_table(df), store_dir)
+    return len(df)
+
+
+def has_store(store_dir=STORE_DIR):
+    return os.path.isdir(store_dir)
+
+
+def store_glob(store_dir=STORE_DIR):
+    return os.path.join(store_dir, '**', '*.parquet')
+
+
+def partitions(store_dir=STORE_DIR):
+    """Map each state to its partition directory in the store."""
+    parts = {}
+    for entry in sorted(os.listdir(store_dir)):
+        key, _, value = entry.partition('=')
+        if key == PARTITION_COL:
+            parts[unquote(value)] = os.path.join(store_dir, entry)
+    return parts
+
+
+def partition_rows(state="All", store_dir=STORE_DIR):
+    """Rows in the partitions a query on `state` has to scan, from Parquet footers."""
+    parts = partitions(store_dir)
+    if state != "All":
+        parts = {state: parts[state]} if state in parts else {}
+    return sum(
+        parquet_rows(os.path.join(path, name))
+        for path in parts.values() for name in os.listdir(path) if name.endswith('.parquet')
+    )
+
+
+def parquet_rows(path):
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def signature(source='main', store_dir=STORE_DIR):
+    """(path, size, mtime) of the files behind a source, to notice rewrites cheaply."""
+    if source == 'trends':
+        paths = [TRENDS_PARQUET]
+    elif has_store(store_dir):
+        paths = sorted(glob.glob(store_glob(store_dir), recursive=True))
+    else:
+        paths = [MAIN_CSV]
+    out = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        out.append((path, st.st_size, st.st_mtime_ns))
+    return tuple(out)
+
+
+def read_main(columns=None, store_dir=STORE_DIR, csv_path=MAIN_CSV):
+    """Read the cleaned school table, from the store if built, else from the CSV."""
+    if not has_store(store_dir):
+        df = read_csv(csv_path)
+        return df[columns] if columns else df
+    table = pq.read_table(store_dir, columns=columns, partitioning=PARTITIONING)
+    df = table.to_pandas()
+    if PARTITION_COL in df.columns:
+        # Partition keys come back as categoricals; keep them plain values
+        df[PARTITION_COL] = df[PARTITION_COL].astype(object)
+    return df
+
+
+def read_trends(columns=None, path=TRENDS_PARQUET):
+    return pd.read_parquet(path, columns=columns)
+
+
+def trends_columns(path=TRENDS_PARQUET):
+    return pq.read_schema(path).names
+
+
+def columns(source='main', store_dir=STORE_DIR, csv_path=MAIN_CSV):
+    """Column names of a source, read from file metadata or the CSV header (no rows)."""
+    if source == 'trends':
+        return trends_columns()
+    if has_store(store_dir):
+        return ds.dataset(store_dir, format='parquet', partitioning=PARTITIONING).schema.names
+    return list(dict.fromkeys(list(pd.read_csv(csv_path, nrows=0).columns) + DERIVED_COLS))
+
+
+if __name__ == '__main__':
+    rows = build_store(*sys.argv[1:3])
+    print(f"Wrote {rows} rows to {sys.argv[2] if len(sys.argv) > 2 else STORE_DIR}")
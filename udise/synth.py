@@ -0,0 +1,184 @@
+"""Synthetic UDISE-scale data.
+
+Writes a df_main.csv and preprocessed_prompt2.parquet with the columns,
+cardinalities and null patterns the pages expect: 36 states with a skewed
+share of schools, up to 21 districts per state (~750 in all), a mostly rural mix with the raw
+file's stray whitespace in rural_urban, a few percent of missing numerics,
+and facility/teacher indices that drift upwards year on year. With
+--boundaries it also writes states.geojson and districts.geojson: a grid of
+states cut into district strips, with wiggly shared edges, for `udise.geo`.
+
+    python -m udise.synth 1500000 [out_dir] [--years 5] [--seed 0] [--boundaries]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from udise.schema import MAIN_CSV, NUMERIC_COLS, SCHOOL_KEY, TRENDS_PARQUET
+
+STATES = [
+    'Andaman and Nicobar Islands', 'Andhra Pradesh', 'Arunachal Pradesh', 'Assam', 'Bihar',
+    'Chandigarh', 'Chhattisgarh', 'Dadra and Nagar Haveli and Daman and Diu', 'Delhi', 'Goa',
+    'Gujarat', 'Haryana', 'Himachal Pradesh', 'Jammu and Kashmir', 'Jharkhand', 'Karnataka',
+    'Kerala', 'Ladakh', 'Lakshadweep', 'Madhya Pradesh', 'Maharashtra', 'Manipur', 'Meghalaya',
+    'Mizoram', 'Nagaland', 'Odisha', 'Puducherry', 'Punjab', 'Rajasthan', 'Sikkim', 'Tamil Nadu',
+    'Telangana', 'Tripura', 'Uttar Pradesh', 'Uttarakhand', 'West Bengal',
+]
+SCHOOL_TYPES = ['Co-educational', 'Boys', 'Girls']
+HIGHCLASSES = [5, 8, 10, 12]
+RURAL_URBAN = ['Rural', 'Urban', 'Rural ', ' Urban']  # the raw file has stray whitespace
+NULL_RATE = 0.04
+
+
+def generate_main(n, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, len(STATES) + 1) ** 0.9  # a few very large states
+    weights = rng.permutation(weights / weights.sum())
+    state_idx = rng.choice(len(STATES), n, p=weights)
+    district_no = np.minimum(rng.geometric(0.12, n), 21)
+    states = np.asarray(STATES, dtype=object)[state_idx]
+    districts = np.char.add(np.char.add(states.astype(str), ' District '), district_no.astype(str))
+
+    rural = rng.random(n) < 0.82
+    ru = np.where(rural, rng.choice(RURAL_URBAN[0::2], n, p=[0.97, 0.03]),
+                  rng.choice(RURAL_URBAN[1::2], n, p=[0.97, 0.03])).astype(object)
+    ru[rng.random(n) < 0.002] = np.nan
+
+    df = pd.DataFrame({
+        SCHOOL_KEY: np.arange(10_000_000_000, 10_000_000_000 + n),
+        'state': states,
+        'district': districts,
+        'rural_urban': ru,
+        'school_type': rng.choice(SCHOOL_TYPES, n, p=[0.86, 0.06, 0.08]),
+        'highclass': rng.choice(HIGHCLASSES, n, p=[0.45, 0.3, 0.15, 0.1]),
+    })
+
+    size = np.where(rural, 1.0, 2.2) * rng.lognormal(0, 0.6, n)
+    total_tch = np.maximum(1, rng.poisson(4 * size))
+    female_share = np.clip(rng.normal(np.where(rural, 0.42, 0.62), 0.15), 0, 1)
+    female = rng.binomial(total_tch, female_share)
+    transgender = rng.binomial(total_tch - female, 0.0005)
+    df['total_tch'] = total_tch
+    df['female'] = female
+    df['transgender'] = transgender
+    df['male'] = total_tch - female - transgender
+    caste_split = rng.dirichlet([4.5, 2, 1, 2.5], n)
+    for col, share in zip(['gen_tch', 'sc_tch', 'st_tch', 'obc_tch'], caste_split.T):
+        df[col] = np.round(total_tch * share)
+    qual_split = np.where(rural[:, None], rng.dirichlet([3, 5, 2], n), rng.dirichlet([1, 5, 4], n))
+    for col, share in zip(['below_graduate', 'graduate', 'post_graduate_and_above'], qual_split.T):
+        df[col] = np.round(total_tch * share)
+    df['trained_comp'] = rng.binomial(total_tch, np.where(rural, 0.25, 0.55))
+
+    rooms = np.maximum(1, rng.poisson(3 * size))
+    good = rng.binomial(rooms, 0.7)
+    minor = rng.binomial(rooms - good, 0.6)
+    df['total_class_rooms'] = rooms
+    df['classrooms_in_good_condition'] = good
+    df['classrooms_needs_minor_repair'] = minor
+    df['classrooms_needs_major_repair'] = rooms - good - minor
+    df['total_boys_func_toilet'] = rng.poisson(1.2 * size)
+    df['total_girls_func_toilet'] = rng.poisson(1.3 * size)
+    df['func_boys_cwsn_friendly'] = rng.binomial(1, np.where(rural, 0.2, 0.45))
+    df['func_girls_cwsn_friendly'] = rng.binomial(1, np.where(rural, 0.22, 0.5))
+    df['library_availability'] = rng.binomial(1, np.where(rural, 0.7, 0.9))
+    df['electricity_availability'] = rng.binomial(1, np.where(rural, 0.8, 0.98))
+    df['playground_available'] = rng.binomial(1, np.where(rural, 0.65, 0.75))
+    df['pucca_building_blocks'] = rng.poisson(1.1, n)
+    df['no_building_blocks'] = rng.binomial(1, 0.03, n)
+
+    numeric = [c for c in NUMERIC_COLS if c in df.columns]
+    for col in numeric:
+        values = df[col].astype(float)
+        values[rng.random(n) < NULL_RATE] = np.nan
+        df[col] = values
+    return df
+
+
+def generate_trends(main, years=5, seed=0):
+    """One row per school per year, with indices improving at a per-district rate."""
+    rng = np.random.default_rng(seed + 1)
+    n = len(main)
+    districts, district_idx = np.unique(main['district'].astype(str), return_inverse=True)
+    facility_slope = rng.normal(0.03, 0.03, len(districts))[district_idx]
+    teacher_slope = rng.normal(0.02, 0.03, len(districts))[district_idx]
+    facility_base = rng.beta(4, 3, n)
+    teacher_base = rng.beta(3, 3, n)
+    first_year = 2024 - years
+    frames = []
+    for k in range(years):
+        frames.append(pd.DataFrame({
+            SCHOOL_KEY: main[SCHOOL_KEY].to_numpy(),
+            'state': main['state'].to_numpy(),
+            'district': main['district'].to_numpy(),
+            'year': first_year + k,
+            'facility_index': np.clip(facility_base + k * facility_slope + rng.normal(0, 0.05, n), 0, 1),
+            'teacher_quality_index': np.clip(teacher_base + k * teacher_slope + rng.normal(0, 0.05, n), 0, 1),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _edge(start, end, step=0.01, amplitude=0.03):
+    """Points from start to end with a wiggle that depends only on position,
+    so two polygons sharing the edge trace it identically."""
+    n = max(2, int(np.hypot(end[0] - start[0], end[1] - start[1]) / step))
+    t = np.linspace(0, 1, n, endpoint=False)[:, None]
+    pts = np.asarray(start) + t * (np.asarray(end) - np.asarray(start))
+    x, y = pts[:, 0].copy(), pts[:, 1].copy()
+    pts[:, 0] += amplitude * np.sin(7 * y) * np.sin(3 * x)
+    pts[:, 1] += amplitude * np.sin(5 * x) * np.cos(11 * y)
+    return pts
+
+
+def _rectangle(x0, y0, x1, y1):
+    corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+    ring = np.vstack([_edge(a, b) for a, b in zip(corners, corners[1:] + corners[:1])])
+    ring = np.vstack([ring, ring[:1]])
+    return {'type': 'Polygon', 'coordinates': [np.round(ring, 5).tolist()]}
+
+
+def generate_boundaries(districts_per_state=21):
+    """State and district FeatureCollections laid out on a lon/lat grid over India."""
+    states, districts = [], []
+    width, height = 4.5, 4.5
+    for k, state in enumerate(STATES):
+        x0, y0 = 68 + (k % 6) * width, 8 + (k // 6) * height
+        states.append({'type': 'Feature', 'properties': {'ST_NM': state},
+                       'geometry': _rectangle(x0, y0, x0 + width, y0 + height)})
+        strip = width / districts_per_state
+        for d in range(districts_per_state):
+            districts.append({'type': 'Feature', 'properties': {'ST_NM': state, 'DISTRICT': f"{state} District {d + 1}"},
+                              'geometry': _rectangle(x0 + d * strip, y0, x0 + (d + 1) * strip, y0 + height)})
+    return ({'type': 'FeatureCollection', 'features': states},
+            {'type': 'FeatureCollection', 'features': districts})
+
+
+def write_boundaries(out_dir='.'):
+    for name, collection in zip(('states', 'districts'), generate_boundaries()):
+        with open(os.path.join(out_dir, f"{name}.geojson"), 'w') as f:
+            json.dump(collection, f)
+
+
+def write(n, out_dir='.', years=5, seed=0):
+    os.makedirs(out_dir, exist_ok=True)
+    main = generate_main(n, seed)
+    main.to_csv(os.path.join(out_dir, MAIN_CSV), index=False)
+    generate_trends(main, years, seed).to_parquet(os.path.join(out_dir, TRENDS_PARQUET), index=False)
+    return main
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('out_dir', nargs='?', default='.')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--boundaries', action='store_true', help='also write synthetic GeoJSON boundaries')
+    args = parser.parse_args()
+    write(args.rows, args.out_dir, args.years, args.seed)
+    if args.boundaries:
+        write_boundaries(args.out_dir)
+    print(f"Wrote {args.rows} schools x {args.years} years to {args.out_dir}")
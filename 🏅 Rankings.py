@@ -0,0 +1,91 @@
+import streamlit as st
+
+from udise.app import SHARED, rollups, sidebar_filters
+from udise.metrics import begin_rerun, end_rerun, span
+from udise.query import Filters
+from udise.rollup import PARTIALS
+from udise.schema import DERIVED_COLS, NUMERIC_COLS
+
+# --------------------------
+# PAGE CONFIG
+# --------------------------
+st.set_page_config(page_title="Rankings", layout="wide", page_icon="🏅")
+begin_rerun("Rankings")
+
+st.title("🏅 State and District Rankings")
+st.markdown("The highest and lowest states or districts on any measure, for any mix of rural/urban and school types.")
+
+MEASURES = NUMERIC_COLS + DERIVED_COLS
+DEFAULT_MEASURES = ['facility_index', 'total_func_toilet', 'cwsn_toilet', 'trained_comp']
+
+
+def title(column):
+    return column.replace('_', ' ').title()
+
+
+# --------------------------
+# FILTERS
+# --------------------------
+st.sidebar.header("Filters")
+filters = sidebar_filters(location=False)
+agg = st.sidebar.selectbox("Aggregation", list(PARTIALS), index=list(PARTIALS).index('mean'))
+
+# Every measure in one cube, with rural/urban and school type kept as
+# dimensions: changing any of them below re-ranks without a query
+rollup = rollups(Filters(segment=filters.segment), MEASURES, agg)
+
+school_types = rollup.values('school_type')
+chosen_types = st.sidebar.multiselect("School Type", school_types, default=school_types)
+
+where = []
+if filters.rural_urban is not None:
+    # Always applied, even with every value chosen: like the engine's filter, it leaves out schools without one
+    where.append(('rural_urban', filters.rural_urban))
+if set(chosen_types) != set(school_types):
+    where.append(('school_type', tuple(chosen_types)))
+where = tuple(where)
+
+# --------------------------
+# RANKING OPTIONS
+# --------------------------
+col1, col2, col3 = st.columns(3)
+level = col1.radio("Rank", ['state', 'district'], horizontal=True, format_func=lambda v: f"{v.title()}s")
+states = ["All"] + rollup.members('state')
+st.session_state.setdefault('rank_within', st.session_state[SHARED]['state'])
+if st.session_state.rank_within not in states:
+    st.session_state.rank_within = "All"
+within = col2.selectbox("Within", states, key='rank_within', disabled=level == 'state',
+                        format_func=lambda s: "🇮🇳 All India" if s == "All" else s)
+n = col3.slider("Show top and bottom", 3, 25, 10)
+measures = st.multiselect("Measures", MEASURES, default=DEFAULT_MEASURES, format_func=title)
+scope = "All" if level == 'state' else within
+
+# --------------------------
+# RANKING TABLES
+# --------------------------
+if not measures:
+    st.info("Pick at least one measure.")
+for measure in measures:
+    with span('figure', f"Ranking {measure}"):
+        top, bottom = rollup.ranking(level, measure, n, scope, where)
+        st.subheader(f"{title(measure)} ({agg})")
+        if top.empty:
+            st.info("No schools match these filters.")
+            continue
+        columns = ['state', 'district'][:2 if level == 'district' else 1] + [measure]
+        high, low = st.columns(2)
+        for box, table, heading in [(high, top, f"⬆️ Highest {len(top)}"), (low, bottom, f"⬇️ Lowest {len(bottom)}")]:
+            box.markdown(f"**{heading}**")
+            table = table[columns].rename(columns={c: title(c) for c in columns})
+            table.index = range(1, len(table) + 1)
+            box.dataframe(table.round(2), use_container_width=True)
+
+st.markdown("""
+<footer>
+    <hr>
+    <p>Made with ❤️ and purpose by <b>The Role Players</b><br>
+    Empowering Education through Data</p>
+</footer>
+""", unsafe_allow_html=True)
+
+end_rerun()
@@ -1,11 +1,20 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from udise.app import correlation, density, downloads, points, sidebar_filters
+from udise.binning import MAX_POINTS
+from udise.lazy import lazy_import
+from udise.metrics import begin_rerun, end_rerun, span
+from udise.progressive import page_queries, progressive, settle
+from udise.query import make_query
+
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
 
 # --------------------------
 # PAGE CONFIG
 # --------------------------
 st.set_page_config(page_title="Socioeconomic Impact on Enrolment", layout="wide", page_icon="📊")
+begin_rerun("Education")
 st.markdown("""
 <style>
 .main {background: linear-gradient(to bottom right, #f7f9ff, #e6f0ff);}
@@ -18,137 +27,119 @@ st.markdown("""
 st.title("📊 Household Income, Parental Education & Employment vs Enrolment/Dropout")
 st.markdown("Explore socio-economic factors affecting student enrolment and retention using school proxies.")
 
-# --------------------------
-# LOAD DATA
-# --------------------------
-@st.cache_data
-def load_data(path="df_main.csv"):
-    df = pd.read_csv(path)
-    df['rural_urban'] = df['rural_urban'].astype(str).str.strip()
-    
-    # Numeric columns
-    numeric_cols = ['total_tch','male','female','transgender','total_class_rooms',
-                    'library_availability','electricity_availability','playground_available']
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Derived columns
-    df['total_gender'] = df[['male','female','transgender']].sum(axis=1)
-    df['facility_index'] = df[['total_class_rooms','library_availability','electricity_availability','playground_available']].mean(axis=1)
-    
-    return df
-
-df = load_data()
-
 # --------------------------
 # FILTERS
 # --------------------------
 st.sidebar.header("Filters")
-state = st.sidebar.selectbox("State", ["All"] + sorted(df['state'].dropna().unique().tolist()))
-district = st.sidebar.selectbox("District", ["All"] + sorted(df['district'].dropna().unique().tolist()))
-rural_urban = st.sidebar.multiselect("Rural/Urban", df['rural_urban'].dropna().unique().tolist(), default=df['rural_urban'].dropna().unique().tolist())
-
-filtered_df = df.copy()
-if state != "All":
-    filtered_df = filtered_df[filtered_df['state']==state]
-if district != "All":
-    filtered_df = filtered_df[filtered_df['district']==district]
-filtered_df = filtered_df[filtered_df['rural_urban'].isin(rural_urban)]
+filters = sidebar_filters()
 
 # --------------------------
 # METRICS
 # --------------------------
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("🏫 Total Teachers", f"{filtered_df['total_tch'].sum():.0f}")
-col2.metric("👩‍🏫 Female Teachers", f"{filtered_df['female'].sum():.0f}")
-col3.metric("🏫 Total Students (Proxy)", f"{filtered_df['total_gender'].sum():.0f}")
-col4.metric("🏫 Facility Index", f"{filtered_df['facility_index'].mean():.2f}")
+@progressive(make_query(filters, total_tch='sum', female='sum', total_gender='sum',
+                        facility_index='mean'))
+def metric_cards(agg):
+    metrics = agg.iloc[0]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("🏫 Total Teachers", f"{metrics['total_tch']:.0f}")
+    col2.metric("👩‍🏫 Female Teachers", f"{metrics['female']:.0f}")
+    col3.metric("🏫 Total Students (Proxy)", f"{metrics['total_gender']:.0f}")
+    col4.metric("🏫 Facility Index", f"{metrics['facility_index']:.2f}")
 st.markdown("---")
 
 # --------------------------
 # PRE-COMPUTE AGGREGATES
 # --------------------------
-@st.cache_data
-def preprocess_grouped(df):
-    grouped_rural = df.groupby('rural_urban').agg({
-        'total_gender':'sum',
-        'total_tch':'mean',
-        'facility_index':'mean'
-    }).reset_index()
-    
-    grouped_school = df.groupby('school_type').agg({'total_gender':'sum'}).reset_index()
-    grouped_class = df.groupby('highclass').agg({'total_gender':'sum'}).reset_index()
+def grouped_queries(filters):
+    grouped_rural = make_query(filters, 'rural_urban', total_gender='sum', total_tch='mean', facility_index='mean')
+    grouped_school = make_query(filters, 'school_type', total_gender='sum')
+    grouped_class = make_query(filters, 'highclass', total_gender='sum')
     return grouped_rural, grouped_school, grouped_class
 
-grouped_rural, grouped_school, grouped_class = preprocess_grouped(filtered_df)
+grouped_rural, grouped_school, grouped_class = grouped_queries(filters)
 
 # --------------------------
 # TABS
 # --------------------------
 tabs = st.tabs([
-    "Enrolment vs Teachers","Facility Index","School Type","Highclass/Lowclass","Rural vs Urban","Correlation Heatmap","Socioeconomic Proxy"
+    "Enrolment vs Teachers","Facility Index","School Type","Highclass/Lowclass","Rural vs Urban","Correlation Heatmap","Socioeconomic Proxy","School-level Scatter"
 ])
 
 # --------------------------
 # Tab 1: Enrolment vs Teachers
 # --------------------------
-with tabs[0]:
+with tabs[0], span('figure', 'Enrolment vs Teachers'):
     st.subheader("1️⃣ Student Enrolment vs Teachers (Aggregated)")
-    agg = filtered_df.groupby('rural_urban').agg({'total_tch':'mean','total_gender':'sum'}).reset_index()
-    fig = px.scatter(agg, x='total_tch', y='total_gender', color='rural_urban', size='total_gender',
-                     labels={'total_tch':'Average Teachers','total_gender':'Total Students'}, hover_data=['rural_urban'])
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', total_tch='mean', total_gender='sum'))
+    def enrolment_vs_teachers(agg):
+        fig = px.scatter(agg, x='total_tch', y='total_gender', color='rural_urban', size='total_gender',
+                         labels={'total_tch':'Average Teachers','total_gender':'Total Students'}, hover_data=['rural_urban'])
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("More teachers correlate with higher student enrolment, especially in rural schools.")
 
 # --------------------------
 # Tab 2: Facility Index
 # --------------------------
-with tabs[1]:
+with tabs[1], span('figure', 'Facility Index'):
     st.subheader("2️⃣ Facility Index vs Enrolment (Aggregated)")
-    agg = filtered_df.groupby('rural_urban').agg({'facility_index':'mean','total_gender':'sum'}).reset_index()
-    fig = px.scatter(agg, x='facility_index', y='total_gender', color='rural_urban', size='total_gender',
-                     labels={'facility_index':'Facility Index','total_gender':'Total Students'}, hover_data=['rural_urban'])
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, 'rural_urban', facility_index='mean', total_gender='sum'))
+    def facility_index(agg):
+        fig = px.scatter(agg, x='facility_index', y='total_gender', color='rural_urban', size='total_gender',
+                         labels={'facility_index':'Facility Index','total_gender':'Total Students'}, hover_data=['rural_urban'])
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("Better school facilities correlate with higher enrolment and lower dropout rates.")
 
 # --------------------------
 # Tab 3: School Type
 # --------------------------
-with tabs[2]:
+with tabs[2], span('figure', 'School Type'):
     st.subheader("3️⃣ Enrolment by School Type")
-    agg = filtered_df.groupby('school_type').agg({'total_gender':'sum'}).reset_index()
-    fig = px.bar(agg, x='school_type', y='total_gender', text='total_gender', color='school_type')
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(grouped_school)
+    def school_type(agg):
+        fig = px.bar(agg, x='school_type', y='total_gender', text='total_gender', color='school_type')
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("Private/residential schools have higher enrolment compared to government schools.")
 
 # --------------------------
 # Tab 4: Highclass / Lowclass
 # --------------------------
-with tabs[3]:
+with tabs[3], span('figure', 'Highclass/Lowclass'):
     st.subheader("4️⃣ Highclass vs Lowclass vs Enrollment")
-    agg = filtered_df.groupby('highclass').agg({'total_gender':'sum'}).reset_index()
-    fig = px.bar(agg, x='highclass', y='total_gender', text='total_gender', color='highclass')
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(grouped_class)
+    def highclass_lowclass(agg):
+        fig = px.bar(agg, x='highclass', y='total_gender', text='total_gender', color='highclass')
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("Upper classes may have higher dropout risk in rural areas; proxy for household education and employment influence.")
 
 # --------------------------
 # Tab 5: Rural vs Urban
 # --------------------------
-with tabs[4]:
+with tabs[4], span('figure', 'Rural vs Urban'):
     st.subheader("5️⃣ Rural vs Urban Enrolment")
-    agg = filtered_df.groupby('rural_urban').agg({'total_gender':'sum'}).reset_index()
-    fig = px.bar(agg, x='rural_urban', y='total_gender', text='total_gender', color='rural_urban')
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(grouped_rural)
+    def rural_vs_urban(agg):
+        agg = agg[['rural_urban', 'total_gender']]
+        fig = px.bar(agg, x='rural_urban', y='total_gender', text='total_gender', color='rural_urban')
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("Urban schools tend to have higher enrolment due to better household income and parental education levels.")
 
 # --------------------------
 # Tab 6: Correlation Heatmap
 # --------------------------
-with tabs[5]:
+with tabs[5], span('figure', 'Correlation Heatmap'):
     st.subheader("6️⃣ Correlation Heatmap (Proxy Socioeconomic)")
     cols = ['total_gender','total_tch','facility_index','total_class_rooms']
-    corr = filtered_df[cols].corr()
+    corr = correlation(filters, cols)
     fig = px.imshow(corr, text_auto=True, color_continuous_scale='Blues')
     st.plotly_chart(fig, use_container_width=True)
     st.info("Higher teacher numbers and better facilities positively correlate with student enrolment.")
@@ -156,17 +147,56 @@ with tabs[5]:
 # --------------------------
 # Tab 7: Socioeconomic Proxy
 # --------------------------
-with tabs[6]:
+with tabs[6], span('figure', 'Socioeconomic Proxy'):
     st.subheader("7️⃣ Socioeconomic Proxy Analysis")
-    agg = filtered_df.groupby(['rural_urban','school_type']).agg({'total_gender':'sum','total_tch':'mean','facility_index':'mean'}).reset_index()
-    fig = px.scatter(agg, x='facility_index', y='total_tch', size='total_gender', color='rural_urban',
-                     hover_data=['school_type'], labels={'facility_index':'Facility Index','total_tch':'Average Teachers'})
-    st.plotly_chart(fig, use_container_width=True)
+
+    @progressive(make_query(filters, ('rural_urban', 'school_type'), total_gender='sum', total_tch='mean',
+                            facility_index='mean'))
+    def socioeconomic_proxy(agg):
+        fig = px.scatter(agg, x='facility_index', y='total_tch', size='total_gender', color='rural_urban',
+                         hover_data=['school_type'], labels={'facility_index':'Facility Index','total_tch':'Average Teachers'})
+        st.plotly_chart(fig, use_container_width=True)
+
     st.info("Facility index & teachers act as proxy for household income and parental education, affecting enrolment & retention.")
+
+# --------------------------
+# Tab 8: School-level Scatter
+# --------------------------
+SCATTER_X = {'total_tch': 'Total Teachers', 'total_func_toilet': 'Functional Toilets'}
+
+with tabs[7], span('figure', 'School-level Scatter'):
+    st.subheader("8️⃣ Facility Index vs Teachers / Toilets (Every School)")
+    x_col = st.radio("X axis", list(SCATTER_X), format_func=SCATTER_X.get, horizontal=True)
+    full = density(filters, x_col, 'facility_index')
+    x_extent = (float(full.x_edges[0]), float(full.x_edges[-1]))
+    y_extent = (float(full.y_edges[0]), float(full.y_edges[-1]))
+    zoom_x = st.slider(f"Zoom {SCATTER_X[x_col]}", *x_extent, x_extent)
+    zoom_y = st.slider("Zoom Facility Index", *y_extent, y_extent)
+    zoomed = (zoom_x, zoom_y) != (x_extent, y_extent)
+    view = density(filters, x_col, 'facility_index', x_range=zoom_x, y_range=zoom_y) if zoomed else full
+
+    if view.points <= MAX_POINTS:
+        xy = points(filters, x_col, 'facility_index', zoom_x, zoom_y)
+        fig = go.Figure(go.Scattergl(x=xy[:, 0], y=xy[:, 1], mode='markers',
+                                     marker=dict(size=4, opacity=0.5, color='#0b3d91')))
+        st.caption(f"{view.points:,} schools, one point each.")
+    else:
+        fig = go.Figure(go.Heatmap(x=view.x_centers, y=view.y_centers, z=view.log_counts, customdata=view.counts,
+                                   colorscale='Blues', colorbar=dict(title='log10 schools'),
+                                   hovertemplate='%{x:.3g}, %{y:.3g}: %{customdata:,} schools<extra></extra>'))
+        st.caption(f"{view.points:,} schools binned into a {len(view.x_centers)}×{len(view.y_centers)} grid; "
+                   f"zoom in to {MAX_POINTS:,} or fewer to see individual schools.")
+    fig.update_layout(xaxis_title=SCATTER_X[x_col], yaxis_title='Facility Index')
+    st.plotly_chart(fig, use_container_width=True)
+    st.info("Dense bands show where most schools sit; sparse corners are the outliers worth a closer look.")
 st.markdown("""
 <footer>
     <hr>
     <p>Made with ❤️ and purpose by <b>The Role Players</b><br>
     Empowering Education through Data</p>
 </footer>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+downloads(filters, page_queries(filters))
+settle()
+end_rerun()
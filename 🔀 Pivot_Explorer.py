@@ -0,0 +1,147 @@
+from functools import partial
+
+import streamlit as st
+
+from udise.app import SHARED, rollups, sidebar_filters
+from udise.lazy import lazy_import
+from udise.metrics import begin_rerun, end_rerun, span
+from udise.rollup import LEVELS, PARTIALS
+from udise.schema import DERIVED_COLS, DIMENSIONS, NUMERIC_COLS
+
+px = lazy_import('plotly.express')
+
+# --------------------------
+# PAGE CONFIG
+# --------------------------
+st.set_page_config(page_title="Pivot Explorer", layout="wide", page_icon="🔀")
+begin_rerun("Pivot_Explorer")
+
+st.title("🔀 Pivot Explorer")
+st.markdown("Cross any two dimensions for any measure, and drill down from the country to a state and a district.")
+
+# --------------------------
+# FILTERS
+# --------------------------
+st.sidebar.header("Filters")
+filters = sidebar_filters(location=False)
+
+st.sidebar.header("Measure")
+measure = st.sidebar.selectbox("Measure", NUMERIC_COLS + DERIVED_COLS,
+                               index=(NUMERIC_COLS + DERIVED_COLS).index('facility_index'),
+                               format_func=lambda c: c.replace('_', ' ').title())
+agg = st.sidebar.selectbox("Aggregation", list(PARTIALS), index=list(PARTIALS).index('mean'))
+
+rollup = rollups(filters, measure, agg)
+
+# --------------------------
+# DRILL-DOWN STATE
+# --------------------------
+NONE = "(none)"
+# The drill-down starts where the other pages' filters are
+shared = st.session_state[SHARED]
+for key, default in [('pivot_rows', 'district' if shared['state'] != "All" else 'state'),
+                     ('pivot_cols', 'rural_urban'), ('pivot_state', shared['state']),
+                     ('pivot_district', shared['district'])]:
+    st.session_state.setdefault(key, default)
+
+states = ["All"] + rollup.members('state')
+if st.session_state.pivot_state not in states:
+    st.session_state.pivot_state = "All"
+districts = ["All"] + (rollup.members('district', st.session_state.pivot_state)
+                       if st.session_state.pivot_state != "All" else [])
+if st.session_state.pivot_district not in districts:
+    st.session_state.pivot_district = "All"
+
+
+def _rows_below(level):
+    """Row dimension after drilling into `level`: the next level down, else the first free dimension."""
+    if level == 'state':
+        return 'district'
+    return next(d for d in DIMENSIONS if d not in LEVELS and d != st.session_state.pivot_cols)
+
+
+def drill(table_key):
+    selected = st.session_state[table_key].selection.rows
+    level = st.session_state.pivot_rows
+    if not selected or level not in LEVELS:
+        return
+    label = st.session_state.pivot_labels[selected[0]]
+    if isinstance(label, tuple):  # a district over the whole country, with its state
+        st.session_state.pivot_state, label = label
+    st.session_state[f'pivot_{level}'] = label
+    st.session_state.pivot_rows = _rows_below(level)
+    if st.session_state.pivot_cols == st.session_state.pivot_rows:
+        st.session_state.pivot_cols = NONE
+
+
+def drill_up():
+    if st.session_state.pivot_district != "All":
+        st.session_state.pivot_district = "All"
+        st.session_state.pivot_rows = 'district'
+    else:
+        st.session_state.pivot_state = "All"
+        st.session_state.pivot_rows = 'state'
+    if st.session_state.pivot_cols == st.session_state.pivot_rows:
+        st.session_state.pivot_cols = NONE
+
+
+# --------------------------
+# SCOPE AND LAYOUT
+# --------------------------
+col1, col2, col3, col4 = st.columns(4)
+state = col1.selectbox("State", states, key='pivot_state')
+district = col2.selectbox("District", districts, key='pivot_district', disabled=state == "All")
+rows = col3.selectbox("Rows", DIMENSIONS, key='pivot_rows')
+if st.session_state.pivot_cols == rows:
+    st.session_state.pivot_cols = NONE
+columns = col4.selectbox("Columns", [NONE] + [d for d in DIMENSIONS if d != rows], key='pivot_cols')
+columns = None if columns == NONE else columns
+
+path = ["🇮🇳 All India"] + [p for p in (state, district) if p != "All"]
+crumbs, up = st.columns([5, 1])
+crumbs.markdown(" › ".join(f"**{p}**" for p in path))
+up.button("⬆️ Up one level", on_click=drill_up, disabled=state == "All", use_container_width=True)
+
+# --------------------------
+# PIVOT
+# --------------------------
+with span('figure', 'Pivot'):
+    table = rollup.pivot(rows, columns, state, district)
+    label = f"{agg} of {measure.replace('_', ' ')}"
+    tab_table, tab_chart = st.tabs(["Table", "Chart"])
+
+    with tab_table:
+        st.session_state.pivot_labels = [v if isinstance(v, tuple) else str(v) for v in table.index]
+        if rows in LEVELS:
+            st.caption(f"Select a {rows} to drill into it.")
+        # A table per view, so a selection does not carry over to the next level
+        table_key = f"pivot_table:{state}:{district}:{rows}:{columns}"
+        st.dataframe(table.round(2), use_container_width=True, key=table_key,
+                     on_select=partial(drill, table_key) if rows in LEVELS else 'ignore',
+                     selection_mode='single-row')
+
+    with tab_chart:
+        chart = table.copy()
+        for axis in ('index', 'columns'):
+            keys = getattr(chart, axis)
+            if keys.nlevels > 1:  # (state, district) over the whole country
+                setattr(chart, axis, [f"{d} ({s})" for s, d in keys])
+        if columns:
+            fig = px.imshow(chart, color_continuous_scale='Blues', aspect='auto', text_auto='.2f',
+                            labels={'color': label}, height=max(400, 22 * len(chart)))
+        else:
+            flat = chart.rename_axis(rows).reset_index()
+            fig = px.bar(flat, x=measure, y=rows, orientation='h', labels={measure: label},
+                         height=max(400, 22 * len(flat)))
+            fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+        st.plotly_chart(fig, use_container_width=True)
+
+st.markdown("""
+<footer>
+    <hr>
+    <p>Made with ❤️ and purpose by <b>The Role Players</b><br>
+    Empowering Education through Data</p>
+</footer>
+""", unsafe_allow_html=True)
+
+end_rerun()
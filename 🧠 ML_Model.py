@@ -1,15 +1,20 @@
 import streamlit as st
-import numpy as np
-import pickle
+
+from udise.lazy import lazy_import
+from udise.metrics import begin_rerun, end_rerun, span
+
+inference = lazy_import('udise.inference')
+neighbours = lazy_import('udise.neighbours')
+drift = lazy_import('udise.drift')
 
 # ===============================
-# 🎯 Load Models
+# 🎯 Load Models (on first prediction)
 # ===============================
-with open('xgb_dropout_model.pkl', 'rb') as f:
-    xgb_reg = pickle.load(f)
-
-with open('xgb_retention_model.pkl', 'rb') as f:
-    xgb_cls = pickle.load(f)
+# Predictions go through the shared scheduler, which batches concurrent
+# sessions' requests into one call per model
+@st.cache_resource(show_spinner="Loading models...")
+def load_models():
+    inference.warm('dropout', 'retention')
 
 # ===============================
 # ⚙️ Streamlit Page Config
@@ -19,6 +24,7 @@ st.set_page_config(
     page_icon="📊",
     layout="wide",
 )
+begin_rerun("ML_Model")
 
 # ===============================
 # 🎓 Header
@@ -83,7 +89,7 @@ def encode_binary(x):
     return 1 if x.lower() in ["yes", "pucca"] else 0
 
 # Dropout model features
-X_reg_input = np.array([[
+X_reg_input = [[
     encode_binary(electricity),
     total_class_rooms,
     total_tch,
@@ -94,10 +100,10 @@ X_reg_input = np.array([[
     encode_binary(internet),
     encode_binary(building_status),
     encode_binary(playground)
-]])
+]]
 
 # Retention model features
-X_cls_input = np.array([[
+X_cls_input = [[
     1 if rural_urban.lower() == "urban" else 0,
     ["Primary", "Upper Primary", "Secondary", "Higher Secondary"].index(school_category),
     ["Govt", "Private", "Aided"].index(management),
@@ -108,21 +114,49 @@ X_cls_input = np.array([[
     encode_binary(availability_ramps),
     encode_binary(medical_checkups),
     encode_binary(electricity)
-]])
+]]
+
+# Model inputs the school data also records, for the drift checks
+dropout_inputs = {
+    'electricity_availability': encode_binary(electricity),
+    'total_class_rooms': total_class_rooms,
+    'total_tch': total_tch,
+    'trained_comp': trained_comp,
+    'total_girls_func_toilet': total_girls_func_toilet,
+    'library_availability': encode_binary(library),
+    'playground_available': encode_binary(playground),
+}
+retention_inputs = {
+    'urban': 1 if rural_urban.lower() == "urban" else 0,
+    'female': female_teachers,
+    'total_tch': total_tch,
+    'trained_comp': trained_comp,
+    'library_availability': encode_binary(library),
+    'electricity_availability': encode_binary(electricity),
+}
 
 # ===============================
 # 🔮 Prediction
 # ===============================
 st.markdown("### 🧠 Run Predictions")
 if st.button("🚀 Predict Outcomes"):
-    dropout_pred = xgb_reg.predict(X_reg_input)[0]
-    retention_pred = xgb_cls.predict(X_cls_input)[0]
+    with span('load', 'models'):
+        load_models()
+    with span('predict', rows=1):
+        dropout_pred = inference.predict('dropout', X_reg_input)[0]
+        retention_pred = inference.predict('retention', X_cls_input)[0]
     retention_label = "High Retention 🟢" if retention_pred == 1 else "Low Retention 🔴"
 
     # ===============================
     # 📊 Display Results
     # ===============================
     st.success("✅ Prediction Complete!")
+    outside = {**drift.out_of_range('xgb_dropout_model.pkl', dropout_inputs),
+               **drift.out_of_range('xgb_retention_model.pkl', retention_inputs)}
+    if outside:
+        st.warning("⚠️ Outside the range of the training data: "
+                   + ", ".join(f"**{f}** (trained on {lo:g}–{hi:g})" for f, (lo, hi) in outside.items())
+                   + ". Treat these predictions with caution.")
 
     colA, colB = st.columns(2)
     with colA:
@@ -138,6 +172,45 @@ if st.button("🚀 Predict Outcomes"):
     else:
         st.warning("⚠️ Improvements needed in **facilities or teacher support** to improve retention.")
 
+# ===============================
+# 🔎 Comparable Schools
+# ===============================
+st.markdown("### 🔎 Comparable Schools")
+if st.toggle("Show the 20 most similar schools in the data"):
+    comparable = neighbours.comparable_schools({
+        'electricity_availability': encode_binary(electricity),
+        'total_class_rooms': total_class_rooms,
+        'total_tch': total_tch,
+        'trained_comp': trained_comp,
+        'total_girls_func_toilet': total_girls_func_toilet,
+        'library_availability': encode_binary(library),
+        'playground_available': encode_binary(playground),
+        'urban': 1 if rural_urban.lower() == "urban" else 0,
+        'female': female_teachers,
+    })
+    st.dataframe(comparable.rename(columns=neighbours.OUTCOMES), hide_index=True, use_container_width=True)
+    st.caption("Nearest schools on the inputs above that the school data records, each standardised; "
+               "distance 0 is an exact match.")
+
+# ===============================
+# 📡 Data Drift
+# ===============================
+st.markdown("### 📡 Data Drift")
+if st.toggle("Check the current school data against the models' training data"):
+    for model_path, name in [('xgb_dropout_model.pkl', "Dropout model"), ('xgb_retention_model.pkl', "Retention model")]:
+        report = drift.current_drift(model_path)
+        if report is None:
+            st.info(f"{name}: no training profile for this model version "
+                    "(run `python -m udise.drift snapshot` on the training data).")
+            continue
+        drifted = report.loc[report['status'] == 'drift', 'feature'].tolist()
+        if drifted:
+            st.warning(f"⚠️ {name}: the data has drifted from training in **{', '.join(drifted)}**.")
+        else:
+            st.success(f"✅ {name}: no drift from the training data.")
+        st.dataframe(report, hide_index=True, use_container_width=True)
+    st.caption("PSI ≥ 0.2 or a KS distance above its 1% critical value flags drift; PSI 0.1–0.2 is worth watching.")
+
 # ===============================
 # 🧾 Footer
 # ===============================
@@ -153,4 +226,6 @@ st.markdown("""
     <p>Made with ❤️ and purpose by <b>The Role Players</b><br>
     Empowering Education through Data</p>
 </footer>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+end_rerun()
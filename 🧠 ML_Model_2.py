@@ -3,16 +3,25 @@
 # ================================
 
 import streamlit as st
-import pandas as pd
-import numpy as np
-import pickle
-import plotly.express as px
 
-# Load trained model
-model = pickle.load(open("infra_score_model.pkl", "rb"))
+from udise.lazy import lazy_import
+from udise.metrics import begin_rerun, end_rerun, span
+
+pd = lazy_import('pandas')
+inference = lazy_import('udise.inference')
+px = lazy_import('plotly.express')
+neighbours = lazy_import('udise.neighbours')
+drift = lazy_import('udise.drift')
+
+# Load trained model (on first prediction); predictions are batched with
+# other sessions' by the shared scheduler
+@st.cache_resource(show_spinner="Loading model...")
+def load_model():
+    inference.warm('infra')
 
 # Streamlit page setup
 st.set_page_config(page_title="Infrastructure Quality Scoring", layout="wide")
+begin_rerun("ML_Model_2")
 
 # Sidebar Inputs
 st.sidebar.title("🏫 School Infrastructure Inputs")
@@ -37,7 +46,7 @@ yes_no_map = {"Yes": 1, "No": 0}
 lab_map = {"Good": 3, "Average": 2, "Poor": 1, "Not Available": 0}
 
 # Prepare input data
-input_data = pd.DataFrame({
+input_row = {
     'building_status': [encode_feature(building_status, building_map)],
     'boundary_wall': [encode_feature(boundary_wall, yes_no_map)],
     'electricity_availability': [encode_feature(electricity_availability, yes_no_map)],
@@ -48,7 +57,7 @@ input_data = pd.DataFrame({
     'library_availability': [encode_feature(library_availability, yes_no_map)],
     'total_boys_func_toilet': [total_boys_func_toilet],
     'classrooms_in_good_condition': [classrooms_in_good_condition]
-})
+}
 
 # Main title
 st.title("🏫 School Infrastructure Quality Scoring")
@@ -56,10 +65,18 @@ st.markdown("Predicts the **Infrastructure Quality Score (0–100)** for a schoo
 
 # Prediction button
 if st.button("🔍 Predict Infrastructure Score"):
-    prediction = model.predict(input_data)[0]
+    with span('load', 'model'):
+        load_model()
+    with span('predict', rows=1):
+        prediction = inference.predict('infra', input_row)[0]
     score = (round(prediction))*10
 
     st.subheader(f"🏆 Predicted Infrastructure Score: **{score}**")
+    outside = drift.out_of_range("infra_score_model.pkl", {f: v[0] for f, v in input_row.items()})
+    if outside:
+        st.warning("⚠️ Outside the range of the training data: "
+                   + ", ".join(f"**{f}** (trained on {lo:g}–{hi:g})" for f, (lo, hi) in outside.items())
+                   + ". Treat this score with caution.")
 
     # Display status indicator
     if score >= 80:
@@ -71,6 +88,35 @@ if st.button("🔍 Predict Infrastructure Score"):
     else:
         st.error("Poor Infrastructure Quality ❤️")
 
+# Comparable schools
+st.markdown("### 🔎 Comparable Schools")
+if st.toggle("Show the 20 most similar schools in the data"):
+    comparable = neighbours.comparable_schools({
+        'electricity_availability': input_row['electricity_availability'][0],
+        'playground_available': input_row['playground_available'][0],
+        'library_availability': input_row['library_availability'][0],
+        'total_boys_func_toilet': total_boys_func_toilet,
+        'classrooms_in_good_condition': classrooms_in_good_condition,
+    })
+    st.dataframe(comparable.rename(columns=neighbours.OUTCOMES), hide_index=True, use_container_width=True)
+    st.caption("Nearest schools on the inputs above that the school data records, each standardised; "
+               "distance 0 is an exact match.")
+
+# Data drift
+st.markdown("### 📡 Data Drift")
+if st.toggle("Check the current school data against the model's training data"):
+    report = drift.current_drift("infra_score_model.pkl")
+    if report is None:
+        st.info("No training profile for this model version (run `python -m udise.drift snapshot` on the training data).")
+    else:
+        drifted = report.loc[report['status'] == 'drift', 'feature'].tolist()
+        if drifted:
+            st.warning(f"⚠️ The data has drifted from training in **{', '.join(drifted)}**.")
+        else:
+            st.success("✅ No drift from the training data.")
+        st.dataframe(report, hide_index=True, use_container_width=True)
+        st.caption("PSI ≥ 0.2 or a KS distance above its 1% critical value flags drift; PSI 0.1–0.2 is worth watching.")
+
 # Divider
 st.markdown("---")
 st.subheader("📊 Example Insights (Sample Visualization)")
@@ -101,4 +147,6 @@ st.markdown("""
     <p>Made with ❤️ and purpose by <b>The Role Players</b><br>
     Empowering Education through Data</p>
 </footer>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+end_rerun()
@@ -0,0 +1,108 @@
+import streamlit as st
+
+from udise import segments
+from udise.app import aggregate, data_version, sidebar_filters
+from udise.lazy import lazy_import
+from udise.metrics import begin_rerun, end_rerun, span
+from udise.query import make_query
+
+px = lazy_import('plotly.express')
+
+# --------------------------
+# PAGE CONFIG
+# --------------------------
+st.set_page_config(page_title="School Segments", layout="wide", page_icon="🧩")
+begin_rerun("School_Segments")
+
+st.title("🧩 School Segments")
+st.markdown("Schools clustered on infrastructure and staffing, from rural schools without electricity "
+            "to well-equipped urban ones. Pick a segment in any analytics page's sidebar to filter by it.")
+
+# --------------------------
+# SEGMENT MODEL
+# --------------------------
+@st.cache_data(show_spinner=False)
+def load_segments(version, data):
+    # A store rebuilt since segmentation (delta ingest, build_store) has lost its segment column
+    return segments.Model.load() if segments.assigned() else None
+
+
+model = load_segments(segments.version(), data_version())
+if model is None:
+    # Segmenting rewrites every store partition, so it is run once from the command line, not per viewer
+    st.info("Schools have not been segmented yet, or the store was rebuilt since. "
+            "Run `python -m udise.segments [--k 8]` and reload this page.")
+    end_rerun()
+    st.stop()
+
+labels = dict(enumerate(model.labels))
+
+# --------------------------
+# FILTERS
+# --------------------------
+st.sidebar.header("Filters")
+filters = sidebar_filters(segment=False)
+
+# --------------------------
+# METRICS
+# --------------------------
+sizes = aggregate(make_query(filters, 'segment', total_gender='count', facility_index='mean'))
+sizes['label'] = sizes['segment'].map(labels)
+
+col1, col2, col3 = st.columns(3)
+col1.metric("🧩 Segments", len(labels))
+col2.metric("🏫 Schools", f"{sizes['total_gender'].sum():,.0f}")
+col3.metric("🏆 Best-equipped Segment", sizes.loc[sizes['facility_index'].idxmax(), 'label'] if len(sizes) else "-")
+st.markdown("---")
+
+tabs = st.tabs(["Segment Sizes", "Segment Profiles", "Segments by State"])
+
+# --------------------------
+# Tab 1: Segment Sizes
+# --------------------------
+with tabs[0], span('figure', 'Segment Sizes'):
+    fig = px.bar(sizes, x='total_gender', y='label', orientation='h', color='facility_index',
+                 color_continuous_scale='Blues', text='total_gender',
+                 labels={'total_gender': 'Schools', 'label': 'Segment', 'facility_index': 'Facility Index'})
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    st.plotly_chart(fig, use_container_width=True)
+
+# --------------------------
+# Tab 2: Segment Profiles
+# --------------------------
+PROFILE = ['electricity_availability', 'library_availability', 'playground_available', 'total_class_rooms',
+           'classrooms_in_good_condition', 'total_func_toilet', 'pucca_building_blocks', 'total_tch',
+           'trained_comp', 'female']
+
+with tabs[1], span('figure', 'Segment Profiles'):
+    st.subheader("Average school in each segment")
+    profile = aggregate(make_query(filters, 'segment', **{c: 'mean' for c in PROFILE}))
+    profile = profile.set_index(profile['segment'].map(labels))[PROFILE]
+    # Colour by how far each segment sits from the average segment, per feature
+    scaled = (profile - profile.mean()) / profile.std().replace(0, 1)
+    fig = px.imshow(scaled, color_continuous_scale='RdBu', color_continuous_midpoint=0, aspect='auto',
+                    labels={'color': 'vs. average'})
+    fig.update_traces(text=profile.round(2).to_numpy(), texttemplate='%{text}')
+    st.plotly_chart(fig, use_container_width=True)
+    st.info("Cells show the segment average; colour shows how far it is above (blue) or below (red) the other segments.")
+
+# --------------------------
+# Tab 3: Segments by State
+# --------------------------
+with tabs[2], span('figure', 'Segments by State'):
+    by_state = aggregate(make_query(filters, ('state', 'segment'), total_gender='count'))
+    by_state['label'] = by_state['segment'].map(labels)
+    by_state['share'] = by_state['total_gender'] / by_state.groupby('state')['total_gender'].transform('sum')
+    fig = px.bar(by_state, x='share', y='state', color='label', orientation='h',
+                 labels={'share': 'Share of schools', 'state': 'State', 'label': 'Segment'},
+                 height=max(400, 24 * by_state['state'].nunique()))
+    st.plotly_chart(fig, use_container_width=True)
+st.markdown("""
+<footer>
+    <hr>
+    <p>Made with ❤️ and purpose by <b>The Role Players</b><br>
+    Empowering Education through Data</p>
+</footer>
+""", unsafe_allow_html=True)
+
+end_rerun()